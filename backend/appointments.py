@@ -0,0 +1,175 @@
+import secrets
+import time
+from datetime import date, datetime, timedelta
+
+import mysql.connector
+
+from db_pool import ER_DUP_ENTRY, StoreUnavailableError
+
+# One row per booking. `active` is 1 while the booking holds its slot and
+# NULL once cancelled: NULLs never collide in a UNIQUE index, so uq_slot
+# admits exactly one live booking per doctor, date and time (in MySQL and
+# SQLite alike) and its (doctor_id, appointment_date) prefix is the
+# per-doctor, per-day slot lookup. idx_date_active serves the availability
+# engine's scan of every live booking in the coming days.
+APPOINTMENTS_DDL = """
+    CREATE TABLE IF NOT EXISTS appointments (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        appointment_id CHAR(25) NOT NULL UNIQUE,
+        doctor_id INT NOT NULL,
+        appointment_date DATE NOT NULL,
+        appointment_time TIME NOT NULL,
+        user_id INT NULL,
+        patient_name VARCHAR(255) NOT NULL,
+        patient_email VARCHAR(255) NOT NULL,
+        patient_phone VARCHAR(20) NOT NULL,
+        consultation_fee INT,
+        status VARCHAR(20) NOT NULL DEFAULT 'confirmed',
+        active TINYINT NULL DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE KEY uq_slot (doctor_id, appointment_date, appointment_time, active),
+        INDEX idx_patient_email (patient_email),
+        INDEX idx_date_active (appointment_date, active)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+class SlotTakenError(Exception):
+    """The doctor already has a live booking at that date and time"""
+
+def new_appointment_id():
+    """'APT' + 12 hex digits of milliseconds + 10 random hex digits.
+
+    Time-ordered so new rows land at the end of the unique index, with 40
+    random bits per millisecond so concurrent workers don't collide.
+    """
+    return f"APT{int(time.time() * 1000):012X}{secrets.token_hex(5).upper()}"
+
+def parse_slot(appointment_date, appointment_time):
+    """(date 'YYYY-MM-DD', time 'HH:MM') from user input; ValueError if invalid.
+
+    Accepts 24-hour '14:30' / '14:30:00' and 12-hour '2:30 PM', so every
+    spelling of one slot maps to the same unique-key value.
+    """
+    day = datetime.strptime(str(appointment_date).strip(), '%Y-%m-%d').date()
+    text = str(appointment_time).strip().upper()
+    for fmt in ('%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p'):
+        try:
+            slot = datetime.strptime(text, fmt).time()
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"Unrecognised time {appointment_time!r}")
+    return day.isoformat(), slot.strftime('%H:%M')
+
+def check_bookable(day, slot, slot_minutes, now=None):
+    """ValueError unless a parse_slot() result starts on the slot_minutes grid and isn't over yet"""
+    start = datetime.strptime(f'{day} {slot}', '%Y-%m-%d %H:%M')
+    if (start.hour * 60 + start.minute) % slot_minutes:
+        raise ValueError(f"{slot} is not on the {slot_minutes}-minute schedule grid")
+    if start + timedelta(minutes=slot_minutes) <= (now or datetime.now()):
+        raise ValueError(f"{day} {slot} is in the past")
+
+def _date_text(value):
+    return value.isoformat() if isinstance(value, date) else str(value)
+
+def _as_json(record):
+    return {
+        'appointmentId': record['appointment_id'],
+        'doctorId': record['doctor_id'],
+        'appointmentDate': _date_text(record['appointment_date']),
+        'appointmentTime': _time_text(record['appointment_time']),
+        'patientName': record['patient_name'],
+        'patientEmail': record['patient_email'],
+        'patientPhone': record['patient_phone'],
+        'consultationFee': record['consultation_fee'],
+        'status': record['status']
+    }
+
+def _time_text(value):
+    # mysql.connector returns TIME columns as timedelta
+    if isinstance(value, timedelta):
+        minutes = int(value.total_seconds()) // 60
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+    return str(value)[:5]
+
+class AppointmentStore:
+    """Appointments persisted in the appointments table.
+
+    book() is one INSERT: the uq_slot constraint, not a read-then-write,
+    decides which of several concurrent requests for a slot wins, so there
+    is no window for a double booking. Only slots on the slot_minutes grid
+    (the availability engine's) that haven't ended can be booked.
+    connect() is the app's pooled get_db_connection.
+    """
+
+    COLUMNS = ('appointment_id', 'doctor_id', 'appointment_date', 'appointment_time', 'user_id',
+               'patient_name', 'patient_email', 'patient_phone', 'consultation_fee', 'status')
+
+    def __init__(self, connect, slot_minutes=30):
+        self._connect = connect
+        self.slot_minutes = slot_minutes
+
+    def _connection(self):
+        conn = self._connect()
+        if conn is None:
+            raise StoreUnavailableError("Database connection failed")
+        return conn
+
+    def book(self, doctor_id, appointment_date, appointment_time, patient_name, patient_email,
+             patient_phone, consultation_fee=None, user_id=None):
+        """Insert a confirmed booking and return it; SlotTakenError if the slot is held"""
+        day, slot = parse_slot(appointment_date, appointment_time)
+        check_bookable(day, slot, self.slot_minutes)
+        record = dict(zip(self.COLUMNS, (new_appointment_id(), doctor_id, day, slot, user_id, patient_name,
+                                         patient_email, patient_phone, consultation_fee, 'confirmed')))
+        conn = self._connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"INSERT INTO appointments ({', '.join(self.COLUMNS)}) "
+                f"VALUES ({', '.join(['%s'] * len(self.COLUMNS))})",
+                tuple(record.values())
+            )
+            conn.commit()
+        except mysql.connector.IntegrityError as e:
+            conn.rollback()
+            if e.errno == ER_DUP_ENTRY:
+                raise SlotTakenError(f"Doctor {doctor_id} is already booked on {day} at {slot}")
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        return _as_json(record)
+
+    def booked_slots(self, doctor_id, appointment_date):
+        """Sorted 'HH:MM' times the doctor is booked on one day (a uq_slot prefix scan)"""
+        day = _date_text(datetime.strptime(str(appointment_date).strip(), '%Y-%m-%d').date())
+        conn = self._connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT appointment_time FROM appointments "
+                "WHERE doctor_id = %s AND appointment_date = %s AND active = 1 "
+                "ORDER BY appointment_time",
+                (doctor_id, day)
+            )
+            return [_time_text(row[0]) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    def booked_between(self, first_day, last_day):
+        """(doctor_id, 'YYYY-MM-DD', 'HH:MM') for every live booking in a date range"""
+        conn = self._connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT doctor_id, appointment_date, appointment_time FROM appointments "
+                "WHERE appointment_date BETWEEN %s AND %s AND active = 1",
+                (first_day, last_day)
+            )
+            return [(row[0], _date_text(row[1]), _time_text(row[2])) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
@@ -6,6 +6,8 @@ import os
 import re
 from datetime import timedelta
 
+from db_pool import PoolTimeoutError, create_pool_from_env
+
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
 app.config['SESSION_COOKIE_HTTPONLY'] = True
@@ -31,10 +33,15 @@ db_config = {
     'database': os.getenv('DB_NAME', 'user_system')  # <- default to gynai_db
 }
 
+# Connection pool (per worker; opened lazily so nothing is inherited across fork)
+db_pool = create_pool_from_env(lambda: mysql.connector.connect(**db_config))
+
 def get_db_connection():
     try:
+        if db_pool is not None:
+            return db_pool.connect()
         return mysql.connector.connect(**db_config)
-    except mysql.connector.Error as err:
+    except (mysql.connector.Error, PoolTimeoutError) as err:
         print(f"Database connection error: {err}")
         return None
 
@@ -0,0 +1,291 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+
+from background import PeriodicTask
+from bloom_filter import BloomFilter
+from db_pool import StoreUnavailableError
+
+log = logging.getLogger('gynai.auth_tokens')
+
+# Server-side record of revoked token ids, shared by all workers. Rows are
+# only needed until the token would have expired anyway.
+REVOKED_TOKENS_DDL = """
+    CREATE TABLE IF NOT EXISTS revoked_tokens (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        jti CHAR(16) NOT NULL UNIQUE,
+        expires_at INT NOT NULL,
+        revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_expires_at (expires_at)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+ACCESS = 'a'
+REFRESH = 'r'
+SIGNATURE_BYTES = 16
+
+class TokenError(Exception):
+    """The token is malformed, forged, expired, revoked or of the wrong kind"""
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+class RevocationList:
+    """Revoked token ids: a Bloom filter in front of an exact {jti: expires_at} map.
+
+    Almost every check is for a token that was never revoked, and the
+    filter rejects those after a few bit probes into a small array. Only a
+    filter hit (revoked, or a ~1% false positive) consults the exact map.
+    Entries are pruned once their token has expired; the filter is rebuilt,
+    twice as large if needed, when it is full or has been pruned.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.01):
+        self.error_rate = error_rate
+        self.exact = {}
+        self.filter = BloomFilter(capacity, error_rate)
+        self.filter_hits = 0
+        self.false_positives = 0
+        self._lock = threading.Lock()
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            if jti in self.exact:
+                return
+            self.exact[jti] = expires_at
+            if self.filter.count >= self.filter.capacity:
+                self._rebuild(self.filter.capacity * 2)
+            else:
+                self.filter.add(jti)
+
+    def is_revoked(self, jti):
+        if jti not in self.filter:
+            return False
+        self.filter_hits += 1
+        if jti in self.exact:
+            return True
+        self.false_positives += 1
+        return False
+
+    def prune(self, now=None):
+        """Forget revocations of tokens that have expired anyway"""
+        now = now or time.time()
+        with self._lock:
+            live = {jti: exp for jti, exp in self.exact.items() if exp > now}
+            if len(live) < len(self.exact):
+                self.exact = live
+                self._rebuild(self.filter.capacity)
+
+    def _rebuild(self, capacity):
+        rebuilt = BloomFilter(max(capacity, len(self.exact) * 2), self.error_rate)
+        for jti in self.exact:
+            rebuilt.add(jti)
+        self.filter = rebuilt
+
+    def __len__(self):
+        return len(self.exact)
+
+    def stats(self):
+        return {
+            'revoked': len(self.exact),
+            'filter_bytes': self.filter.size_bytes,
+            'filter_capacity': self.filter.capacity,
+            'filter_hits': self.filter_hits,
+            'false_positives': self.false_positives
+        }
+
+class RevocationStore:
+    """revoked_tokens rows; connect() is the app's pooled get_db_connection"""
+
+    def __init__(self, connect):
+        self._connect = connect
+
+    def _connection(self):
+        conn = self._connect()
+        if conn is None:
+            raise StoreUnavailableError("Database connection failed")
+        return conn
+
+    def add(self, jti, expires_at):
+        conn = self._connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO revoked_tokens (jti, expires_at) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE expires_at = VALUES(expires_at)",
+                (jti, expires_at)
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def since(self, last_id, now):
+        """[(id, jti, expires_at)] added after row last_id for tokens not yet expired"""
+        conn = self._connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT id, jti, expires_at FROM revoked_tokens WHERE id > %s AND expires_at > %s ORDER BY id",
+                (last_id, int(now))
+            )
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+class TokenAuthority:
+    """Issues and verifies compact HMAC-signed access and refresh tokens.
+
+    A token is base64url(JSON claims) + '.' + base64url(16-byte HMAC-SHA256).
+    Claims carry the user (u, n, e), expiry (x), a random id (j), the kind
+    (t) and the signing key id (k). Verification is local to the process:
+    the keyed HMAC state for each key id is built once and copied per
+    check, and revocation is an in-memory RevocationList that sync() keeps
+    up to date from revoked_tokens. No request needs a session store or a
+    database round trip to authenticate.
+
+    keys is {kid: secret}; signing_kid signs new tokens, the others still
+    verify (key rotation).
+    """
+
+    def __init__(self, keys, signing_kid, access_ttl=900, refresh_ttl=14 * 86400,
+                 revocations=None, store=None):
+        if signing_kid not in keys:
+            raise ValueError(f"No key with id {signing_kid!r}")
+        self._macs = {kid: hmac.new(secret.encode('utf-8') if isinstance(secret, str) else secret,
+                                    digestmod=hashlib.sha256)
+                      for kid, secret in keys.items()}
+        self.signing_kid = signing_kid
+        self.access_ttl = access_ttl
+        self.refresh_ttl = refresh_ttl
+        self.revocations = revocations if revocations is not None else RevocationList()
+        self.store = store
+        self.issued = 0
+        self.verified = 0
+        self.rejected = 0
+        self.syncs = 0
+        self._last_id = 0
+        self._last_prune = time.time()
+        self._sync_task = PeriodicTask('revocation-sync', log, 'token revocation sync failed')
+
+    def _sign(self, kid, payload):
+        mac = self._macs[kid].copy()
+        mac.update(payload)
+        return mac.digest()[:SIGNATURE_BYTES]
+
+    def _token(self, user, kind, ttl, now):
+        claims = {'u': user['id'], 'n': user['username'], 'e': user['email'], 'x': int(now) + ttl,
+                  'j': secrets.token_urlsafe(12), 't': kind, 'k': self.signing_kid}
+        payload = json.dumps(claims, separators=(',', ':')).encode('utf-8')
+        return f"{_b64encode(payload)}.{_b64encode(self._sign(self.signing_kid, payload))}"
+
+    def issue(self, user, now=None):
+        """Access + refresh token pair for user ({'id', 'username', 'email'})"""
+        now = now or time.time()
+        self.issued += 1
+        return {
+            'accessToken': self._token(user, ACCESS, self.access_ttl, now),
+            'refreshToken': self._token(user, REFRESH, self.refresh_ttl, now),
+            'tokenType': 'Bearer',
+            'expiresIn': self.access_ttl
+        }
+
+    def verify(self, token, kind=ACCESS, now=None):
+        """The token's claims; TokenError unless it is valid, current and of this kind"""
+        try:
+            payload_text, signature_text = token.split('.')
+            payload = _b64decode(payload_text)
+            claims = json.loads(payload)
+            mac = self._macs.get(claims['k'])
+            signature = _b64decode(signature_text)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            self.rejected += 1
+            raise TokenError("Malformed token")
+        if mac is None or not hmac.compare_digest(self._sign(claims['k'], payload), signature):
+            self.rejected += 1
+            raise TokenError("Invalid token signature")
+        if claims.get('t') != kind:
+            self.rejected += 1
+            raise TokenError("Wrong token type")
+        if claims['x'] <= (now or time.time()):
+            self.rejected += 1
+            raise TokenError("Token expired")
+        if self.revocations.is_revoked(claims['j']):
+            self.rejected += 1
+            raise TokenError("Token revoked")
+        self.verified += 1
+        return claims
+
+    def revoke(self, claims):
+        """Revoke a verified token everywhere (StoreUnavailableError if that can't be recorded)"""
+        self.revocations.add(claims['j'], claims['x'])
+        if self.store is not None:
+            self.store.add(claims['j'], claims['x'])
+
+    def refresh(self, refresh_token, now=None):
+        """A new token pair for a refresh token, which is revoked (rotated) in the process"""
+        claims = self.verify(refresh_token, REFRESH, now)
+        self.revoke(claims)
+        return self.issue({'id': claims['u'], 'username': claims['n'], 'email': claims['e']}, now)
+
+    def sync(self, now=None):
+        """Pull revocations made by other workers; prune expired ones hourly"""
+        now = now or time.time()
+        for row_id, jti, expires_at in self.store.since(self._last_id, now):
+            self.revocations.add(jti, expires_at)
+            self._last_id = max(self._last_id, row_id)
+        if now - self._last_prune > 3600:
+            self.revocations.prune(now)
+            self._last_prune = now
+        self.syncs += 1
+
+    def watch(self, interval):
+        """Call sync() every interval seconds in a background thread (once per process)"""
+        if self.store is None or interval <= 0:
+            return
+        self._sync_task.start(self.sync, interval)
+
+    def stats(self):
+        return {
+            'signing_key': self.signing_kid,
+            'keys': len(self._macs),
+            'issued': self.issued,
+            'verified': self.verified,
+            'rejected': self.rejected,
+            'syncs': self.syncs,
+            'sync_failures': self._sync_task.failures,
+            'last_error': self._sync_task.last_error,
+            'revocations': self.revocations.stats()
+        }
+
+def create_authority_from_env(default_secret, connect=None):
+    """TokenAuthority for AUTH_MODE=token/both, or None for cookie sessions only.
+
+    AUTH_TOKEN_KEYS is 'kid:secret,kid:secret' with the signing key first;
+    without it tokens are signed with default_secret (the app secret key).
+    """
+    if os.getenv('AUTH_MODE', 'session') not in ('token', 'both'):
+        return None
+    keys = {}
+    for item in filter(None, os.getenv('AUTH_TOKEN_KEYS', '').split(',')):
+        kid, _, secret = item.partition(':')
+        keys[kid.strip()] = secret.strip()
+    if not keys:
+        keys = {'k0': default_secret}
+    return TokenAuthority(
+        keys, signing_kid=next(iter(keys)),
+        access_ttl=int(os.getenv('AUTH_ACCESS_TTL', 900)),
+        refresh_ttl=int(os.getenv('AUTH_REFRESH_TTL', 14 * 86400)),
+        revocations=RevocationList(capacity=int(os.getenv('AUTH_REVOCATION_CAPACITY', 100000))),
+        store=RevocationStore(connect) if connect is not None else None
+    )
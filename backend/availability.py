@@ -0,0 +1,308 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from background import PeriodicTask
+
+log = logging.getLogger('gynai.availability')
+
+# Frontend availability filter values, each a window of time from now
+AVAILABLE_NOW = 'Available Now'
+AVAILABLE_TODAY = 'Available Today'
+AVAILABLE_TOMORROW = 'Available Tomorrow'
+AVAILABLE_THIS_WEEK = 'Available This Week'
+AVAILABILITY_WINDOWS = (AVAILABLE_NOW, AVAILABLE_TODAY, AVAILABLE_TOMORROW, AVAILABLE_THIS_WEEK)
+# "Now" means a free slot in progress or starting within this many minutes
+NOW_WINDOW_MINUTES = 60
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+# Used for doctors whose database.json entry has no "schedule"
+DEFAULT_SCHEDULE = {day: ['10:00-13:00', '16:00-19:00'] for day in WEEKDAYS[:6]}
+
+def _minutes(text):
+    hours, minutes = text.strip().split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+def _bits(first, last):
+    """Mask with bits first..last-1 set"""
+    return ((1 << last) - 1) ^ ((1 << first) - 1) if last > first else 0
+
+class AvailabilityView:
+    """The engine's bitmaps laid out for one catalogue snapshot's doctors.
+
+    free[pos, day] is indexed by that snapshot's catalogue positions, so a
+    request must query the view of the snapshot it is serving; get it with
+    engine.view(version). Views share the engine's booked slots and lock.
+    """
+
+    def __init__(self, engine, doctors, version=None):
+        self.engine = engine
+        self.version = version
+        self.ids = [d['id'] for d in doctors]
+        self.position = {doctor_id: pos for pos, doctor_id in enumerate(self.ids)}
+        self.weekly = engine._weekly_masks(doctors)
+        self.start = None
+        self.free = np.zeros((0, engine.horizon_days), dtype=np.uint64)
+
+    def _rebuild(self, start):
+        """Recompute free[] for the window starting at date start"""
+        engine = self.engine
+        days = [start + timedelta(days=d) for d in range(engine.horizon_days)]
+        free = self.weekly[:, [day.weekday() for day in days]].copy()
+        day_index = {day.isoformat(): d for d, day in enumerate(days)}
+        for (doctor_id, day), mask in engine.booked.items():
+            pos, d = self.position.get(doctor_id), day_index.get(day)
+            if pos is not None and d is not None:
+                free[pos, d] &= np.uint64(~mask & 0xFFFFFFFFFFFFFFFF)
+        self.start = start
+        self.free = free
+        engine.generation += 1
+
+    def _window(self, now):
+        """free[] for a window that starts today, rolling it forward at midnight"""
+        if self.start != now.date():
+            with self.engine._lock:
+                if self.start != now.date():
+                    self._rebuild(now.date())
+        return self.free
+
+    def _update(self, doctor_id, day):
+        pos = self.position.get(doctor_id)
+        if pos is None or self.start is None:
+            return
+        d = (datetime.strptime(day, '%Y-%m-%d').date() - self.start).days
+        if 0 <= d < self.engine.horizon_days:
+            weekday = (self.start + timedelta(days=d)).weekday()
+            booked = self.engine.booked.get((doctor_id, day), 0)
+            self.free[pos, d] = np.uint64(int(self.weekly[pos, weekday]) & ~booked)
+
+    def matches(self, window, now=None):
+        """Boolean array over catalogue positions: has a free slot in window"""
+        now = now or datetime.now()
+        free = self._window(now)
+        now_mask, later_mask = self.engine._now_bits(now)
+        if window == AVAILABLE_NOW:
+            return (free[:, 0] & now_mask) != 0
+        if window == AVAILABLE_TODAY:
+            return (free[:, 0] & later_mask) != 0
+        if window == AVAILABLE_TOMORROW:
+            return free[:, 1] != 0
+        if window == AVAILABLE_THIS_WEEK:
+            return ((free[:, 0] & later_mask) != 0) | (free[:, 1:7] != 0).any(axis=1)
+        raise ValueError(f"Unknown availability window {window!r}")
+
+    def positions(self, window, now=None):
+        """Catalogue positions (ascending) with a free slot in window"""
+        return np.flatnonzero(self.matches(window, now)).tolist()
+
+    def next_free(self, now=None):
+        """Minutes from today's midnight to each doctor's next free slot (-1: none in horizon)"""
+        now = now or datetime.now()
+        free = self._window(now).copy()
+        free[:, 0] &= self.engine._now_bits(now)[1]
+        result = np.full(len(free), -1, dtype=np.int64)
+        for d in range(free.shape[1]):
+            column = free[:, d]
+            todo = (result < 0) & (column != 0)
+            if not todo.any():
+                continue
+            lowest = column[todo] & (~column[todo] + np.uint64(1))
+            slot = np.log2(lowest.astype(np.float64)).astype(np.int64)
+            result[todo] = d * 1440 + slot * self.engine.slot_minutes
+        return result
+
+    def free_slots(self, doctor_id, appointment_date, now=None):
+        """Free 'HH:MM' slot start times for one doctor on one day (None: unknown doctor)"""
+        pos = self.position.get(doctor_id)
+        if pos is None:
+            return None
+        engine = self.engine
+        now = now or datetime.now()
+        day = datetime.strptime(str(appointment_date)[:10], '%Y-%m-%d').date()
+        if day < now.date():
+            return []
+        mask = int(self.weekly[pos, day.weekday()]) & ~engine.booked.get((doctor_id, day.isoformat()), 0)
+        if day == now.date():
+            mask &= int(engine._now_bits(now)[1])
+        return [engine._slot_text(i) for i in range(engine.slots_per_day) if mask >> i & 1]
+
+    def next_free_slot(self, doctor_id, now=None):
+        """'YYYY-MM-DDTHH:MM' of one doctor's next free slot, or None (none in the horizon)"""
+        pos = self.position.get(doctor_id)
+        if pos is None:
+            return None
+        engine = self.engine
+        now = now or datetime.now()
+        free = self._window(now)
+        for d in range(engine.horizon_days):
+            mask = int(free[pos, d]) & (int(engine._now_bits(now)[1]) if d == 0 else -1)
+            if mask:
+                slot = (mask & -mask).bit_length() - 1
+                return f"{(self.start + timedelta(days=d)).isoformat()}T{engine._slot_text(slot)}"
+        return None
+
+class AvailabilityEngine:
+    """Free-slot bitmaps for every doctor over the next horizon_days days.
+
+    A day is a 64-bit word with one bit per slot_minutes slot from midnight
+    (48 bits at the default 30 minutes). Each doctor has a weekly schedule
+    mask per weekday; free[pos, day] is that mask minus the bits booked in
+    `booked` ({(doctor_id, 'YYYY-MM-DD'): mask}). A booking clears one bit
+    in place, and the availability filters are vectorised ANDs over the
+    (doctors, days) array, so nothing is recomputed per request.
+
+    attach() lays the bitmaps out for a catalogue snapshot once, when it is
+    published; the last VIEWS_KEPT views are kept so requests still
+    serving the previous snapshot get positions that match it.
+
+    Bookings made through this process update it immediately; sync()
+    reloads the window from the database to pick up bookings made by other
+    workers. A stale bit only makes a slot look free: the booking itself
+    still fails on the appointments table's unique key.
+    """
+
+    VIEWS_KEPT = 2
+
+    def __init__(self, horizon_days=7, slot_minutes=30):
+        if 1440 // slot_minutes > 64 or 1440 % slot_minutes:
+            raise ValueError('slot_minutes must divide a day into at most 64 slots')
+        self.horizon_days = max(horizon_days, 2)
+        self.slot_minutes = slot_minutes
+        self.slots_per_day = 1440 // slot_minutes
+        self.booked = {}
+        self.generation = 0
+        self.syncs = 0
+        self.last_sync_ms = None
+        self._lock = threading.RLock()
+        self._views = OrderedDict()
+        self._latest = AvailabilityView(self, [])
+        self._sync_task = PeriodicTask('availability-sync', log, 'availability sync failed')
+
+    # ---- schedules and per-snapshot views ----
+
+    def schedule_mask(self, ranges):
+        """Bitmap of the slots fully inside ['HH:MM-HH:MM', ...]"""
+        mask = 0
+        for text in ranges:
+            opens, closes = text.split('-')
+            first = -(-_minutes(opens) // self.slot_minutes)
+            last = _minutes(closes) // self.slot_minutes
+            mask |= _bits(first, min(last, self.slots_per_day))
+        return mask
+
+    def _weekly_masks(self, doctors):
+        """(doctors, 7) schedule masks; each distinct set of hours is parsed once"""
+        rows, parsed = [], {}
+        for doctor in doctors:
+            schedule = doctor.get('schedule')
+            if schedule is None:
+                # Doctors listed as offline take no bookings unless they publish hours
+                schedule = {} if doctor.get('availability') == 'offline' else DEFAULT_SCHEDULE
+            hours = tuple(tuple(schedule.get(day, ())) for day in WEEKDAYS)
+            masks = parsed.get(hours)
+            if masks is None:
+                masks = parsed[hours] = [self.schedule_mask(ranges) for ranges in hours]
+            rows.append(masks)
+        return np.array(rows, dtype=np.uint64).reshape(len(doctors), 7)
+
+    def attach(self, catalog, version=None):
+        """Build and register the view for a newly published catalogue snapshot; booked slots carry over"""
+        view = AvailabilityView(self, catalog.doctors, version)
+        with self._lock:
+            view._rebuild(self._latest.start or datetime.now().date())
+            self._views[version] = view
+            self._views.move_to_end(version)
+            while len(self._views) > self.VIEWS_KEPT:
+                self._views.popitem(last=False)
+            self._latest = view
+        return view
+
+    def view(self, version=None):
+        """The view attached for a snapshot version (the latest if that version has none)"""
+        return self._views.get(version, self._latest)
+
+    # ---- bookings ----
+
+    def _slot(self, appointment_date, appointment_time):
+        day = str(appointment_date)[:10]
+        return day, 1 << (_minutes(str(appointment_time)) // self.slot_minutes)
+
+    def book(self, doctor_id, appointment_date, appointment_time):
+        """Mark one slot as taken (after a successful booking or a 409)"""
+        day, bit = self._slot(appointment_date, appointment_time)
+        with self._lock:
+            self.booked[(doctor_id, day)] = self.booked.get((doctor_id, day), 0) | bit
+            for view in self._views.values():
+                view._update(doctor_id, day)
+            self.generation += 1
+
+    def sync(self, fetch):
+        """Replace booked slots in the window with fetch(first_day, last_day) rows
+
+        fetch returns (doctor_id, 'YYYY-MM-DD', 'HH:MM') for live bookings.
+        """
+        start = datetime.now().date()
+        started = time.perf_counter()
+        rows = fetch(start.isoformat(), (start + timedelta(days=self.horizon_days - 1)).isoformat())
+        booked = {}
+        for doctor_id, day, slot in rows:
+            day, bit = self._slot(day, slot)
+            booked[(doctor_id, day)] = booked.get((doctor_id, day), 0) | bit
+        with self._lock:
+            if booked != self.booked or self._latest.start != start:
+                self.booked = booked
+                for view in self._views.values():
+                    view._rebuild(start)
+        self.syncs += 1
+        self.last_sync_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def watch(self, fetch, interval):
+        """Call sync(fetch) every interval seconds in a background thread (once per process)"""
+        if interval <= 0:
+            return
+        self._sync_task.start(lambda: self.sync(fetch), interval)
+
+    # ---- queries ----
+
+    def _now_bits(self, now):
+        minute = now.hour * 60 + now.minute
+        current = minute // self.slot_minutes
+        later = -(-minute // self.slot_minutes)  # first slot starting at or after now
+        soon = (minute + NOW_WINDOW_MINUTES) // self.slot_minutes
+        return (np.uint64(_bits(current, min(soon, self.slots_per_day - 1) + 1)),
+                np.uint64(_bits(later, self.slots_per_day)))
+
+    def _slot_text(self, i):
+        return f"{i * self.slot_minutes // 60:02d}:{i * self.slot_minutes % 60:02d}"
+
+    def stamp(self, now=None):
+        """Changes whenever filter results may change: a booking, a sync or the clock"""
+        now = now or datetime.now()
+        return (self.generation, now.date().isoformat(),
+                (now.hour * 60 + now.minute) // self.slot_minutes)
+
+    def stats(self):
+        latest = self._latest
+        return {
+            'doctors': len(latest.ids),
+            'catalog_version': latest.version,
+            'window_start': latest.start.isoformat() if latest.start else None,
+            'horizon_days': self.horizon_days,
+            'slot_minutes': self.slot_minutes,
+            'booked_days': len(self.booked),
+            'generation': self.generation,
+            'syncs': self.syncs,
+            'sync_failures': self._sync_task.failures,
+            'last_sync_ms': self.last_sync_ms,
+            'last_error': self._sync_task.last_error
+        }
+
+def create_engine_from_env():
+    """Engine sized by AVAILABILITY_HORIZON_DAYS / AVAILABILITY_SLOT_MINUTES"""
+    return AvailabilityEngine(horizon_days=int(os.getenv('AVAILABILITY_HORIZON_DAYS', 7)),
+                              slot_minutes=int(os.getenv('AVAILABILITY_SLOT_MINUTES', 30)))
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+
+class ProcessThread:
+    """A daemon thread running target, started at most once per process.
+
+    Threads don't survive fork, so start() in a gunicorn worker forked from
+    a preloading master starts that worker's own thread even though the
+    master's object says one was started. prepare(), if given, runs under
+    the lock just before each start, to reset state the thread owns.
+    """
+
+    def __init__(self, target, name, prepare=None):
+        self.target = target
+        self.name = name
+        self.prepare = prepare
+        self.pid = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def running(self):
+        """True once this process has started its thread"""
+        return self._thread is not None and self.pid == os.getpid()
+
+    def start(self, *args):
+        """Start target(*args) unless this process already did; True if started now"""
+        if self.running():
+            return False
+        with self._lock:
+            if self.running():
+                return False
+            if self.prepare is not None:
+                self.prepare()
+            self._thread = threading.Thread(target=self.target, args=args, name=self.name, daemon=True)
+            self.pid = os.getpid()
+            self._thread.start()
+            return True
+
+    def join(self, timeout=None):
+        if self.running():
+            self._thread.join(timeout)
+
+class PeriodicTask:
+    """Calls fn every interval seconds on a ProcessThread (the sync and flush loops).
+
+    A failure is logged to log once per outage rather than every interval:
+    failures counts failed calls, and last_error holds the current outage's
+    error until a call succeeds. interval may be a callable, read before
+    each sleep; with sleep_first the first call waits one interval.
+    """
+
+    def __init__(self, name, log, message, sleep_first=False):
+        self.log = log
+        self.message = message
+        self.sleep_first = sleep_first
+        self.failures = 0
+        self.last_error = None
+        self._thread = ProcessThread(self._run, name)
+
+    def start(self, fn, interval):
+        """Start calling fn in this process, unless already started here"""
+        return self._thread.start(fn, interval)
+
+    def call(self, fn):
+        """fn() with the failure accounting of the loop; True if it succeeded"""
+        try:
+            fn()
+        except Exception as e:
+            self.failures += 1
+            if self.last_error is None:
+                self.log.warning(self.message, extra={'error': f'{type(e).__name__}: {e}'})
+            self.last_error = str(e)
+            return False
+        self.last_error = None
+        return True
+
+    def _run(self, fn, interval):
+        delay = interval if callable(interval) else lambda: interval
+        if self.sleep_first:
+            time.sleep(delay())
+        while True:
+            self.call(fn)
+            time.sleep(delay())
@@ -0,0 +1,130 @@
+"""Concurrent booking stress test for the appointment store.
+
+Fires hundreds of simultaneous /api/book-appointment requests at one
+doctor, date and time through a threaded local server. Exactly one must
+succeed and the rest must get 409. It then books a spread of slots to
+check that distinct slots never conflict, and times the per-doctor, per-day
+booked-slot lookup with its query plan. Runs on the SQLite stand-in by
+default. With --mysql it uses the app's DB_* settings against a local
+MySQL, creating the appointments table if needed.
+Run: python benchmarks/bench_appointments.py [parallel] [--mysql]
+"""
+import json
+import logging
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from werkzeug.serving import make_server
+
+from common import percentile
+import main
+from appointments import APPOINTMENTS_DDL
+from db_pool import ConnectionPool
+from sqlite_db import StandInDatabase
+
+DAY = '2030-01-15'
+
+
+def post(url, payload):
+    req = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                 headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def booking(doctor_id, slot, n):
+    return {'doctorId': doctor_id, 'patientName': f'Patient {n}', 'patientEmail': f'p{n}@example.com',
+            'patientPhone': '+91 90000 00000', 'appointmentDate': DAY, 'appointmentTime': slot}
+
+
+def fire(base_url, payloads):
+    """POST all payloads at once (threads released together); [(status, body)]"""
+    results = [None] * len(payloads)
+    barrier = threading.Barrier(len(payloads))
+
+    def worker(i):
+        barrier.wait()
+        results[i] = post(f'{base_url}/api/book-appointment', payloads[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(payloads))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def benchmark():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    parallel = int(args[0]) if args else 300
+    if '--mysql' in sys.argv:
+        import mysql.connector
+        connect = lambda: mysql.connector.connect(**main.db_config)
+        conn = connect()
+        conn.cursor().execute(APPOINTMENTS_DDL)
+        conn.close()
+        backend = f"MySQL {main.db_config['host']}"
+    else:
+        connect = StandInDatabase().connect
+        backend = 'SQLite stand-in'
+    main.db_pool = ConnectionPool(connect, size=16, max_overflow=16, timeout=60)
+    doctors = main.catalog_manager.snapshot.catalog.doctors
+    if not doctors:
+        sys.exit('No doctors loaded; set DOCTORS_DB_PATH')
+    doctor_id = doctors[0]['id']
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, main.app, threaded=True)
+    server.socket.listen(parallel)  # let every simultaneous connect queue
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    print(f"{backend}, {parallel} parallel requests")
+
+    # Same slot, spelled three ways: exactly one booking may win
+    spellings = ['10:30', '10:30:00', '10:30 AM']
+    start = time.perf_counter()
+    results = fire(base_url, [booking(doctor_id, spellings[n % 3], n) for n in range(parallel)])
+    elapsed = time.perf_counter() - start
+    statuses = [status for status, _ in results]
+    print(f"one slot:    {statuses.count(200)} booked, {statuses.count(409)} x 409, "
+          f"other {len(statuses) - statuses.count(200) - statuses.count(409)}  ({elapsed:.2f} s)")
+    assert statuses.count(200) == 1 and statuses.count(409) == parallel - 1, sorted(set(statuses))
+
+    # Distinct slots (the store's grid over the day, several doctors): none may conflict
+    slots = [f'{h:02d}:{m:02d}' for h in range(8, 20) for m in range(0, 60, main.appointment_store.slot_minutes)]
+    payloads = [booking(doctors[n % min(5, len(doctors))]['id'], slots[(n // 5) % len(slots)], n)
+                for n in range(min(parallel, 5 * len(slots)))]
+    payloads = [p for p in payloads if not (p['doctorId'] == doctor_id and p['appointmentTime'] == '10:30')]
+    results = fire(base_url, payloads)
+    statuses = [status for status, _ in results]
+    ids = {body['appointment']['appointmentId'] for status, body in results if status == 200}
+    print(f"many slots:  {statuses.count(200)}/{len(payloads)} booked, {len(ids)} distinct appointment ids")
+    assert statuses.count(200) == len(payloads) == len(ids)
+
+    lookup_ms = []
+    client = main.app.test_client()
+    for _ in range(200):
+        t0 = time.perf_counter()
+        resp = client.get(f'/api/doctor/{doctor_id}/booked-slots?date={DAY}')
+        lookup_ms.append((time.perf_counter() - t0) * 1000)
+    print(f"booked-slots lookup: {len(resp.get_json()['booked'])} slots, "
+          f"p50 {percentile(lookup_ms, 50):.2f} ms  p99 {percentile(lookup_ms, 99):.2f} ms")
+
+    conn = connect()
+    cursor = conn.cursor()
+    explain = 'EXPLAIN QUERY PLAN ' if '--mysql' not in sys.argv else 'EXPLAIN '
+    cursor.execute(explain + "SELECT appointment_time FROM appointments "
+                   "WHERE doctor_id = %s AND appointment_date = %s AND active = 1", (doctor_id, DAY))
+    print("plan:", cursor.fetchall())
+    conn.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,91 @@
+"""Per-request auth-check cost: Flask cookie session decode vs signed bearer token.
+
+Measures, for the same user:
+- the check alone: the session interface opening the cookie vs
+  TokenAuthority.verify() with a revocation list holding [revoked] entries;
+- the whole GET /profile request under each mode;
+- the revocation list: check cost, measured false-positive rate, and the
+  memory of the Bloom filter vs the exact map it fronts.
+Run: python benchmarks/bench_auth_tokens.py [revoked] [iterations]
+"""
+import gc
+import secrets
+import sys
+import time
+import tracemalloc
+
+from common import percentile
+import main
+from auth_tokens import RevocationList, TokenAuthority
+
+USER = {'id': 4821, 'username': 'priya.sharma', 'email': 'priya.sharma@example.com'}
+
+
+def per_call_us(fn, iterations):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def request_us(client, iterations, **kwargs):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        resp = client.get('/profile', **kwargs)
+        samples.append((time.perf_counter() - start) * 1e6)
+    assert resp.status_code == 200, resp.status_code
+    return percentile(samples, 50)
+
+
+def benchmark():
+    revoked = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    app = main.app
+
+    gc.collect()
+    tracemalloc.start()
+    revocations = RevocationList(capacity=revoked)
+    filter_size, _ = tracemalloc.get_traced_memory()
+    for _ in range(revoked):
+        revocations.add(secrets.token_urlsafe(12), time.time() + 3600)
+    total_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    authority = TokenAuthority({'k0': app.secret_key}, 'k0', revocations=revocations)
+    token = authority.issue(USER)['accessToken']
+
+    cookie = app.session_interface.get_signing_serializer(app).dumps(
+        {'_permanent': True, 'user_id': USER['id'], 'username': USER['username'], 'email': USER['email']})
+    cookie_name = app.config['SESSION_COOKIE_NAME']
+    with app.test_request_context(headers={'Cookie': f'{cookie_name}={cookie}'}) as ctx:
+        session_us = per_call_us(lambda: app.session_interface.open_session(app, ctx.request)['user_id'],
+                                 iterations)
+    token_us = per_call_us(lambda: authority.verify(token)['u'], iterations)
+    print(f"cookie: {len(cookie)} chars   token: {len(token)} chars")
+    print(f"session decode:  {session_us:6.2f} us per check")
+    print(f"token verify:    {token_us:6.2f} us per check  ({revoked} revoked ids held)")
+
+    probes = [secrets.token_urlsafe(12) for _ in range(100000)]
+    check_us = per_call_us(lambda: revocations.is_revoked(probes[0]), iterations)
+    false_positives = sum(p in revocations.filter for p in probes)
+    assert not any(revocations.is_revoked(p) for p in probes)
+    print(f"revocation check: {check_us:5.2f} us; filter false positives {false_positives / len(probes):.2%} "
+          f"(all cleared by the exact map); filter {filter_size / 2 ** 10:.0f} KiB, "
+          f"exact map {(total_size - filter_size) / 2 ** 20:.1f} MiB")
+
+    # Whole requests; main's authority gets the same revocation list
+    main.token_authority = authority
+    main.AUTH_MODE = 'both'
+    main.AVAILABILITY_SYNC_INTERVAL = 0
+    client = app.test_client()
+    n = max(iterations // 10, 200)
+    client.set_cookie(cookie_name, cookie)
+    cookie_p50 = request_us(client, n)
+    client.delete_cookie(cookie_name)
+    bearer_p50 = request_us(client, n, headers={'Authorization': f'Bearer {token}'})
+    print(f"GET /profile p50: session cookie {cookie_p50:.0f} us, bearer token {bearer_p50:.0f} us")
+
+
+if __name__ == '__main__':
+    benchmark()
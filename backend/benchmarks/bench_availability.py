@@ -0,0 +1,131 @@
+"""Availability filters over a large catalogue: per-request recomputation vs bitmaps.
+
+Books a random share of a synthetic catalogue's slots for the coming week,
+then answers every availability window and each doctor's next free slot
+two ways:
+- recompute: walk each doctor's schedule day by day against the set of
+  booked (doctor, date, time) rows, as a request would without an index;
+- engine: the AvailabilityEngine's per-day bitmaps, vectorised.
+The two must agree. Also times one incremental booking against attaching
+a snapshot from scratch, and GET /api/doctors?availability=... with a
+booking between requests, so every request misses the response cache.
+Run: python benchmarks/bench_availability.py [doctors] [booked_share]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import percentile, synthetic_catalog
+import main
+from availability import AVAILABILITY_WINDOWS, DEFAULT_SCHEDULE, WEEKDAYS, AvailabilityEngine
+from catalog_manager import CatalogSnapshot
+from doctor_catalog import DoctorCatalog
+
+# A Monday mid-morning, so every window has something to find
+NOW = datetime(2030, 1, 14, 11, 10)
+
+
+def slot_times(engine, ranges):
+    mask = engine.schedule_mask(ranges)
+    return [engine._slot_text(i) for i in range(engine.slots_per_day) if mask >> i & 1]
+
+
+def recompute(engine, catalog, booked, now):
+    """{window: positions} and next free slot per doctor, from schedules and booked rows"""
+    today, clock = now.date(), now.strftime('%H:%M')
+    soon = (now + timedelta(minutes=60)).strftime('%H:%M')
+    current = engine._slot_text((now.hour * 60 + now.minute) // engine.slot_minutes)
+    windows = {w: [] for w in AVAILABILITY_WINDOWS}
+    next_free = []
+    for pos, doctor in enumerate(catalog.doctors):
+        schedule = doctor.get('schedule') or ({} if doctor['availability'] == 'offline' else DEFAULT_SCHEDULE)
+        free_days = []
+        for d in range(engine.horizon_days):
+            day = today + timedelta(days=d)
+            taken = booked.get((doctor['id'], day.isoformat()), ())
+            free = [t for t in slot_times(engine, schedule.get(WEEKDAYS[day.weekday()], []))
+                    if t not in taken and (d > 0 or t >= clock or t == current)]
+            free_days.append(free)
+        first = [t for t in free_days[0] if t >= clock]
+        if any(current <= t <= soon for t in free_days[0]):
+            windows[AVAILABILITY_WINDOWS[0]].append(pos)
+        if first:
+            windows[AVAILABILITY_WINDOWS[1]].append(pos)
+        if free_days[1]:
+            windows[AVAILABILITY_WINDOWS[2]].append(pos)
+        if first or any(free_days[1:7]):
+            windows[AVAILABILITY_WINDOWS[3]].append(pos)
+        upcoming = [d * 1440 + int(day[0][:2]) * 60 + int(day[0][3:])
+                    for d, day in enumerate([first] + free_days[1:]) if day]
+        next_free.append(upcoming[0] if upcoming else -1)
+    return windows, next_free
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, percentile(samples, 50)
+
+
+def benchmark():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.4
+    rng = random.Random(7)
+    catalog = DoctorCatalog(synthetic_catalog(n))
+    engine = AvailabilityEngine()
+    view = engine.attach(catalog)
+
+    # Book a random share of every scheduled slot in the week
+    rows = []
+    for pos, doctor in enumerate(catalog.doctors):
+        for d in range(engine.horizon_days):
+            day = NOW.date() + timedelta(days=d)
+            mask = int(view.weekly[pos, day.weekday()])
+            for i in range(engine.slots_per_day):
+                if mask >> i & 1 and rng.random() < share:
+                    rows.append((doctor['id'], day.isoformat(), engine._slot_text(i)))
+    booked = {}
+    for doctor_id, day, slot in rows:
+        booked.setdefault((doctor_id, day), set()).add(slot)
+        engine.book(doctor_id, day, slot)
+    print(f"{n} doctors, {len(rows)} booked slots over {engine.horizon_days} days ({share:.0%} of schedule)")
+
+    (slow_windows, slow_next), slow_ms = timed(lambda: recompute(engine, catalog, booked, NOW), 3)
+    print(f"recompute per request:   {slow_ms:8.2f} ms  (all windows + next free slot)")
+    for window in AVAILABILITY_WINDOWS:
+        positions, ms = timed(lambda: view.positions(window, NOW), 50)
+        assert positions == slow_windows[window], window
+        print(f"engine {window + ':':<21} {ms:8.3f} ms  {len(positions):6d} doctors")
+    next_free, ms = timed(lambda: view.next_free(NOW), 50)
+    assert next_free.tolist() == slow_next
+    print(f"engine next free slot:   {ms:8.3f} ms  (all doctors)")
+
+    doctor_id = catalog.doctors[0]['id']
+    _, book_ms = timed(lambda: engine.book(doctor_id, NOW.date().isoformat(), '18:30'), 1000)
+    rebuild = AvailabilityEngine()
+    rebuild.booked = engine.booked
+    _, rebuild_ms = timed(lambda: rebuild.attach(catalog), 3)
+    print(f"incremental booking:     {book_ms:8.4f} ms   vs attaching a snapshot {rebuild_ms:.1f} ms")
+
+    # The route, with a booking between requests so each one misses the response cache
+    main.catalog_manager.snapshot = CatalogSnapshot(catalog, main.build_response_cache(catalog))
+    main.availability_engine = engine
+    main.AVAILABILITY_SYNC_INTERVAL = 0  # no MySQL to sync from here
+    client = main.app.test_client()
+    samples = []
+    for k in range(50):
+        engine.book(catalog.doctors[k]['id'], (NOW.date() + timedelta(days=2)).isoformat(), '12:30')
+        start = time.perf_counter()
+        resp = client.get('/api/doctors?availability=Available This Week&limit=20')
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"GET /api/doctors?availability=Available This Week&limit=20 after a booking: "
+          f"p50 {percentile(samples, 50):.2f} ms  ({resp.headers['X-Total-Count']} matches; "
+          f"uses the wall clock, not {NOW:%a %H:%M})")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,41 @@
+"""Compare /predict/batch throughput against looping over /predict.
+
+Run from anywhere: python benchmarks/bench_batch_predict.py [rows]
+"""
+import contextlib
+import io
+import random
+import sys
+import time
+
+from common import random_patient
+from main import app
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rng = random.Random(42)
+    patients = [random_patient(rng) for _ in range(rows)]
+    client = app.test_client()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        single = [client.post('/predict', json=p).get_json() for p in patients]
+        loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = client.post('/predict/batch', json=patients).get_json()
+    batch_seconds = time.perf_counter() - start
+
+    mismatches = sum(
+        1 for s, b in zip(single, batch['results']) if s['prediction'] != b['prediction']
+    )
+    print(f"rows:               {rows}")
+    print(f"/predict loop:      {rows / loop_seconds:10.1f} rows/sec ({loop_seconds:.3f}s)")
+    print(f"/predict/batch:     {rows / batch_seconds:10.1f} rows/sec ({batch_seconds:.3f}s)")
+    print(f"speedup:            {loop_seconds / batch_seconds:10.1f}x")
+    print(f"label mismatches:   {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""/health latency while concurrent logins saturate bcrypt.
+
+Serves the app from a threaded local server on the SQLite stand-in, runs
+login clients flat out and probes /health alongside them. Compares inline
+hashing (BCRYPT_WORKERS=0) with the bounded pool.
+Run: python benchmarks/bench_bcrypt_pool.py [login_clients] [seconds] [rounds]
+"""
+import json
+import logging
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import bcrypt
+from werkzeug.serving import make_server
+
+from common import percentile
+import main
+from db_pool import ConnectionPool
+from password_hashing import PasswordHasher
+from sqlite_db import StandInDatabase
+
+
+def post(url, payload):
+    req = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                 headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def run(label, hasher, base_url, clients, seconds):
+    main.password_hasher = hasher
+    stop = threading.Event()
+    statuses = []
+    health_ms = []
+
+    def login_client():
+        while not stop.is_set():
+            status = post(f'{base_url}/login', {'email': 'load@example.com', 'password': 'secret123'})
+            statuses.append(status)
+            if status == 503:
+                time.sleep(0.1)  # clients back off on 503, as the frontend would
+
+    def prober():
+        while not stop.is_set():
+            start = time.perf_counter()
+            urllib.request.urlopen(f'{base_url}/health', timeout=30).read()
+            health_ms.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_client) for _ in range(clients)]
+    threads.append(threading.Thread(target=prober))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    ok = statuses.count(200)
+    busy = statuses.count(503)
+    print(f"{label:<22} logins ok {ok / seconds:6.1f}/s  503s {busy:5d}   "
+          f"/health p50 {percentile(health_ms, 50):7.1f} ms  p99 {percentile(health_ms, 99):7.1f} ms")
+    stats = hasher.stats()
+    if stats['workers']:
+        print(f"{'':<22} verify p99 {stats['verify'].get('p99_ms')} ms, "
+              f"queue wait p99 {stats['queue_wait'].get('p99_ms')} ms")
+
+
+def benchmark():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    db = StandInDatabase()
+    db.add_users([('load', 'load@example.com',
+                   bcrypt.hashpw(b'secret123', bcrypt.gensalt(rounds=rounds)).decode())])
+    main.db_pool = ConnectionPool(db.connect, size=clients + 2, max_overflow=0)
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, main.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    print(f"{clients} login clients, bcrypt cost {rounds}, {seconds:.0f}s per run")
+
+    run('baseline (no logins)', PasswordHasher(rounds=rounds, workers=0), base_url, 0, seconds)
+    run('inline bcrypt', PasswordHasher(rounds=rounds, workers=0), base_url, clients, seconds)
+    run('pool: 1 worker, q 4', PasswordHasher(rounds=rounds, workers=1, max_queue=4),
+        base_url, clients, seconds)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,105 @@
+"""database.json hot reload: full vs diff-applied rebuilds, and serving during a swap.
+
+Writes a synthetic catalogue to a temp file and drives CatalogManager
+directly. It times the initial load, a reload where a handful of doctors
+change (only they are re-indexed via DoctorCatalog.apply and unaffected
+pinned responses are carried over), a reload of a reordered file
+(everything rebuilt) and a corrupt file (old version keeps serving). Then it reloads while client threads page through
+/api/doctors and checks every response matches exactly one published
+version (its X-Total-Count is one of the versions' Gynecologist counts).
+Run: python benchmarks/bench_catalog_reload.py [doctors] [changed]
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from common import percentile, synthetic_catalog
+import main
+from catalog_manager import CatalogManager
+
+
+def write(path, data):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+
+
+def timed_reload(label, manager):
+    previous = manager.snapshot.responses
+    start = time.perf_counter()
+    manager.reload()
+    snapshot = manager.snapshot
+    pinned = list(snapshot.responses._pinned)
+    reused = sum(1 for key in pinned if previous is not None and previous.pinned(key) is snapshot.responses.pinned(key))
+    print(f"{label:<28} {(time.perf_counter() - start) * 1000:8.0f} ms   version {snapshot.version}   "
+          f"changed {len(snapshot.changed) if snapshot.changed is not None else 'all':>5}   "
+          f"pinned reused {reused}/{len(pinned)}   {'incremental' if snapshot.incremental else 'full build'}")
+
+
+def benchmark():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    changed = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    data = synthetic_catalog(n)
+    path = os.path.join(tempfile.mkdtemp(), 'database.json')
+    write(path, data)
+
+    manager = CatalogManager(path, main.build_response_cache, poll_interval=0)
+    timed_reload('initial load', manager)
+
+    # Only dermatologists change, so the other specialties' responses carry over
+    derm = [d for d in data['doctors'] if d['specialty'] == 'Dermatologist'][:changed]
+    for d in derm:
+        d['consultationFee'] += 100
+    write(path, data)
+    timed_reload(f'{changed} dermatologists edited', manager)
+
+    data['doctors'].reverse()
+    write(path, data)
+    timed_reload('reordered file', manager)
+
+    version = manager.snapshot.version
+    with open(path, 'w') as f:
+        f.write('{"doctors": [')
+    manager.check()
+    assert manager.snapshot.version == version and manager.failures == 1
+    print(f"{'corrupt file':<28} kept version {version}: {manager.last_error}")
+
+    # Serve while reloading: every response must come from one snapshot
+    main.catalog_manager = manager
+    write(path, data)
+    manager.reload()
+    valid_totals = {sum(d['specialty'] == 'Gynecologist' for d in data['doctors']) + k for k in range(4)}
+    stop = threading.Event()
+    latencies, errors = [], []
+
+    def client():
+        c = main.app.test_client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            resp = c.get('/api/doctors?specialty=Gynecologist&limit=20')
+            latencies.append((time.perf_counter() - start) * 1000)
+            if int(resp.headers['X-Total-Count']) not in valid_totals or len(resp.get_json()) != 20:
+                errors.append(resp.headers['X-Total-Count'])
+
+    threads = [threading.Thread(target=client) for _ in range(4)]
+    for t in threads:
+        t.start()
+    reloads = 0
+    for fee in range(3):
+        data['doctors'][0]['consultationFee'] = fee
+        data['doctors'].append(dict(data['doctors'][0], id=10 ** 9 + fee, specialty='Gynecologist'))
+        write(path, data)
+        reloads += manager.reload()
+    stop.set()
+    for t in threads:
+        t.join()
+    print(f"{reloads} reloads under load: {len(latencies)} requests, p50 {percentile(latencies, 50):.1f} ms, "
+          f"p99 {percentile(latencies, 99):.1f} ms, inconsistent {len(errors)}")
+    assert not errors
+
+
+if __name__ == '__main__':
+    benchmark()
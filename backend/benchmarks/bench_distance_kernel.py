@@ -0,0 +1,74 @@
+"""DistanceKernel vs the scalar calculate_distance loop.
+
+For 1k, 10k and 100k synthetic doctors: one origin with a maxDistance mask
+and top-k, and a 100-patient batch of nearest-k lookups. Also reports how
+closely the vectorised distances agree with the scalar ones.
+Run: python benchmarks/bench_distance_kernel.py [sizes ...]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from common import CITIES, synthetic_catalog
+from geo_distance import DistanceKernel
+from geo_index import calculate_distance
+
+K = 10
+MAX_KM = 25
+PATIENTS = 100
+
+
+def scalar_nearest(lats, lons, lat, lon, max_km, k):
+    hits = []
+    for pos in range(len(lats)):
+        distance = calculate_distance(lat, lon, lats[pos], lons[pos])
+        if max_km is None or distance <= max_km:
+            hits.append((distance, pos))
+    hits.sort()
+    return hits[:k]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def benchmark():
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 10000, 100000]
+    rng = random.Random(11)
+    patients = []
+    for _ in range(PATIENTS):
+        _, _, lat, lon, _ = rng.choice(CITIES)
+        patients.append((lat + rng.uniform(-0.2, 0.2), lon + rng.uniform(-0.2, 0.2)))
+    p_lats = [p[0] for p in patients]
+    p_lons = [p[1] for p in patients]
+
+    print(f"{'doctors':>8} {'1 origin loop':>14} {'kernel':>9} {'100 origins loop':>17} {'kernel':>9}"
+          f" {'max |diff| km':>14} {'rounding flips':>15}")
+    for n in sizes:
+        doctors = synthetic_catalog(n)['doctors']
+        lats = [d['location']['latitude'] for d in doctors]
+        lons = [d['location']['longitude'] for d in doctors]
+        kernel = DistanceKernel(lats, lons)
+        lat, lon = patients[0]
+
+        _, loop_one = timed(lambda: scalar_nearest(lats, lons, lat, lon, MAX_KM, K))
+        _, kern_one = timed(lambda: kernel.within(lat, lon, MAX_KM, k=K))
+        expected, loop_many = timed(lambda: [scalar_nearest(lats, lons, a, b, None, K) for a, b in patients])
+        actual, kern_many = timed(lambda: kernel.nearest_many(p_lats, p_lons, K))
+
+        flips = sum(
+            [(d, p) for d, p in exp] != list(zip(dist.tolist(), pos.tolist()))
+            for exp, (pos, dist) in zip(expected, actual)
+        )
+        scalar = np.array([calculate_distance(lat, lon, a, b) for a, b in zip(lats, lons)])
+        diff = np.abs(np.round(kernel.distances(lat, lon), 2) - scalar).max()
+        print(f"{n:>8} {loop_one:11.2f} ms {kern_one:6.2f} ms {loop_many:14.1f} ms {kern_many:6.1f} ms"
+              f" {diff:14.3g} {flips:>9}/{PATIENTS}")
+
+
+if __name__ == '__main__':
+    benchmark()
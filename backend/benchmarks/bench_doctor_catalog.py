@@ -0,0 +1,69 @@
+"""DoctorCatalog lookups and filters vs the original list scans.
+
+Builds a synthetic catalogue, checks DoctorCatalog returns exactly what the
+old list comprehensions did, and reports per-call latency for both.
+Run: python benchmarks/bench_doctor_catalog.py [doctors]
+"""
+import random
+import sys
+import time
+
+from common import synthetic_catalog
+from doctor_catalog import DoctorCatalog
+
+
+def legacy_get(data, doctor_id):
+    return next((d for d in data['doctors'] if d['id'] == doctor_id), None)
+
+
+def legacy_filter(data, specialty=None, city=None):
+    doctors = data['doctors']
+    if city:
+        doctors = [d for d in doctors if d['location']['city'].lower() == city.lower()]
+    if specialty and specialty != 'all':
+        doctors = [d for d in doctors if d['specialty'] == specialty]
+    return doctors
+
+
+QUERIES = [
+    {},
+    {'specialty': 'Gynecologist'},
+    {'city': 'Mumbai'},
+    {'specialty': 'Dermatologist', 'city': 'Mumbai'},
+]
+# Full-text search is ranked and covers more fields; see bench_doctor_search.py;
+# availability windows come from the availability engine, see bench_availability.py
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def benchmark():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    data = synthetic_catalog(n)
+    start = time.perf_counter()
+    catalog = DoctorCatalog(data)
+    print(f"{n} doctors, catalogue built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    rng = random.Random(1)
+    ids = [rng.randint(1, n) for _ in range(200)]
+    assert all(legacy_get(data, i) is catalog.get(i) for i in ids)
+    legacy_ms = timed(lambda: [legacy_get(data, i) for i in ids], 1) / len(ids)
+    new_ms = timed(lambda: [catalog.get(i) for i in ids], 100) / len(ids)
+    print(f"{'get by id':<58} {legacy_ms:9.4f} ms -> {new_ms:9.6f} ms")
+
+    for query in QUERIES:
+        expected = legacy_filter(data, **query)
+        actual = catalog.filter(**query)
+        assert [d['id'] for d in actual] == [d['id'] for d in expected], query
+        legacy_ms = timed(lambda: legacy_filter(data, **query), 5)
+        new_ms = timed(lambda: catalog.filter(**query), 5)
+        print(f"{str(query):<58} {legacy_ms:9.3f} ms -> {new_ms:9.3f} ms  ({len(actual)} hits)")
+
+
+if __name__ == '__main__':
+    benchmark()
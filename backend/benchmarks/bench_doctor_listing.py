@@ -0,0 +1,81 @@
+"""Peak RSS and time-to-first-byte of /api/doctors listings on a large catalogue.
+
+Serves the app from a local threaded server with the response cache off,
+so every request builds its body. Compares the whole list as one JSON
+array with a 100-doctor cursor page, NDJSON streaming and a projection of
+only the fields the map view needs. Peak RSS comes from VmHWM, which is
+reset before each request through /proc/self/clear_refs (Linux only). The
+client reads and discards the body in 64 KiB chunks, so it adds almost
+nothing to the peak.
+Run: python benchmarks/bench_doctor_listing.py [doctors]
+"""
+import gc
+import http.client
+import logging
+import sys
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from common import synthetic_catalog
+import main
+from catalog_manager import CatalogSnapshot
+from doctor_catalog import DoctorCatalog
+
+CASES = [
+    ('full JSON array', '/api/doctors', {}),
+    ('cursor page (100)', '/api/doctors?limit=100', {}),
+    ('NDJSON stream', '/api/doctors?format=ndjson', {}),
+    ('NDJSON, map fields', '/api/doctors?format=ndjson&fields=id,name,location', {}),
+    ('JSON, map fields', '/api/doctors?fields=id,name,location', {}),
+]
+
+
+def vm_kib(key):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(key + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def measure(port, path, headers):
+    gc.collect()
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+    before = vm_kib('VmRSS')
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    start = time.perf_counter()
+    conn.request('GET', path, headers=headers)
+    resp = conn.getresponse()
+    first = resp.read(1)
+    ttfb = time.perf_counter() - start
+    size = len(first)
+    while True:
+        chunk = resp.read(65536)
+        if not chunk:
+            break
+        size += len(chunk)
+    total = time.perf_counter() - start
+    conn.close()
+    return ttfb * 1000, total * 1000, size, (vm_kib('VmHWM') - before) / 1024
+
+
+def benchmark():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    catalog = DoctorCatalog(synthetic_catalog(n))
+    main.catalog_manager.snapshot = CatalogSnapshot(catalog, None, version='bench')
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, main.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"{n} doctors, response cache off, RSS {vm_kib('VmRSS') / 1024:.0f} MiB after load")
+    for label, path, headers in CASES:
+        ttfb, total, size, peak = measure(server.server_port, path, headers)
+        print(f"{label:<22} TTFB {ttfb:8.1f} ms   total {total:8.1f} ms   "
+              f"{size / 2 ** 20:7.1f} MiB   peak RSS +{peak:6.1f} MiB")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    benchmark()
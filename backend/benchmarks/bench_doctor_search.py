@@ -0,0 +1,63 @@
+"""Inverted-index search vs the substring scan, replaying keystrokes.
+
+Simulates the doctor finder typing queries one character at a time against
+a synthetic catalogue. For single-word queries it checks that every doctor
+the old scan found is also returned by the index (which additionally
+searches services, languages and city, and ranks the results).
+Run: python benchmarks/bench_doctor_search.py [doctors]
+"""
+import sys
+import time
+
+from common import percentile, synthetic_catalog
+from doctor_catalog import DoctorCatalog
+
+TYPED = ['priya sharma', 'gynec', 'infertility mumbai', 'derm pune', 'lotus', 'kannada', 'xyzzy']
+
+
+def legacy_search(doctors, search):
+    search = search.lower()
+    return [d for d in doctors if
+            search in d['name'].lower() or
+            search in d['specialty'].lower() or
+            search in d['clinic'].lower()]
+
+
+def benchmark():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    data = synthetic_catalog(n)
+    start = time.perf_counter()
+    catalog = DoctorCatalog(data)
+    index = catalog.search_index
+    print(f"{n} doctors, catalogue + search index built in {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"({len(index.vocabulary)} tokens, {len(index.grams)} n-grams)")
+
+    keystrokes = [word[:i] for word in TYPED for i in range(1, len(word) + 1)]
+    old_ms, new_ms, page_ms = [], [], []
+    for query in keystrokes:
+        start = time.perf_counter()
+        expected = legacy_search(catalog.doctors, query)
+        old_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        ranked = catalog.filter(search=query)
+        new_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        catalog.filter(search=query, specialty='Gynecologist', city='Mumbai')[:20]
+        page_ms.append((time.perf_counter() - start) * 1000)
+
+        if query.isalnum():
+            missing = {d['id'] for d in expected} - {d['id'] for d in ranked}
+            assert not missing, (query, sorted(missing)[:5])
+
+    print(f"{len(keystrokes)} keystroke queries")
+    print(f"substring scan        p50 {percentile(old_ms, 50):8.2f} ms  p99 {percentile(old_ms, 99):8.2f} ms")
+    print(f"inverted index        p50 {percentile(new_ms, 50):8.2f} ms  p99 {percentile(new_ms, 99):8.2f} ms")
+    print(f"index + filters, p.1  p50 {percentile(page_ms, 50):8.2f} ms  p99 {percentile(page_ms, 99):8.2f} ms")
+    top = catalog.filter(search='priya sharma')[:3]
+    print("top hits for 'priya sharma':", [(d['name'], d['location']['city']) for d in top])
+
+
+if __name__ == '__main__':
+    benchmark()
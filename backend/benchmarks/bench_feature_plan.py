@@ -0,0 +1,143 @@
+"""Check FeaturePlan against the original dict + DataFrame preprocessing.
+
+Verifies the encoded rows are identical and reports per-request latency of
+both paths. Run: python benchmarks/bench_feature_plan.py [requests]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import random_patient
+from feature_plan import PATIENT_FILE_NO
+from main import model, preprocess_input
+
+
+def legacy_encode_categorical(value, feature_name):
+    blood_group_map = {
+        'A+': 1, 'A-': 2, 'B+': 3, 'B-': 4,
+        'AB+': 5, 'AB-': 6, 'O+': 7, 'O-': 8,
+        '': 0, None: 0
+    }
+    cycle_map = {'R': 0, 'I': 1, '': 0, None: 0}
+    yn_map = {'Y': 1, 'N': 0, '': 0, None: 0}
+
+    if feature_name == 'Blood Group':
+        return blood_group_map.get(value, 0)
+    elif feature_name == 'Cycle(R/I)':
+        return cycle_map.get(value, 0)
+    elif feature_name in ['Pregnant(Y/N)', 'Weight gain(Y/N)', 'hair growth(Y/N)',
+                          'Skin darkening (Y/N)', 'Hair loss(Y/N)', 'Pimples(Y/N)',
+                          'Fast food (Y/N)', 'Reg.Exercise(Y/N)']:
+        return yn_map.get(value, 0)
+    return value
+
+
+def legacy_preprocess_input(data):
+    """The pre-FeaturePlan implementation from main.py, kept as the reference.
+
+    Patient File No. is pinned to PATIENT_FILE_NO as FeaturePlan now does;
+    the original drew np.random.randint(1000, 9999) on every call.
+    """
+    features = {
+        'Sl. No': 1,
+        'Patient File No.': PATIENT_FILE_NO,
+        ' Age (yrs)': float(data.get('age', 25)),
+        'Weight (Kg)': float(data.get('weight', 60)),
+        'Height(Cm) ': float(data.get('height', 160)),
+        'BMI': float(data.get('bmi', 23.4)),
+        'Blood Group': data.get('bloodGroup', ''),
+        'Pulse rate(bpm) ': float(data.get('pulseRate', 72)),
+        'RR (breaths/min)': float(data.get('respiratoryRate', 16)),
+        'Hb(g/dl)': float(data.get('hb', 12.5)),
+        'Cycle(R/I)': data.get('cycle', 'R'),
+        'Cycle length(days)': float(data.get('cycleLength', 28)),
+        'Marraige Status (Yrs)': float(data.get('marriageStatus', 0)),
+        'Pregnant(Y/N)': data.get('pregnant', 'N'),
+        'No. of aborptions': float(data.get('abortions', 0)),
+        ' I beta-HCG(mIU/mL)': float(data.get('betaHCG1', 0)) if data.get('betaHCG1') else 0,
+        'II beta-HCG(mIU/mL)': float(data.get('betaHCG2', 0)) if data.get('betaHCG2') else 0,
+        'FSH(mIU/mL)': float(data.get('fsh', 5.0)) if data.get('fsh') else 5.0,
+        'LH(mIU/mL)': float(data.get('lh', 4.0)) if data.get('lh') else 4.0,
+        'FSH/LH': 0,
+        'Hip(inch)': float(data.get('hip', 36)),
+        'Waist(inch)': float(data.get('waist', 28)),
+        'Waist:Hip Ratio': 0,
+        'TSH (mIU/L)': float(data.get('tsh', 2.5)) if data.get('tsh') else 2.5,
+        'AMH(ng/mL)': float(data.get('amh', 3.0)) if data.get('amh') else 3.0,
+        'PRL(ng/mL)': float(data.get('prl', 15.0)) if data.get('prl') else 15.0,
+        'Vit D3 (ng/mL)': float(data.get('vitD3', 30.0)) if data.get('vitD3') else 30.0,
+        'PRG(ng/mL)': float(data.get('prg', 10.0)) if data.get('prg') else 10.0,
+        'RBS(mg/dl)': float(data.get('rbs', 95)) if data.get('rbs') else 95,
+        'Weight gain(Y/N)': 'Y' if data.get('weightGain', 0) == 1 else 'N',
+        'hair growth(Y/N)': 'Y' if data.get('hairGrowth', 0) == 1 else 'N',
+        'Skin darkening (Y/N)': 'Y' if data.get('skinDarkening', 0) == 1 else 'N',
+        'Hair loss(Y/N)': 'Y' if data.get('hairLoss', 0) == 1 else 'N',
+        'Pimples(Y/N)': 'Y' if data.get('pimples', 0) == 1 else 'N',
+        'Fast food (Y/N)': 'Y' if data.get('fastFood', 0) == 1 else 'N',
+        'Reg.Exercise(Y/N)': 'Y' if data.get('regExercise', 0) == 1 else 'N',
+        'BP _Systolic (mmHg)': float(data.get('bpSystolic', 120)),
+        'BP _Diastolic (mmHg)': float(data.get('bpDiastolic', 80)),
+        'Follicle No. (L)': float(data.get('follicleNoL', 10)) if data.get('follicleNoL') else 10,
+        'Follicle No. (R)': float(data.get('follicleNoR', 10)) if data.get('follicleNoR') else 10,
+        'Avg. F size (L) (mm)': float(data.get('avgFSizeL', 5.0)) if data.get('avgFSizeL') else 5.0,
+        'Avg. F size (R) (mm)': float(data.get('avgFSizeR', 5.0)) if data.get('avgFSizeR') else 5.0,
+        'Endometrium (mm)': float(data.get('endometrium', 8.0)) if data.get('endometrium') else 8.0
+    }
+
+    if features['Waist(inch)'] > 0 and features['Hip(inch)'] > 0:
+        features['Waist:Hip Ratio'] = features['Waist(inch)'] / features['Hip(inch)']
+    else:
+        features['Waist:Hip Ratio'] = 0.78
+
+    if features['LH(mIU/mL)'] > 0:
+        features['FSH/LH'] = features['FSH(mIU/mL)'] / features['LH(mIU/mL)']
+    else:
+        features['FSH/LH'] = 1.25
+
+    encoded_features = {k: legacy_encode_categorical(v, k) for k, v in features.items()}
+    df = pd.DataFrame([encoded_features])
+    df = df[model.feature_names_in_]
+    return df.astype(float)
+
+
+def edge_cases():
+    """Payloads exercising defaults, falsy values and the derived-feature fallbacks"""
+    return [
+        {},
+        {'lh': 0, 'fsh': 0, 'waist': 0, 'hip': 0},
+        {'waist': -1, 'hip': 30, 'pregnant': 'Y', 'bloodGroup': 'AB-', 'cycle': 'I'},
+        {'bloodGroup': 'unknown', 'cycle': None, 'pregnant': '', 'weightGain': True},
+        {'age': '31', 'betaHCG1': '5.5', 'tsh': '', 'regExercise': 1},
+    ]
+
+
+def time_per_call(fn, payloads):
+    start = time.perf_counter()
+    for payload in payloads:
+        fn(payload)
+    return (time.perf_counter() - start) / len(payloads) * 1e6
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(7)
+    payloads = edge_cases() + [random_patient(rng) for _ in range(requests)]
+
+    for payload in payloads:
+        expected = legacy_preprocess_input(payload)
+        actual = preprocess_input(payload)
+        assert actual.dtype == np.float64 and actual.flags['C_CONTIGUOUS']
+        np.testing.assert_array_equal(actual, expected.to_numpy())
+    print(f"identical output:   {len(payloads)} payloads")
+
+    legacy_us = time_per_call(legacy_preprocess_input, payloads)
+    row_us = time_per_call(preprocess_input, payloads)
+    print(f"legacy dict+frame:  {legacy_us:8.1f} us/request")
+    print(f"feature plan:       {row_us:8.1f} us/request ({legacy_us / row_us:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""/predict throughput and tail latency as concurrent clients scale, with the
+model in every web worker vs in the batching inference service.
+
+Each mode runs gunicorn with the shipped gunicorn.conf.py:
+- worker: each gunicorn worker holds the model and predicts on its
+  inference pool (INFERENCE_WORKERS), one row per predict_proba;
+- service: INFERENCE_SERVICE=1, workers send rows over a Unix socket to
+  INFERENCE_PROCESSES model processes that micro-batch them
+  (INFERENCE_MAX_BATCH rows, INFERENCE_MAX_WAIT_MS).
+For each client count, closed-loop keep-alive clients POST random patients
+for [seconds]. The prediction cache is off. RSS is summed over the
+gunicorn master, its workers and the service processes.
+Run: python benchmarks/bench_inference_service.py [seconds] [clients,clients,...]
+"""
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from common import BACKEND_DIR, percentile, random_patient
+from load_test import DOCTORS_DB_PATH, Connection
+
+MODES = {
+    'worker': {'INFERENCE_SERVICE': '0'},
+    'service': {'INFERENCE_SERVICE': '1'},
+}
+
+
+async def run_clients(port, clients, seconds):
+    latencies, errors = [], [0]
+    deadline = time.monotonic() + seconds
+
+    async def client(n):
+        rng = random.Random(n)
+        conn = Connection('127.0.0.1', port)
+        try:
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    status = await conn.request('POST', '/predict', random_patient(rng))
+                except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                    await conn.close()
+                    errors[0] += 1
+                    continue
+                if status == 200:
+                    latencies.append((time.perf_counter() - start) * 1000)
+                else:
+                    errors[0] += 1
+        finally:
+            await conn.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(clients)))
+    return len(latencies) / (time.perf_counter() - start), latencies, errors[0]
+
+
+def tree_rss_mb(root_pid):
+    """RSS of root_pid and all its descendants"""
+    pids, total = [root_pid], 0
+    while pids:
+        pid = pids.pop()
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+            with open(f'/proc/{pid}/task/{pid}/children') as f:
+                pids.extend(int(child) for child in f.read().split())
+        except (OSError, StopIteration):
+            pass
+    return total / 1024
+
+
+def start_gunicorn(mode):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, PORT=str(port), DOCTORS_DB_PATH=DOCTORS_DB_PATH, PREDICT_CACHE_SIZE='0',
+               AVAILABILITY_SYNC_INTERVAL='0', EMAIL_CACHE_ENABLED='0', **MODES[mode])
+    env.pop('INFERENCE_SERVICE_SOCKET', None)
+    env.pop('INFERENCE_SERVICE_PID', None)
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'main:app'],
+                            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 120
+    body = json.dumps(random_patient(random.Random(0))).encode()
+    while True:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=5) as s:
+                s.sendall(b'POST /predict HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n'
+                          b'Connection: close\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body))
+                if s.recv(64).startswith(b'HTTP/1.1 200'):
+                    return proc, port
+        except OSError:
+            pass
+        if proc.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError(f'gunicorn ({mode}) did not start')
+        time.sleep(0.5)
+
+
+def benchmark():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    counts = [int(c) for c in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1, 4, 16, 64, 256]
+    print(f"POST /predict, {seconds:g} s per step, {os.cpu_count()} CPU(s), "
+          f"WEB_CONCURRENCY={os.getenv('WEB_CONCURRENCY', 'default')}, "
+          f"INFERENCE_PROCESSES={os.getenv('INFERENCE_PROCESSES', 'default')}")
+    print(f"{'mode':<8} {'clients':>7} {'req/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'RSS MB':>7}")
+    for mode in MODES:
+        proc, port = start_gunicorn(mode)
+        try:
+            asyncio.run(run_clients(port, 8, 2))  # warm up every worker
+            for clients in counts:
+                throughput, latencies, errors = asyncio.run(run_clients(port, clients, seconds))
+                print(f"{mode:<8} {clients:7d} {throughput:7.0f} {percentile(latencies, 50):8.1f} "
+                      f"{percentile(latencies, 99):8.1f} {errors:7d} {tree_rss_mb(proc.pid):7.0f}")
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,175 @@
+"""/predict throughput: the old per-request prints vs structured async logging.
+
+Each mode runs a threaded server in its own interpreter with stdout piped
+to this process (as under a process manager or container runtime) and
+PYTHONUNBUFFERED=1, then [clients] threads POST [requests] random patients:
+- prints: the previous predict(), two print() calls per request,
+  reproduced by wrapping preprocess_input;
+- info: LOG_LEVEL=INFO, the debug record is rejected by level;
+- debug 1%: LOG_LEVEL=DEBUG with LOG_DEBUG_SAMPLE_RATE=0.01;
+- debug all: LOG_LEVEL=DEBUG, every request queues a JSON record.
+Modes alternate over [rounds] rounds and the median is reported. Before
+that, the per-request cost of each logging path is timed directly, writing
+to a drained pipe, inside a /predict request context.
+Run: python benchmarks/bench_logging.py [requests] [clients] [rounds]
+"""
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from common import percentile, random_patient
+
+MODES = {
+    'prints': {'LOG_LEVEL': 'INFO'},
+    'info': {'LOG_LEVEL': 'INFO'},
+    'debug 1%': {'LOG_LEVEL': 'DEBUG', 'LOG_DEBUG_SAMPLE_RATE': '0.01'},
+    'debug all': {'LOG_LEVEL': 'DEBUG', 'LOG_DEBUG_SAMPLE_RATE': '1'},
+}
+
+
+def serve(mode, port):
+    """Runs in the server interpreter"""
+    import logging
+    from werkzeug.serving import make_server
+    import main
+    main.AVAILABILITY_SYNC_INTERVAL = 0
+    main.email_registry = None
+    if mode == 'prints':
+        preprocess_input = main.preprocess_input
+
+        def printing_preprocess(data):
+            input_row = preprocess_input(data)
+            print(f"Input shape: {input_row.shape}")
+            print(f"Input dtypes: {input_row.dtype}")
+            return input_row
+        main.preprocess_input = printing_preprocess
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', port, main.app, threaded=True)
+    server.socket.listen(128)
+    print('ready', flush=True)
+    server.serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def run_mode(mode, n, clients):
+    port = free_port()
+    env = dict(os.environ, PYTHONUNBUFFERED='1', PREDICT_CACHE_SIZE='0', METRICS_ENABLED='0', **MODES[mode])
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', mode, str(port)],
+                            env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    log_lines = [0]
+    for line in proc.stdout:
+        if line.startswith('ready'):
+            break
+
+    def drain():
+        for _ in proc.stdout:
+            log_lines[0] += 1
+    threading.Thread(target=drain, daemon=True).start()
+
+    url = f'http://127.0.0.1:{port}/predict'
+    rng = random.Random(11)
+    bodies = [json.dumps(random_patient(rng)).encode() for _ in range(n)]
+    latencies = []
+    lock = threading.Lock()
+    next_index = [0]
+
+    def client():
+        while True:
+            with lock:
+                i = next_index[0]
+                next_index[0] += 1
+            if i >= n:
+                return
+            req = urllib.request.Request(url, data=bodies[i], headers={'Content-Type': 'application/json'})
+            start = time.perf_counter()
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                resp.read()
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+    for body in bodies[:50]:  # warm up
+        urllib.request.urlopen(urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})).read()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    time.sleep(0.5)
+    proc.terminate()
+    proc.wait(timeout=30)
+    return n / elapsed, percentile(latencies, 50), percentile(latencies, 99), log_lines[0]
+
+
+def per_call_us(fn, iterations=20000):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def call_costs():
+    """us per request spent logging, for each path, on the request thread"""
+    import logging
+    from flask import Flask
+    from structured_logging import configure_logging_from_env
+    read_fd, write_fd = os.pipe()
+    threading.Thread(target=lambda: [None for _ in iter(lambda: os.read(read_fd, 65536), b'')],
+                     daemon=True).start()
+    out = open(write_fd, 'w', buffering=1)  # a write() per line, like PYTHONUNBUFFERED=1
+    costs = {}
+    for mode in MODES:
+        os.environ.update({'LOG_DEBUG_SAMPLE_RATE': '1', **MODES[mode]})
+        app = Flask(f'bench-{len(costs)}')
+        app.add_url_rule('/predict', 'predict', lambda: '', methods=['POST'])
+        handler = configure_logging_from_env(app, f'bench-logging-{len(costs)}')
+        handler.stream = out
+        handler.max_pending = 10 ** 6
+        log = logging.getLogger(f'bench-logging-{len(costs)}')
+        with app.test_request_context('/predict', method='POST'):
+            app.preprocess_request()  # runs the route-noting hook
+            if mode == 'prints':
+                costs[mode] = per_call_us(lambda: (print("Input shape: (1, 43)", file=out),
+                                                   print("Input dtypes: float64", file=out)))
+            else:
+                costs[mode] = per_call_us(lambda: log.debug('predict input',
+                                                            extra={'shape': (1, 43), 'dtype': 'float64'}))
+        handler.close()
+    return costs
+
+
+def benchmark():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    costs = call_costs()
+    results = {mode: [] for mode in MODES}
+    for _ in range(rounds):
+        for mode in MODES:
+            results[mode].append(run_mode(mode, n, clients))
+    print(f"{n} POST /predict x {rounds} rounds, {clients} client threads, stdout piped")
+    print(f"{'mode':<10} {'log us/req':>10} {'req/s':>7} {'p50 ms':>7} {'p99 ms':>7} {'log lines':>10}")
+    for mode, runs in results.items():
+        throughput, p50, p99, lines = sorted(runs)[len(runs) // 2]
+        print(f"{mode:<10} {costs[mode]:10.2f} {throughput:7.0f} {p50:7.2f} {p99:7.2f} {lines:10d}")
+
+
+if __name__ == '__main__':
+    if '--serve' in sys.argv:
+        serve(sys.argv[-2], int(sys.argv[-1]))
+    else:
+        benchmark()
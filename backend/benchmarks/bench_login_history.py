@@ -0,0 +1,58 @@
+"""Login latency and DB round-trips per 1,000 logins: inline vs batched history.
+
+Runs /login against the SQLite stand-in with a simulated per-statement
+network latency, first writing login_history inline on the request path,
+then through LoginHistoryWriter.
+Run: python benchmarks/bench_login_history.py [logins] [query_ms]
+"""
+import sys
+import time
+
+import bcrypt
+
+from common import percentile
+from db_pool import ConnectionPool
+from login_history import LoginHistoryWriter
+import main
+from sqlite_db import StandInDatabase, round_trips
+
+
+def run(label, db, logins):
+    client = main.app.test_client()
+    written_before = db.count('login_history')
+    trips_before = round_trips()
+    latencies = []
+    for i in range(logins):
+        start = time.perf_counter()
+        resp = client.post('/login', json={'email': 'user@example.com', 'password': 'secret123'},
+                           headers={'User-Agent': 'bench/1.0'})
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 200
+    if main.login_history_writer is not None:
+        main.login_history_writer.close()
+    trips = round_trips() - trips_before
+    written = db.count('login_history') - written_before
+    print(f"{label:<8} p50 {percentile(latencies, 50):6.2f} ms  p99 {percentile(latencies, 99):6.2f} ms  "
+          f"round-trips/1k logins {trips * 1000 / logins:7.0f}  rows written {written}")
+
+
+def benchmark():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    query_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    db = StandInDatabase(query_latency=query_ms / 1000)
+    db.add_users([('user', 'user@example.com',
+                   bcrypt.hashpw(b'secret123', bcrypt.gensalt(rounds=4)).decode())])
+    main.db_pool = ConnectionPool(db.connect, size=4, ping_interval=30)
+    main.password_hasher.rounds = 4
+    print(f"{logins} logins, {query_ms} ms simulated per statement")
+
+    main.login_history_writer = None
+    run('inline', db, logins)
+    main.login_history_writer = LoginHistoryWriter(main.get_db_connection, batch_size=200,
+                                                   flush_interval=0.5)
+    run('batched', db, logins)
+    print(f"writer: {main.login_history_writer.stats()}")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,75 @@
+"""Logins per second with and without the DB connection pool.
+
+Uses the SQLite stand-in with a simulated connect handshake (default 20 ms,
+a typical TCP + auth + session setup against a remote MySQL) and drives
+/login from concurrent threads. bcrypt runs at cost 4 so the DB path is
+what is being measured.
+Run: python benchmarks/bench_login_pool.py [threads] [logins] [connect_ms]
+"""
+import sys
+import threading
+import time
+
+import bcrypt
+
+from common import percentile
+from db_pool import ConnectionPool
+import main
+from sqlite_db import StandInDatabase
+
+USERS = 50
+
+
+def run(label, logins, threads):
+    latencies = []
+    lock = threading.Lock()
+    per_thread = logins // threads
+
+    def worker(offset):
+        client = main.app.test_client()
+        local = []
+        for i in range(per_thread):
+            n = (offset + i) % USERS
+            start = time.perf_counter()
+            resp = client.post('/login', json={'email': f'user{n}@example.com', 'password': 'secret123'})
+            local.append(time.perf_counter() - start)
+            assert resp.status_code == 200, resp.get_json()
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(t * per_thread,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    ms = [x * 1000 for x in latencies]
+    print(f"{label:<10} {len(latencies) / elapsed:9.1f} logins/s   "
+          f"p50 {percentile(ms, 50):6.1f} ms   p99 {percentile(ms, 99):6.1f} ms")
+
+
+def benchmark():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    logins = int(sys.argv[2]) if len(sys.argv) > 2 else 800
+    connect_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    db = StandInDatabase(connect_latency=connect_ms / 1000)
+    hashed = bcrypt.hashpw(b'secret123', bcrypt.gensalt(rounds=4)).decode()
+    db.add_users((f'user{n}', f'user{n}@example.com', hashed) for n in range(USERS))
+
+    print(f"{threads} threads, {logins} logins, {connect_ms:.0f} ms simulated connect")
+    main.mysql.connector.connect = db.connect
+    main.db_pool = None
+    opened = db.connections_opened
+    run('no pool', logins, threads)
+    print(f"{'':<10} connections opened: {db.connections_opened - opened}")
+
+    main.db_pool = ConnectionPool(db.connect, size=threads, max_overflow=0)
+    opened = db.connections_opened
+    run('pooled', logins, threads)
+    print(f"{'':<10} connections opened: {db.connections_opened - opened}   pool: {main.db_pool.stats()}")
+
+
+if __name__ == '__main__':
+    benchmark()
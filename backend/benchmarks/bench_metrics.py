@@ -0,0 +1,171 @@
+"""Cost of the /metrics instrumentation, and a check that it sums across workers.
+
+- observation cost: one request-histogram observation and one stage()
+  block, and the cost of a scrape;
+- request overhead: p50 of the same requests through the Flask test
+  client, with the instrumentation switched off for every other request;
+- gunicorn: N requests spread over several workers, then /metrics must
+  report exactly N for the route, whichever worker answers the scrape
+  (once the workers have flushed, METRICS_FLUSH_INTERVAL).
+Run: python benchmarks/bench_metrics.py [workers] [requests]
+"""
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from common import BACKEND_DIR, percentile, random_patient
+
+DOCTORS_DB_PATH = os.path.join(os.path.dirname(BACKEND_DIR), 'Frontend', 'templates', 'database.json')
+ROUTES = [
+    ('GET /api/specialties', 'get', '/api/specialties', None),
+    ('GET /api/doctors?specialty=..', 'get', '/api/doctors?specialty=Gynecologist', None),
+    ('GET /api/doctor/<id>', 'get', '/api/doctor/3', None),
+    ('POST /predict', 'post', '/predict', 'patient'),
+]
+
+
+def per_call_us(fn, iterations):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def request_overhead(iterations=1500):
+    """p50 per route with the instrumentation switched on and off in turns.
+
+    Same process and same warmed caches for both; off removes the hooks,
+    the jsonify() timer and main.metrics (stage timers, DB proxies).
+    """
+    import random
+    from flask.json.provider import DefaultJSONProvider
+    import main
+    main.AVAILABILITY_SYNC_INTERVAL = 0
+    main.email_registry = None  # no background MySQL retries adding noise
+    app, metrics = main.app, main.metrics
+    start_timer = app.before_request_funcs[None][0]
+    record_latency = next(f for f in app.after_request_funcs[None] if f.__name__ == 'record_latency')
+    timed_json, plain_json = app.json, DefaultJSONProvider(app)
+
+    def switch(on):
+        main.metrics = metrics if on else None
+        app.json = timed_json if on else plain_json
+        if on:
+            app.before_request_funcs[None].insert(0, start_timer)
+            app.after_request_funcs[None].append(record_latency)
+        else:
+            app.before_request_funcs[None].remove(start_timer)
+            app.after_request_funcs[None].remove(record_latency)
+
+    client = app.test_client()
+    rng = random.Random(7)
+    results = {}
+    for label, method, path, body in ROUTES:
+        samples = {True: [], False: []}
+        for i in range(iterations * 2):
+            on = i % 2 == 0
+            if not on:
+                switch(False)
+            kwargs = {'json': random_patient(rng)} if body == 'patient' else {}
+            start = time.perf_counter()
+            resp = getattr(client, method)(path, **kwargs)
+            samples[on].append((time.perf_counter() - start) * 1e6)
+            assert resp.status_code == 200, (path, resp.status_code)
+            if not on:
+                switch(True)
+        results[label] = (percentile(samples[False], 50), percentile(samples[True], 50))
+    return results
+
+
+def scrape(port):
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=10) as resp:
+        return resp.read().decode()
+
+
+def gunicorn_check(workers, n, metrics_dir):
+    import socket
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), METRICS_DIR=metrics_dir,
+               DOCTORS_DB_PATH=DOCTORS_DB_PATH, AVAILABILITY_SYNC_INTERVAL='0')
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'main:app'],
+                            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 120
+        while True:
+            try:
+                scrape(port)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
+        for _ in range(n):
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/specialties', timeout=10) as resp:
+                resp.read()
+        time.sleep(2)  # let every worker flush
+        files = [name for name in os.listdir(metrics_dir) if name.endswith('.json')]
+        pattern = re.compile(r'gynai_http_request_duration_seconds_count\{[^}]*route="/api/specialties"'
+                             r'[^}]*status="200"[^}]*\} (\S+)')
+        counts, scrape_ms = [], []
+        for _ in range(20):
+            start = time.perf_counter()
+            text = scrape(port)
+            scrape_ms.append((time.perf_counter() - start) * 1000)
+            counts.append(float(pattern.search(text).group(1)))
+        series = sum(1 for line in text.splitlines() if line and not line.startswith('#'))
+        print(f"gunicorn, {workers} workers ({len(files)} wrote metric files): {n} requests, "
+              f"/metrics reported {sorted(set(counts))} over 20 scrapes; "
+              f"scrape p50 {percentile(scrape_ms, 50):.1f} ms for {series} series")
+        assert set(counts) == {float(n)}, counts
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def benchmark():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    workers = int(args[0]) if args else 3
+    n = int(args[1]) if len(args) > 1 else 600
+
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        from metrics import Metrics
+        metrics = Metrics(multiprocess_dir=metrics_dir)
+        for route in range(40):
+            for status in (200, 400, 404):
+                metrics.observe_request(f'/route{route}', 'GET', status, 0.001)
+        observe_us = per_call_us(lambda: metrics.observe_request('/api/doctors', 'GET', 200, 0.0042), 50000)
+
+        def block():
+            with metrics.stage('doctor_filter'):
+                pass
+        stage_us = per_call_us(block, 50000)
+        for _ in range(3):  # as if three more workers had flushed
+            metrics.flush()
+            metrics._file = None  # the next flush starts a new file
+        render_start = time.perf_counter()
+        body, _ = metrics.render()
+        render_ms = (time.perf_counter() - render_start) * 1000
+        print(f"{len(metrics.buckets)} buckets, {metrics.buckets[0] * 1e6:.0f} us to {metrics.buckets[-1]:.0f} s")
+        print(f"request observation: {observe_us:.2f} us   stage() block: {stage_us:.2f} us   "
+              f"scrape of 4 workers x 121 series: {render_ms:.1f} ms ({len(body) // 1024} KiB)")
+
+    os.environ.update(DOCTORS_DB_PATH=DOCTORS_DB_PATH, PREDICT_CACHE_SIZE='0', METRICS_ENABLED='1')
+    os.environ.pop('METRICS_DIR', None)
+    print(f"{'request p50 (test client)':<32} {'off':>8} {'on':>8} {'overhead':>9}")
+    for label, (off, on) in request_overhead().items():
+        print(f"{label:<32} {off:6.0f}us {on:6.0f}us {on - off:+7.1f}us")
+
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        gunicorn_check(workers, n, metrics_dir)
+
+
+if __name__ == '__main__':
+    benchmark()
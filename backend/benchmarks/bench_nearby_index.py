@@ -0,0 +1,71 @@
+"""GeoIndex radius / nearest-k queries vs the per-request Haversine loop.
+
+Checks that results (ids, distances and order) are identical to the old
+scan-and-sort on a synthetic catalogue and reports p50/p99 latency.
+Run: python benchmarks/bench_nearby_index.py [doctors] [queries]
+"""
+import random
+import sys
+import time
+
+from common import CITIES, percentile, synthetic_catalog
+from doctor_catalog import DoctorCatalog
+from geo_index import calculate_distance
+
+
+def legacy_nearby(doctors, user_lat, user_lon, max_distance):
+    nearby_doctors = []
+    for doctor in doctors:
+        distance = calculate_distance(user_lat, user_lon,
+                                      doctor['location']['latitude'], doctor['location']['longitude'])
+        if distance <= max_distance:
+            doctor_copy = doctor.copy()
+            doctor_copy['distance'] = distance
+            nearby_doctors.append(doctor_copy)
+    nearby_doctors.sort(key=lambda x: x['distance'])
+    return nearby_doctors
+
+
+def latency(fn, origins):
+    samples = []
+    for lat, lon in origins:
+        start = time.perf_counter()
+        fn(lat, lon)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentile(samples, 50), percentile(samples, 99)
+
+
+def benchmark():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    data = synthetic_catalog(n)
+    start = time.perf_counter()
+    catalog = DoctorCatalog(data)
+    print(f"{n} doctors, catalogue + index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+    doctors = catalog.doctors
+
+    rng = random.Random(3)
+    origins = []
+    for _ in range(queries):
+        _, _, lat, lon, _ = rng.choice(CITIES)
+        origins.append((lat + rng.uniform(-0.2, 0.2), lon + rng.uniform(-0.2, 0.2)))
+
+    for radius in (5, 10, 25):
+        for lat, lon in origins[:10]:
+            expected = [(d['distance'], d['id']) for d in legacy_nearby(doctors, lat, lon, radius)]
+            actual = [(dist, doctors[p]['id']) for dist, p in catalog.geo.within(lat, lon, radius)]
+            assert actual == expected, (lat, lon, radius)
+            top = [(dist, doctors[p]['id']) for dist, p in catalog.geo.nearest(lat, lon, 20, max_km=radius)]
+            assert top == expected[:20], (lat, lon, radius)
+
+        old = latency(lambda lat, lon: legacy_nearby(doctors, lat, lon, radius), origins)
+        new = latency(lambda lat, lon: catalog.geo.within(lat, lon, radius), origins)
+        top = latency(lambda lat, lon: catalog.geo.nearest(lat, lon, 20, max_km=radius), origins)
+        print(f"radius {radius:>3} km  loop p50 {old[0]:7.2f} p99 {old[1]:7.2f} ms | "
+              f"index p50 {new[0]:6.2f} p99 {new[1]:6.2f} ms | "
+              f"top-20 p50 {top[0]:5.2f} p99 {top[1]:5.2f} ms")
+    print("results identical to the loop for every checked query")
+
+
+if __name__ == '__main__':
+    benchmark()
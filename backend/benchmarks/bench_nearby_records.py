@@ -0,0 +1,78 @@
+"""Allocations of /api/doctors/nearby serialisation: dict copies vs spliced records.
+
+For a wide-radius query on a synthetic catalogue, compares the old path
+(doctor.copy() plus distance for every match, then jsonify) with
+DoctorRecords.array_with() over the (distance, position) hits. Reports
+time, tracemalloc peak and young-generation GC runs, and checks the two
+bodies are identical.
+Also reports the one-off memory that the pre-serialised records add to
+the catalogue.
+Run: python benchmarks/bench_nearby_records.py [doctors] [radius_km]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from common import synthetic_catalog
+import main
+from doctor_catalog import DoctorCatalog
+from doctor_records import DoctorRecords
+
+ORIGIN = (19.0760, 72.8777)  # Mumbai
+
+
+def legacy(catalog, hits):
+    doctors = catalog.doctors
+    nearby_doctors = []
+    for distance, pos in hits:
+        doctor_copy = doctors[pos].copy()
+        doctor_copy['distance'] = distance
+        nearby_doctors.append(doctor_copy)
+    return main.jsonify(nearby_doctors).get_data()
+
+
+def records(catalog, hits):
+    return main.app.response_class(catalog.records.array_with(hits), mimetype='application/json').get_data()
+
+
+def measure(label, fn, catalog, hits, repeat=5):
+    body = fn(catalog, hits)  # warm up
+    gc.collect()
+    collections = gc.get_stats()[0]['collections']
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(catalog, hits)
+    elapsed = (time.perf_counter() - start) / repeat
+    collections = (gc.get_stats()[0]['collections'] - collections) / repeat
+
+    tracemalloc.start()
+    fn(catalog, hits)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<20} {elapsed * 1000:8.1f} ms   peak {peak / 2 ** 20:7.1f} MiB   gen0 GCs {collections:6.1f}")
+    return body
+
+
+def benchmark():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    radius = float(sys.argv[2]) if len(sys.argv) > 2 else 500
+    catalog = DoctorCatalog(synthetic_catalog(n))
+    hits = catalog.geo.within(ORIGIN[0], ORIGIN[1], radius)
+    print(f"{n} doctors, {len(hits)} within {radius:.0f} km of Mumbai")
+
+    with main.app.app_context():
+        old = measure('copy + jsonify', legacy, catalog, hits)
+        new = measure('spliced records', records, catalog, hits)
+    assert old == new, 'bodies differ'
+
+    gc.collect()
+    tracemalloc.start()
+    kept = DoctorRecords(catalog.doctors)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"pre-serialised records for the whole catalogue: {size / 2 ** 20:.1f} MiB, built once per snapshot ({len(kept)} doctors)")
+
+
+if __name__ == '__main__':
+    benchmark()
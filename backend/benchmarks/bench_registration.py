@@ -0,0 +1,139 @@
+"""Concurrent registration stress test.
+
+Seeds a local database with existing users, warms the email registry from
+it, and fires simultaneous POST /register requests through a threaded
+local server:
+- race: many clients register the same new email at once. Exactly one
+  may succeed and the rest must get 400;
+- duplicates: existing emails, with and without the registry. Counts the
+  bcrypt hashes spent on requests that can only fail;
+- new users: distinct new emails. Counts DB round trips per registration.
+Runs on the SQLite stand-in by default. With --mysql it uses the app's
+DB_* settings against a local MySQL, where the users must already exist.
+BCRYPT_ROUNDS defaults to 6 here to keep the run short, and the hash
+queue is opened up so no request is shed with 503.
+Run: python benchmarks/bench_registration.py [parallel] [seed_users] [--mysql]
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+os.environ.setdefault('BCRYPT_ROUNDS', '6')
+os.environ.setdefault('BCRYPT_MAX_QUEUE', '100000')
+
+from werkzeug.serving import make_server
+
+import common  # noqa: F401  (puts backend/ on sys.path)
+import main
+from db_pool import ConnectionPool
+from email_registry import EmailRegistry
+from sqlite_db import StandInDatabase, round_trips
+
+
+def post(url, payload):
+    req = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                 headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def fire(base_url, payloads):
+    """POST all payloads to /register at once (threads released together); [(status, body)]"""
+    results = [None] * len(payloads)
+    barrier = threading.Barrier(len(payloads))
+
+    def worker(i):
+        barrier.wait()
+        results[i] = post(f'{base_url}/register', payloads[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(payloads))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def account(name, email=None):
+    return {'username': name, 'email': email or f'{name}@example.com', 'password': 'correct-horse'}
+
+
+def phase(label, base_url, payloads):
+    hashes = main.password_hasher.stats()['hash']['count']
+    trips = round_trips()
+    start = time.perf_counter()
+    results = fire(base_url, payloads)
+    elapsed = time.perf_counter() - start
+    statuses = [status for status, _ in results]
+    hashes = main.password_hasher.stats()['hash']['count'] - hashes
+    trips = round_trips() - trips
+    print(f"{label:<28} {statuses.count(201):4d} x 201  {statuses.count(400):4d} x 400  "
+          f"other {len(statuses) - statuses.count(201) - statuses.count(400):3d}   bcrypt {hashes:4d}   "
+          f"{trips / len(payloads):4.1f} round trips each   {elapsed:5.2f} s")
+    return statuses, hashes
+
+
+def benchmark():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    parallel = int(args[0]) if args else 100
+    seed = int(args[1]) if len(args) > 1 else 20000
+    if '--mysql' in sys.argv:
+        import mysql.connector
+        connect = lambda: mysql.connector.connect(**main.db_config)
+        conn = connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT email FROM users ORDER BY id LIMIT %s", (parallel,))
+        existing = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        backend = f"MySQL {main.db_config['host']} (round trips not counted)"
+    else:
+        db = StandInDatabase()
+        db.add_users((f'seed{n}', f'seed{n}@example.com', 'x' * 60) for n in range(seed))
+        connect = db.connect
+        existing = [f'seed{n}@example.com' for n in range(parallel)]
+        backend = f'SQLite stand-in, {seed} existing users'
+    main.db_pool = ConnectionPool(connect, size=16, max_overflow=16, timeout=120)
+    registry = EmailRegistry(lambda: main.get_db_connection(), capacity=max(seed * 2, 1000))
+    registry.sync()
+    print(f"{backend}; registry warmed in {registry.warm_ms} ms ({registry.filter.size_bytes / 2 ** 10:.0f} KiB), "
+          f"{parallel} parallel requests, bcrypt rounds {main.password_hasher.rounds}")
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    main.AVAILABILITY_SYNC_INTERVAL = 0
+    main.EMAIL_CACHE_SYNC_INTERVAL = 0
+    server = make_server('127.0.0.1', 0, main.app, threaded=True)
+    server.socket.listen(parallel)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    tag = int(time.time())
+
+    main.email_registry = registry
+    statuses, _ = phase('race, one new email', base_url,
+                        [account(f'race{tag}x{n}', f'race{tag}@example.com') for n in range(parallel)])
+    assert statuses.count(201) == 1 and statuses.count(400) == parallel - 1, sorted(set(statuses))
+
+    main.email_registry = None
+    statuses, without = phase('duplicates, no registry', base_url,
+                              [account(f'dupa{tag}x{n}', email) for n, email in enumerate(existing)])
+    assert statuses.count(400) == len(existing)
+    main.email_registry = registry
+    statuses, with_registry = phase('duplicates, registry', base_url,
+                                    [account(f'dupb{tag}x{n}', email) for n, email in enumerate(existing)])
+    assert statuses.count(400) == len(existing) and with_registry == 0
+
+    statuses, _ = phase('new users, registry', base_url, [account(f'new{tag}x{n}') for n in range(parallel)])
+    assert statuses.count(201) == parallel
+    print(f"registry: {registry.stats()['maybe_existing']} of {registry.stats()['checks']} checks needed a lookup")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,106 @@
+"""Catalogue endpoint throughput and bytes on the wire, with and without the response cache.
+
+Serves the app from a threaded local server over a synthetic catalogue
+and replays the doctor finder's page-load mix (/api/specialties,
+/api/availability-options, the unfiltered list, a specialty filter and a
+search) from concurrent clients. Runs: serialising per request (the old
+behaviour), cached bodies, cached + gzip, and polling clients that send
+If-None-Match and get 304s.
+Run: python benchmarks/bench_response_cache.py [doctors] [clients] [seconds]
+"""
+import logging
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from werkzeug.serving import make_server
+
+from common import percentile, synthetic_catalog
+import main
+from catalog_manager import CatalogSnapshot
+from doctor_catalog import DoctorCatalog
+
+PATHS = [
+    '/api/specialties',
+    '/api/availability-options',
+    '/api/doctors',
+    '/api/doctors?specialty=Gynecologist',
+    '/api/doctors?availability=Available+Now',
+    '/api/doctors?search=pcos&limit=20',
+]
+
+
+def fetch(url, headers):
+    req = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return resp.status, len(resp.read()), resp.headers.get('ETag')
+    except urllib.error.HTTPError as e:
+        return e.code, len(e.read()), e.headers.get('ETag')
+
+
+def run(label, catalog, cached, base_url, clients, seconds, gzip=False, revalidate=False):
+    responses = main.build_response_cache(catalog) if cached else None
+    main.catalog_manager.snapshot = CatalogSnapshot(catalog, responses)
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies, sizes, statuses = [], [], []
+
+    def client(offset):
+        etags = {}
+        local_ms, local_sizes, local_status = [], [], []
+        i = offset
+        while not stop.is_set():
+            path = PATHS[i % len(PATHS)]
+            i += 1
+            headers = {'Accept-Encoding': 'gzip'} if gzip else {'Accept-Encoding': 'identity'}
+            if revalidate and path in etags:
+                headers['If-None-Match'] = etags[path]
+            start = time.perf_counter()
+            status, size, etag = fetch(base_url + path, headers)
+            local_ms.append((time.perf_counter() - start) * 1000)
+            local_sizes.append(size)
+            local_status.append(status)
+            if etag:
+                etags[path] = etag
+        with lock:
+            latencies.extend(local_ms)
+            sizes.extend(local_sizes)
+            statuses.extend(local_status)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    not_modified = statuses.count(304)
+    print(f"{label:<22} {len(latencies) / seconds:8.1f} req/s   p50 {percentile(latencies, 50):6.1f} ms   "
+          f"p99 {percentile(latencies, 99):7.1f} ms   {sum(sizes) / len(sizes) / 1024:8.1f} KiB/resp   "
+          f"304s {not_modified / len(statuses):4.0%}")
+
+
+def benchmark():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    catalog = DoctorCatalog(synthetic_catalog(n))
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, main.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    print(f"{n} doctors, {clients} clients, {seconds:.0f}s per run")
+
+    run('jsonify per request', catalog, False, base_url, clients, seconds)
+    run('cached', catalog, True, base_url, clients, seconds)
+    run('cached + gzip', catalog, True, base_url, clients, seconds, gzip=True)
+    run('cached + If-None-Match', catalog, True, base_url, clients, seconds, gzip=True, revalidate=True)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    benchmark()
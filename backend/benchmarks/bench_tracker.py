@@ -0,0 +1,119 @@
+"""Load benchmark for symptom tracker storage and the dashboard summary.
+
+Bulk-uploads a synthetic daily history for every user (as the tracker's
+local history would be synced), then:
+- appends one more day per sampled user (the everyday write);
+- fetches the dashboard data both ways: the whole history and aggregated
+  client-side, as dashboard.js does today, vs one summary() over the
+  rollup tables.
+It checks that the rollup averages match the full-history aggregation.
+The default is 100k users x 2 years. That is 73M rows, so on the SQLite
+stand-in pass smaller sizes. With --mysql it uses the app's DB_* settings
+and creates the tracker tables if needed.
+Run: python benchmarks/bench_tracker.py [users] [days] [--mysql]
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from common import percentile
+import main
+from sqlite_db import StandInDatabase, round_trips
+from tracker_store import BLEEDING, MOODS, SCALES, TRACKER_DDL, TrackerStore, _week_start
+
+TODAY = date(2030, 1, 14)
+SAMPLES = 300
+
+
+def history(rng, days):
+    """One user's daily entries, oldest first, with a 26-32 day cycle"""
+    cycle, offset = rng.randint(26, 32), rng.randint(0, 25)
+    entries = []
+    for i in range(days):
+        day = TODAY - timedelta(days=days - i)
+        cycle_day = (i + offset) % cycle
+        entry = {'date': day.isoformat(), 'cycleDay': cycle_day + 1,
+                 'bleeding': BLEEDING[[4, 3, 3, 2, 1][cycle_day]] if cycle_day < 5 else 'none',
+                 'mood': rng.choice(MOODS), 'sleepHours': rng.choice(['6', '6.5', '7', '7.5', '8']),
+                 'symptoms': rng.sample(['bloating', 'acne', 'fatigue', 'cravings'], rng.randint(0, 2))}
+        for key, _ in SCALES:
+            entry[key] = str(rng.randint(0, 10))
+        entries.append(entry)
+    return entries
+
+
+def client_side_week(entries, week_start):
+    """Average pain for one week from the full history, the way the browser would"""
+    week = [e for e in entries if week_start <= date.fromisoformat(e['date']) < week_start + timedelta(days=7)]
+    return round(sum(e['painLevel'] for e in week) / len(week), 2) if week else None
+
+
+def timed(fn):
+    trips = round_trips()
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000, round_trips() - trips
+
+
+def benchmark():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    users = int(args[0]) if args else 100000
+    days = int(args[1]) if len(args) > 1 else 730
+    if '--mysql' in sys.argv:
+        import mysql.connector
+        connect = lambda: mysql.connector.connect(**main.db_config)
+        conn = connect()
+        for ddl in TRACKER_DDL:
+            conn.cursor().execute(ddl)
+        conn.close()
+        backend = f"MySQL {main.db_config['host']}"
+    else:
+        connect = StandInDatabase().connect
+        backend = 'SQLite stand-in'
+    store = TrackerStore(connect)
+    rng = random.Random(19)
+    print(f"{backend}: {users} users x {days} days = {users * days:,} entries")
+
+    upload_ms, upload_trips = [], []
+    start = time.perf_counter()
+    for user_id in range(1, users + 1):
+        entries = history(rng, days)
+        _, ms, trips = timed(lambda: store.save(user_id, entries))
+        upload_ms.append(ms)
+        upload_trips.append(trips)
+        if user_id % max(users // 10, 1) == 0:
+            print(f"  {user_id} users loaded, {user_id * days / (time.perf_counter() - start):,.0f} entries/s")
+    print(f"bulk upload per user ({days} days): p50 {percentile(upload_ms, 50):.1f} ms  "
+          f"p99 {percentile(upload_ms, 99):.1f} ms  {percentile(upload_trips, 50)} round trips")
+
+    sampled = rng.sample(range(1, users + 1), min(SAMPLES, users))
+    append_ms, append_trips = [], []
+    for user_id in sampled:
+        entry = history(rng, 1)[0]
+        entry['date'] = TODAY.isoformat()
+        _, ms, trips = timed(lambda: store.save(user_id, [entry]))
+        append_ms.append(ms)
+        append_trips.append(trips)
+    print(f"append one day:              p50 {percentile(append_ms, 50):.2f} ms  "
+          f"p99 {percentile(append_ms, 99):.2f} ms  {percentile(append_trips, 50)} round trips")
+
+    full_ms, summary_ms = [], []
+    for user_id in sampled:
+        entries, ms, _ = timed(lambda: store.entries(user_id))
+        week = _week_start(TODAY)
+        expected = client_side_week(entries, week)
+        full_ms.append(ms + timed(lambda: client_side_week(entries, week))[1])
+        summary, ms, trips = timed(lambda: store.summary(user_id, today=TODAY))
+        summary_ms.append(ms)
+        assert summary['weekly'][-1]['averages']['painLevel'] == expected, user_id
+        assert summary['cycles']['count'] > 0 or days < 70
+    print(f"dashboard, full history:     p50 {percentile(full_ms, 50):.2f} ms  "
+          f"p99 {percentile(full_ms, 99):.2f} ms  ({len(entries)} rows per user)")
+    print(f"dashboard, summary():        p50 {percentile(summary_ms, 50):.2f} ms  "
+          f"p99 {percentile(summary_ms, 99):.2f} ms  {trips} round trips, "
+          f"{len(summary['weekly']) + len(summary['monthly'])} rollup rows")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,104 @@
+"""Measure gunicorn worker memory and time to first /predict.
+
+Starts `gunicorn main:app` with 1, 4 and 8 workers, with and without
+preload_app, and reports time until /predict first succeeds plus per-worker
+RSS and PSS (proportional set size, which credits shared pages). Linux only.
+Run: python benchmarks/bench_worker_startup.py [workers ...]
+"""
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from common import BACKEND_DIR
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def children_of(pid):
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            pids.append(int(entry))
+    return pids
+
+
+def memory_kb(pid):
+    values = {}
+    for path, keys in ((f'/proc/{pid}/status', ('VmRSS',)), (f'/proc/{pid}/smaps_rollup', ('Pss',))):
+        try:
+            with open(path) as f:
+                for line in f:
+                    name = line.split(':')[0]
+                    if name in keys:
+                        values[name] = int(line.split()[1])
+        except OSError:
+            pass
+    return values.get('VmRSS', 0), values.get('Pss', 0)
+
+
+def wait_for_predict(port, deadline):
+    body = json.dumps({'age': 28, 'bmi': 24.1}).encode()
+    while time.monotonic() < deadline:
+        try:
+            req = urllib.request.Request(f'http://127.0.0.1:{port}/predict', data=body,
+                                         headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(req, timeout=2) as resp:
+                if resp.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def run(workers, preload):
+    port = free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port),
+               GUNICORN_PRELOAD='1' if preload else '0')
+    start = time.monotonic()
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'main:app'], cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ok = wait_for_predict(port, start + 120)
+        first_predict = time.monotonic() - start
+        # Let every worker finish booting (and its first request settle) before sampling
+        deadline = time.monotonic() + 60
+        while len(children_of(proc.pid)) < workers and time.monotonic() < deadline:
+            time.sleep(0.1)
+        for _ in range(workers * 2):
+            wait_for_predict(port, time.monotonic() + 5)
+        samples = [memory_kb(pid) for pid in children_of(proc.pid)]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+    rss = sum(s[0] for s in samples) / max(len(samples), 1) / 1024
+    pss = sum(s[1] for s in samples) / max(len(samples), 1) / 1024
+    status = f"{first_predict:6.2f}s" if ok else "  FAIL"
+    print(f"{workers:>7} {'yes' if preload else 'no':>7} {status:>13} {rss:12.1f} {pss:12.1f}")
+
+
+def main():
+    counts = [int(a) for a in sys.argv[1:]] or [1, 4, 8]
+    print(f"{'workers':>7} {'preload':>7} {'first predict':>13} {'RSS/worker':>12} {'PSS/worker':>12}  (MB)")
+    for workers in counts:
+        for preload in (False, True):
+            run(workers, preload)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Shared setup for the benchmark scripts in this directory.
+
+Importing this module puts backend/ on sys.path and makes it the working
+directory, so main.py finds the model file the same way it does in production.
+"""
+import os
+import random
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+
+
+def random_patient(rng):
+    """A plausible /predict payload drawn from rng (a random.Random)"""
+    return {
+        'age': rng.randint(18, 45),
+        'weight': round(rng.uniform(40, 100), 1),
+        'height': round(rng.uniform(145, 180), 1),
+        'bmi': round(rng.uniform(16, 35), 1),
+        'bloodGroup': rng.choice(BLOOD_GROUPS),
+        'cycle': rng.choice(['R', 'I']),
+        'cycleLength': rng.randint(2, 10),
+        'fsh': round(rng.uniform(1, 12), 2),
+        'lh': round(rng.uniform(1, 10), 2),
+        'amh': round(rng.uniform(0.5, 12), 2),
+        'hip': rng.randint(30, 46),
+        'waist': rng.randint(24, 42),
+        'follicleNoL': rng.randint(1, 20),
+        'follicleNoR': rng.randint(1, 20),
+        'weightGain': rng.randint(0, 1),
+        'hairGrowth': rng.randint(0, 1),
+        'skinDarkening': rng.randint(0, 1),
+        'pimples': rng.randint(0, 1),
+        'fastFood': rng.randint(0, 1),
+    }
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+CITIES = [
+    ('Delhi', 'Delhi', 28.6139, 77.2090, '1100'),
+    ('Gurgaon', 'Haryana', 28.4595, 77.0266, '1220'),
+    ('Mumbai', 'Maharashtra', 19.0760, 72.8777, '4000'),
+    ('Pune', 'Maharashtra', 18.5204, 73.8567, '4110'),
+    ('Bangalore', 'Karnataka', 12.9716, 77.5946, '5600'),
+    ('Chennai', 'Tamil Nadu', 13.0827, 80.2707, '6000'),
+    ('Hyderabad', 'Telangana', 17.3850, 78.4867, '5000'),
+    ('Kolkata', 'West Bengal', 22.5726, 88.3639, '7000'),
+    ('Ahmedabad', 'Gujarat', 23.0225, 72.5714, '3800'),
+    ('Jaipur', 'Rajasthan', 26.9124, 75.7873, '3020'),
+    ('Lucknow', 'Uttar Pradesh', 26.8467, 80.9462, '2260'),
+    ('Chandigarh', 'Punjab', 30.7333, 76.7794, '1600'),
+    ('Kochi', 'Kerala', 9.9312, 76.2673, '6820'),
+    ('Indore', 'Madhya Pradesh', 22.7196, 75.8577, '4520'),
+    ('Bhopal', 'Madhya Pradesh', 23.2599, 77.4126, '4620'),
+    ('Patna', 'Bihar', 25.5941, 85.1376, '8000'),
+]
+FIRST_NAMES = ['Priya', 'Sunita', 'Anjali', 'Meera', 'Kavita', 'Neha', 'Ritu', 'Pooja', 'Asha',
+               'Deepa', 'Lakshmi', 'Rekha', 'Shalini', 'Swati', 'Nandini', 'Farah', 'Aditi']
+LAST_NAMES = ['Sharma', 'Verma', 'Iyer', 'Reddy', 'Gupta', 'Patel', 'Nair', 'Khan', 'Singh',
+              'Mehta', 'Joshi', 'Kulkarni', 'Das', 'Menon', 'Bose', 'Kapoor', 'Rao']
+CLINIC_WORDS = ["Women's Care", 'Skin Solutions', 'Mother & Child', 'Fertility', 'Wellness',
+                'Lotus', 'Sunrise', 'Apollo', 'City', 'Hormone Health', 'Radiance', 'Cloudnine']
+LANGUAGES = ['Hindi', 'English', 'Punjabi', 'Marathi', 'Tamil', 'Telugu', 'Bengali', 'Kannada',
+             'Malayalam', 'Gujarati']
+SERVICES = {
+    'Gynecologist': ['Prenatal Care', 'PCOS Management', 'Infertility Treatment',
+                     'Menopause Management', 'Gynecological Surgery', 'High-Risk Pregnancy'],
+    'Dermatologist': ['Acne Treatment', 'Hair Loss Treatment', 'Hirsutism Treatment',
+                      'Laser Therapy', 'Pigmentation Treatment', 'Cosmetic Dermatology'],
+}
+AVAILABILITY = ['available', 'busy', 'offline']
+NEXT_AVAILABLE = ['Today 2:30 PM', 'Today 5:00 PM', 'Tomorrow 10:00 AM', 'Tomorrow 4:00 PM',
+                  'Monday 11:00 AM']
+
+
+def synthetic_catalog(n, seed=0):
+    """A database.json-shaped catalogue of n doctors spread over Indian cities"""
+    rng = random.Random(seed)
+    doctors = []
+    for doctor_id in range(1, n + 1):
+        city, state, lat, lon, pin_prefix = rng.choice(CITIES)
+        specialty = rng.choice(['Gynecologist', 'Gynecologist', 'Dermatologist'])
+        clinic = f"{rng.choice(CLINIC_WORDS)} Clinic, Sector {rng.randint(1, 80)}, {city}"
+        doctors.append({
+            'id': doctor_id,
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'specialty': specialty,
+            'clinic': clinic,
+            'rating': round(rng.uniform(3.5, 5.0), 1),
+            'reviews': rng.randint(5, 600),
+            'experience': rng.randint(1, 35),
+            'phone': f"+91 9{rng.randint(100000000, 999999999)}",
+            'email': f"doctor{doctor_id}@example.in",
+            'availability': rng.choice(AVAILABILITY),
+            'languages': rng.sample(LANGUAGES, rng.randint(1, 3)),
+            'qualifications': 'MBBS, MD',
+            'location': {
+                'city': city,
+                'state': state,
+                'address': f"Sector {rng.randint(1, 80)}, {city}",
+                'pincode': f"{pin_prefix}{rng.randint(1, 99):02d}",
+                'latitude': round(lat + rng.uniform(-0.3, 0.3), 6),
+                'longitude': round(lon + rng.uniform(-0.3, 0.3), 6),
+            },
+            'consultationFee': rng.choice([500, 600, 800, 1000, 1200, 1500]),
+            'nextAvailable': rng.choice(NEXT_AVAILABLE),
+            'services': rng.sample(SERVICES[specialty], 3),
+        })
+    return {
+        'specialties': ['All Specialties', 'Gynecologist', 'Dermatologist'],
+        'availabilityOptions': ['All Availability', 'Available Now', 'Available Today',
+                                'Available Tomorrow', 'Available This Week'],
+        'doctors': doctors,
+    }
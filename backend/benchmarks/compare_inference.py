@@ -0,0 +1,76 @@
+"""Compare InferenceEngine with the old predict + predict_proba calls.
+
+Loads the rows of pcos.data, runs them through both the two-call DataFrame
+path and the single-pass ndarray path, asserts identical labels and
+confidences, and reports the per-request latency of each.
+Run: python benchmarks/compare_inference.py
+"""
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+import common  # noqa: F401  (puts backend/ on sys.path)
+from main import inference, model
+
+
+def normalise(name):
+    return re.sub(r'\s+', ' ', name).strip()
+
+
+def load_pcos_rows():
+    """pcos.data as a float DataFrame in model column order.
+
+    The spreadsheet export has '#NAME?' in the formula columns, so BMI and the
+    two ratios are recomputed and any other gaps filled with column medians.
+    """
+    raw = pd.read_csv('pcos.data').apply(pd.to_numeric, errors='coerce')
+    raw.columns = [normalise(c) for c in raw.columns]
+    raw['BMI'] = raw['BMI'].fillna(raw['Weight (Kg)'] / (raw['Height(Cm)'] / 100) ** 2)
+    raw['FSH/LH'] = raw['FSH/LH'].fillna(raw['FSH(mIU/mL)'] / raw['LH(mIU/mL)'])
+    raw['Waist:Hip Ratio'] = raw['Waist:Hip Ratio'].fillna(raw['Waist(inch)'] / raw['Hip(inch)'])
+    columns = [normalise(c) for c in model.feature_names_in_]
+    frame = raw[columns].replace([np.inf, -np.inf], np.nan)
+    frame = frame.fillna(frame.median())
+    frame.columns = model.feature_names_in_
+    return frame.astype(float)
+
+
+def two_call(row_df):
+    prediction = model.predict(row_df)[0]
+    try:
+        confidence = float(max(model.predict_proba(row_df)[0]))
+    except Exception:
+        confidence = 0.75
+    return int(prediction), confidence
+
+
+def main():
+    frame = load_pcos_rows()
+    rows = [frame.iloc[[i]] for i in range(len(frame))]
+    arrays = [np.ascontiguousarray(r.to_numpy()) for r in rows]
+
+    start = time.perf_counter()
+    old = [two_call(r) for r in rows]
+    old_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = [inference.predict_one(a) for a in arrays]
+    new_seconds = time.perf_counter() - start
+
+    mismatches = [i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+    assert not mismatches, f"rows differ: {mismatches[:10]}"
+
+    labels, confidences = inference.predict_batch(frame.to_numpy())
+    assert [(int(l), float(c)) for l, c in zip(labels, confidences)] == old
+
+    n = len(rows)
+    print(f"rows compared:        {n} (all identical, single and batch)")
+    print(f"predict+predict_proba: {old_seconds / n * 1e3:7.2f} ms/request")
+    print(f"single predict_proba:  {new_seconds / n * 1e3:7.2f} ms/request "
+          f"({old_seconds / new_seconds:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""Mixed-workload load test: requests/s and p99 per route under concurrent users.
+
+An asyncio client (no dependencies beyond the standard library) runs
+[users] virtual users for [seconds]. Each logs in once for a session
+cookie and then sends back-to-back requests drawn from MIX over a
+keep-alive connection: DB-bound logins, bookings and tracker writes,
+tracker summaries, /predict and the cached catalogue routes.
+
+With --url it loads an already running server, whose database must have
+the loadtest<n>@example.com users (password PASSWORD).
+Without --url it starts gunicorn twice on the SQLite stand-in, with every
+statement delayed by [query_ms] (default 20 ms) to model a slow MySQL:
+- sync: one request per worker process at a time;
+- gthread: GUNICORN_THREADS request threads per worker (the default).
+SQLite has one writer at a time and holds it through the delays, so the
+booking and tracker-write tails are worse here than on MySQL's row locks.
+BCRYPT_ROUNDS defaults to 8 here so logins don't swamp the run.
+Run: python benchmarks/load_test.py [users] [seconds] [query_ms] [--url http://host:port]
+"""
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from common import BACKEND_DIR, percentile, random_patient
+from tracker_store import MOODS
+
+DOCTORS_DB_PATH = os.path.join(os.path.dirname(BACKEND_DIR), 'Frontend', 'templates', 'database.json')
+PASSWORD = 'load-test-password'
+SEED_USERS = 200
+# (weight, label, method, path or path factory, body factory)
+MIX = [
+    (15, 'POST /login', 'POST', '/login',
+     lambda rng, user: {'email': f'loadtest{user}@example.com', 'password': PASSWORD}),
+    (10, 'POST /api/book-appointment', 'POST', '/api/book-appointment',
+     lambda rng, user: {'doctorId': rng.randint(1, 20), 'patientName': f'Load Test {user}',
+                        'patientEmail': f'loadtest{user}@example.com', 'patientPhone': '+91 90000 00000',
+                        'appointmentDate': f'2031-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                        'appointmentTime': f'{rng.randint(9, 17):02d}:{rng.choice(["00", "30"])}'}),
+    (10, 'POST /api/tracker/entries', 'POST', '/api/tracker/entries',
+     lambda rng, user: {'date': f'2030-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                        'cycleDay': rng.randint(1, 30), 'mood': rng.choice(MOODS), 'sleepHours': '7'}),
+    (10, 'GET /api/tracker/summary', 'GET', '/api/tracker/summary', None),
+    (15, 'POST /predict', 'POST', '/predict', lambda rng, user: random_patient(rng)),
+    (20, 'GET /api/doctors?specialty=..', 'GET', '/api/doctors?specialty=Gynecologist', None),
+    (10, 'GET /api/specialties', 'GET', '/api/specialties', None),
+    (10, 'GET /api/doctor/<id>/availability', 'GET', lambda rng: f'/api/doctor/{rng.randint(1, 20)}/availability',
+     None),
+]
+CONFIGS = {
+    'sync': {'GUNICORN_WORKER_CLASS': 'sync'},
+    'gthread': {'GUNICORN_WORKER_CLASS': 'gthread'},
+}
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection, reopened when the server closes it"""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+        self.cookie = None
+
+    async def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b''
+        head = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'Content-Length: {len(body)}']
+        if payload is not None:
+            head.append('Content-Type: application/json')
+        if self.cookie:
+            head.append(f'Cookie: {self.cookie}')
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('server closed the connection')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').rstrip('\r\n')
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            name, value = name.strip().lower(), value.strip()
+            if name == 'set-cookie':
+                self.cookie = value.split(';', 1)[0]
+            headers[name] = value
+        await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+
+async def virtual_user(user, host, port, deadline, samples, errors):
+    rng = random.Random(user)
+    weights = [weight for weight, *_ in MIX]
+    conn = Connection(host, port)
+    try:
+        await conn.request('POST', '/login', MIX[0][4](rng, user))
+        while time.monotonic() < deadline:
+            _, label, method, path, body = rng.choices(MIX, weights)[0]
+            if callable(path):
+                path = path(rng)
+            start = time.perf_counter()
+            try:
+                status = await conn.request(method, path, body(rng, user) if body else None)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+                await conn.close()
+                errors[label] += 1
+                continue
+            samples[label].append((time.perf_counter() - start) * 1000)
+            if status >= 500:
+                errors[label] += 1
+    finally:
+        await conn.close()
+
+
+async def load(url, users, seconds):
+    parts = urlsplit(url)
+    samples, errors = defaultdict(list), defaultdict(int)
+    deadline = time.monotonic() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user(n % SEED_USERS, parts.hostname, parts.port or 80, deadline, samples, errors)
+                           for n in range(users)))
+    return samples, errors, time.perf_counter() - start
+
+
+def report(title, samples, errors, elapsed):
+    every = [ms for route in samples.values() for ms in route]
+    print(f"{title}: {len(every) / elapsed:.0f} req/s, p50 {percentile(every, 50):.1f} ms, "
+          f"p99 {percentile(every, 99):.1f} ms, {sum(errors.values())} errors")
+    print(f"  {'route':<36} {'req/s':>6} {'p50 ms':>8} {'p99 ms':>8} {'5xx/err':>8}")
+    for _, label, *_ in MIX:
+        route = samples.get(label, [])
+        print(f"  {label:<36} {len(route) / elapsed:6.1f} {percentile(route, 50):8.1f} "
+              f"{percentile(route, 99):8.1f} {errors.get(label, 0):8d}")
+    return len(every) / elapsed, percentile(every, 99)
+
+
+def stand_in_app():
+    """gunicorn app factory: main.app on the SQLite stand-in at LOAD_TEST_DB"""
+    import main
+    from db_pool import ConnectionPool
+    from sqlite_db import StandInDatabase
+    db = StandInDatabase(query_latency=float(os.environ['LOAD_TEST_QUERY_MS']) / 1000,
+                         path=os.environ['LOAD_TEST_DB'])
+    main.db_pool = ConnectionPool(db.connect, size=int(os.getenv('DB_POOL_SIZE', 5)),
+                                  max_overflow=int(os.getenv('DB_POOL_MAX_OVERFLOW', 5)))
+    return main.app
+
+
+def seed_database(rounds):
+    import bcrypt
+    from sqlite_db import StandInDatabase
+    db = StandInDatabase()
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=rounds)).decode()
+    db.add_users((f'loadtest{n}', f'loadtest{n}@example.com', hashed) for n in range(SEED_USERS))
+    return db.path
+
+
+def start_gunicorn(config, db_path, query_ms):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, PORT=str(port), LOAD_TEST_DB=db_path, LOAD_TEST_QUERY_MS=str(query_ms),
+               DOCTORS_DB_PATH=DOCTORS_DB_PATH, **CONFIGS[config])
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                             '--pythonpath', os.path.dirname(os.path.abspath(__file__)), 'load_test:stand_in_app()'],
+                            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 120
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return proc, f'http://127.0.0.1:{port}'
+        except OSError:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f'gunicorn ({config}) did not start')
+            time.sleep(0.5)
+
+
+def benchmark():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    users = int(args[0]) if args else 64
+    seconds = float(args[1]) if len(args) > 1 else 30
+    query_ms = float(args[2]) if len(args) > 2 else 20
+    if '--url' in sys.argv:
+        url = sys.argv[sys.argv.index('--url') + 1]
+        report(f"{url}, {users} users, {seconds:.0f} s", *asyncio.run(load(url, users, seconds)))
+        return
+
+    os.environ.setdefault('BCRYPT_ROUNDS', '8')
+    db_path = seed_database(int(os.environ['BCRYPT_ROUNDS']))
+    print(f"{users} users for {seconds:.0f} s per config, SQLite stand-in with {query_ms:g} ms per statement, "
+          f"{os.cpu_count()} CPU(s), bcrypt rounds {os.environ['BCRYPT_ROUNDS']}")
+    results = {}
+    for config in CONFIGS:
+        proc, url = start_gunicorn(config, db_path, query_ms)
+        try:
+            asyncio.run(load(url, min(users, 8), 3))  # warm up
+            results[config] = report(config, *asyncio.run(load(url, users, seconds)))
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+    (sync_rps, sync_p99), (threaded_rps, threaded_p99) = results['sync'], results['gthread']
+    print(f"gthread vs sync: {threaded_rps / sync_rps:.2f}x req/s, p99 {sync_p99:.0f} -> {threaded_p99:.0f} ms")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,208 @@
+"""SQLite stand-in for the MySQL database, for local benchmarks.
+
+connect() returns an object shaped like a mysql.connector connection
+(%s placeholders, cursor/commit/close/ping, lastrowid) backed by a SQLite
+file, translating the MySQL-only syntax the app uses (ON DUPLICATE KEY
+UPDATE, FOR UPDATE), with optional sleeps to model the network cost of a real server.
+DECIMAL columns come back as decimal.Decimal, as they do from MySQL.
+round_trips() counts statements sent, so benchmarks can report DB round-trips.
+"""
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+import mysql.connector
+
+from tracker_store import TRACKER_DDL
+
+sqlite3.register_converter('DECIMAL', lambda value: Decimal(value.decode()))
+
+_round_trip_lock = threading.Lock()
+_round_trips = [0]
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS login_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        login_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        ip_address TEXT,
+        user_agent TEXT,
+        event_id TEXT UNIQUE
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_login_user ON login_history (user_id)",
+    """CREATE TABLE IF NOT EXISTS appointments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        appointment_id TEXT NOT NULL UNIQUE,
+        doctor_id INTEGER NOT NULL,
+        appointment_date TEXT NOT NULL,
+        appointment_time TEXT NOT NULL,
+        user_id INTEGER,
+        patient_name TEXT NOT NULL,
+        patient_email TEXT NOT NULL,
+        patient_phone TEXT NOT NULL,
+        consultation_fee INTEGER,
+        status TEXT NOT NULL DEFAULT 'confirmed',
+        active INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (doctor_id, appointment_date, appointment_time, active)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_date_active ON appointments (appointment_date, active)",
+    """CREATE TABLE IF NOT EXISTS revoked_tokens (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        jti TEXT NOT NULL UNIQUE,
+        expires_at INTEGER NOT NULL,
+        revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+]
+
+
+def _sqlite_ddl(ddl):
+    """A MySQL CREATE TABLE keyed on its primary key -> SQLite clustered (WITHOUT ROWID) table"""
+    ddl = ddl.replace(' ON UPDATE CURRENT_TIMESTAMP', '')
+    return re.sub(r'\)\s*ENGINE=.*$', ') WITHOUT ROWID', ddl.strip(), flags=re.S)
+
+
+SCHEMA += [_sqlite_ddl(ddl) for ddl in TRACKER_DDL]
+
+
+def translate(sql):
+    """MySQL statement -> SQLite statement"""
+    sql = sql.replace('%s', '?').replace(' FOR UPDATE', '')
+    head, upsert, updates = sql.partition(' ON DUPLICATE KEY UPDATE ')
+    if upsert:
+        sql = head + ' ON CONFLICT DO UPDATE SET ' + re.sub(r'VALUES\((\w+)\)', r'excluded.\1', updates)
+    return sql
+
+
+def round_trips():
+    return _round_trips[0]
+
+
+def _count_round_trip(latency):
+    with _round_trip_lock:
+        _round_trips[0] += 1
+    if latency:
+        time.sleep(latency)
+
+
+class StandInCursor:
+    def __init__(self, conn, latency):
+        self._cursor = conn.cursor()
+        self._latency = latency
+
+    def execute(self, sql, params=()):
+        _count_round_trip(self._latency)
+        try:
+            self._cursor.execute(translate(sql), tuple(params))
+        except sqlite3.IntegrityError as e:
+            # MySQL's wording, which names the unique key: "... for key 'users.email'"
+            key = str(e).rpartition(': ')[2].split(', ')[-1]
+            raise mysql.connector.IntegrityError(msg=f"Duplicate entry for key '{key}'", errno=1062) from e
+        except sqlite3.OperationalError as e:
+            if 'no column named' not in str(e):
+                raise
+            raise mysql.connector.ProgrammingError(msg=str(e), errno=1054) from e
+
+    def executemany(self, sql, rows):
+        _count_round_trip(self._latency)
+        self._cursor.executemany(translate(sql), [tuple(r) for r in rows])
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandInConnection:
+    def __init__(self, path, latency):
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False,
+                                     detect_types=sqlite3.PARSE_DECLTYPES)
+        self._latency = latency
+
+    def cursor(self, *args, **kwargs):
+        return StandInCursor(self._conn, self._latency)
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def commit(self):
+        _count_round_trip(self._latency)
+        self._conn.commit()
+
+    def rollback(self):
+        _count_round_trip(self._latency)
+        self._conn.rollback()
+
+    def ping(self):
+        _count_round_trip(self._latency)
+        self._conn.execute("SELECT 1")
+
+    def close(self):
+        self._conn.close()
+
+
+class StandInDatabase:
+    """A throwaway SQLite database plus a mysql.connector-style connect()"""
+
+    def __init__(self, connect_latency=0.0, query_latency=0.0, path=None):
+        self.path = path or os.path.join(tempfile.mkdtemp(prefix='gynai-bench-'), 'db.sqlite3')
+        self.connect_latency = connect_latency
+        self.query_latency = query_latency
+        self.connections_opened = 0
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
+
+    def connect(self, **_config):
+        self.connections_opened += 1
+        if self.connect_latency:
+            time.sleep(self.connect_latency)
+        return StandInConnection(self.path, self.query_latency)
+
+    def execute_script(self, statements):
+        conn = sqlite3.connect(self.path)
+        for statement in statements:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
+
+    def add_users(self, users):
+        """users: iterable of (username, email, password_hash)"""
+        conn = sqlite3.connect(self.path)
+        conn.executemany("INSERT INTO users (username, email, password) VALUES (?, ?, ?)", users)
+        conn.commit()
+        conn.close()
+
+    def count(self, table):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        finally:
+            conn.close()
@@ -0,0 +1,39 @@
+import math
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, held in one process.
+
+    Probe positions come from double hashing of Python's own string hash
+    (split into two 32-bit halves). That hash is salted per process, which
+    is fine because each process builds its own filter.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(capacity, 1)
+        self.bits = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        self.hashes = max(int(round(self.bits / self.capacity * math.log(2))), 1)
+        self._array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    @property
+    def size_bytes(self):
+        return len(self._array)
+
+    def _positions(self, key):
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1, h2, bits, array = h & 0xFFFFFFFF, (h >> 32) | 1, self.bits, self._array
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % bits
+            if not array[pos >> 3] >> (pos & 7) & 1:
+                return False
+        return True
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from background import ProcessThread
+from doctor_catalog import DoctorCatalog, validate_catalog
+
+log = logging.getLogger('gynai.catalog')
+
+def diff_doctors(old, new):
+    """(ids added, removed or modified, whether surviving doctors changed order)"""
+    old_by_id = {d['id']: d for d in old}
+    new_by_id = {d['id']: d for d in new}
+    changed = old_by_id.keys() ^ new_by_id.keys()
+    changed.update(i for i, d in new_by_id.items() if i in old_by_id and old_by_id[i] != d)
+    old_order = [d['id'] for d in old if d['id'] in new_by_id]
+    new_order = [d['id'] for d in new if d['id'] in old_by_id]
+    return changed, old_order != new_order
+
+class CatalogSnapshot:
+    """One catalogue version plus everything derived from it; never mutated.
+
+    Routes read manager.snapshot once and use only that object, so a
+    request that overlaps a reload still sees one consistent version.
+    """
+
+    __slots__ = ('catalog', 'responses', 'version', 'loaded_at', 'load_ms', 'changed', 'reordered', 'incremental')
+
+    def __init__(self, catalog, responses=None, version=None, load_ms=None, changed=None, reordered=True,
+                 incremental=False):
+        self.catalog = catalog
+        self.responses = responses
+        self.version = version
+        self.loaded_at = datetime.now().isoformat(timespec='seconds')
+        self.load_ms = load_ms
+        # Doctor ids that differ from the previous snapshot (None: nothing to diff against)
+        self.changed = changed
+        self.reordered = reordered
+        # Whether catalog was patched from the previous one rather than built from scratch
+        self.incremental = incremental
+
+class CatalogManager:
+    """Loads database.json and swaps in a new snapshot when the file changes.
+
+    A background thread polls the file's mtime/size every poll_interval
+    seconds; a change is read, validated and indexed off the request path,
+    and only then published by a single reference assignment. When the
+    diff against the current catalogue only edits or appends doctors, the
+    new catalogue is DoctorCatalog.apply()'d from the current one, which
+    re-indexes just those doctors; otherwise it is built from scratch. A file that
+    fails to parse or validate is reported in stats() and the previous
+    snapshot keeps serving. build_responses(catalog, previous, changed,
+    reordered) derives the snapshot's response cache and may reuse entries
+    from the previous snapshot that the diff leaves untouched;
+    on_publish(catalog, version) runs just before each snapshot goes live,
+    for per-version state kept outside it.
+    """
+
+    def __init__(self, path, build_responses=None, poll_interval=5.0, on_publish=None):
+        self.path = path
+        self.build_responses = build_responses
+        self.on_publish = on_publish
+        self.poll_interval = poll_interval
+        self.snapshot = CatalogSnapshot(DoctorCatalog.empty())
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self._file_stat = None
+        self._reload_lock = threading.Lock()
+        self._thread = ProcessThread(self._run, 'catalog-watch')
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def install(self, catalog, version=None):
+        """Publish a catalogue built elsewhere (startup fallbacks, benchmarks)"""
+        with self._reload_lock:
+            return self._publish(catalog, version, time.perf_counter())
+
+    def _publish(self, catalog, version, start, diff=None, incremental=False):
+        previous = self.snapshot
+        changed, reordered = None, True
+        if diff is not None:
+            changed, reordered = diff
+        elif len(previous.catalog):
+            changed, reordered = diff_doctors(previous.catalog.doctors, catalog.doctors)
+        responses = None
+        if self.build_responses is not None:
+            responses = self.build_responses(catalog, previous, changed, reordered)
+        snapshot = CatalogSnapshot(catalog, responses, version,
+                                   round((time.perf_counter() - start) * 1000, 2), changed, reordered,
+                                   incremental)
+        if self.on_publish is not None:
+            self.on_publish(catalog, version)
+        self.snapshot = snapshot
+        return snapshot
+
+    def reload(self, force=False):
+        """Re-read the file if it changed; True if a new snapshot was published"""
+        with self._reload_lock:
+            file_stat = self._stat()
+            if file_stat is None:
+                raise FileNotFoundError(self.path)
+            if not force and file_stat == self._file_stat:
+                return False
+            start = time.perf_counter()
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            self._file_stat = file_stat
+            version = hashlib.sha256(raw).hexdigest()[:16]
+            if not force and version == self.snapshot.version:
+                return False
+            data = json.loads(raw)
+            validate_catalog(data)
+            current, catalog, diff = self.snapshot.catalog, None, None
+            if len(current):
+                diff = diff_doctors(current.doctors, data['doctors'])
+                catalog = current.apply(data, *diff)
+            incremental = catalog is not None
+            if catalog is None:
+                catalog = DoctorCatalog(data)
+            self._publish(catalog, version, start, diff, incremental)
+            self.reloads += 1
+            self.last_error = None
+            return True
+
+    def check(self):
+        """One poll: reload on change, keep the current snapshot on failure"""
+        try:
+            if self.reload():
+                snapshot = self.snapshot
+                log.info('doctors database reloaded',
+                         extra={'version': snapshot.version, 'doctors': len(snapshot.catalog),
+                                'reload_ms': snapshot.load_ms, 'incremental': snapshot.incremental})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            log.warning('doctors database reload failed, keeping the current version',
+                        extra={'version': self.snapshot.version, 'error': self.last_error})
+
+    def watch(self):
+        """Start the polling thread (once per process; forked workers start their own)"""
+        if self.poll_interval <= 0:
+            return
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self.check()
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {
+            'version': snapshot.version,
+            'doctors': len(snapshot.catalog),
+            'loaded_at': snapshot.loaded_at,
+            'reload_ms': snapshot.load_ms,
+            'changed_doctors': len(snapshot.changed) if snapshot.changed is not None else None,
+            'incremental': snapshot.incremental,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_error': self.last_error
+        }
+
+def create_manager_from_env(build_responses=None, on_publish=None):
+    """The manager for DOCTORS_DB_PATH, polled every CATALOG_POLL_INTERVAL seconds (0 disables)"""
+    return CatalogManager(os.getenv('DOCTORS_DB_PATH', 'database.json'), build_responses,
+                          poll_interval=float(os.getenv('CATALOG_POLL_INTERVAL', 5)), on_publish=on_publish)
@@ -1,6 +1,11 @@
 import mysql.connector
 from mysql.connector import Error
 
+from appointments import APPOINTMENTS_DDL
+from auth_tokens import REVOKED_TOKENS_DDL
+from login_history import migrate_login_history
+from tracker_store import TRACKER_DDL
+
 def setup_database():
     """Setup database and create tables"""
     try:
@@ -32,7 +37,7 @@ def setup_database():
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS users (
                 id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(255) NOT NULL,
+                username VARCHAR(255) UNIQUE NOT NULL,
                 email VARCHAR(255) UNIQUE NOT NULL,
                 password VARCHAR(255) NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -50,12 +55,29 @@ def setup_database():
                 login_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 ip_address VARCHAR(45),
                 user_agent TEXT,
+                event_id CHAR(32) NULL,
                 FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
                 INDEX idx_user_id (user_id),
-                INDEX idx_login_time (login_time)
+                INDEX idx_login_time (login_time),
+                UNIQUE KEY uq_event_id (event_id)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
         """)
-        print("✓ Table 'login_history' created/verified")
+        added = migrate_login_history(cursor)
+        print("✓ Table 'login_history' created/verified"
+              + (f" (added {', '.join(added)})" if added else ""))
+        
+        # Create appointments table
+        cursor.execute(APPOINTMENTS_DDL)
+        print("✓ Table 'appointments' created/verified")
+        
+        # Create symptom tracker tables
+        for ddl in TRACKER_DDL:
+            cursor.execute(ddl)
+        print("✓ Tables 'tracker_entries', 'tracker_rollups', 'tracker_cycles' created/verified")
+        
+        # Create revoked_tokens table (bearer token logout / refresh rotation)
+        cursor.execute(REVOKED_TOKENS_DDL)
+        print("✓ Table 'revoked_tokens' created/verified")
         
         conn.commit()
         
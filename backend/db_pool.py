@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from collections import deque
+
+# MySQL error for a UNIQUE key violation
+ER_DUP_ENTRY = 1062
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be checked out within the pool timeout"""
+
+class StoreUnavailableError(Exception):
+    """No database connection could be obtained (the DB-backed stores raise it; routes answer 503)"""
+
+def default_health_check(conn):
+    """Round-trip check used on checkout: ping() for MySQL, SELECT 1 otherwise"""
+    if hasattr(conn, 'ping'):
+        conn.ping()
+        return
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1")
+    cursor.fetchall()
+    cursor.close()
+
+class _Entry:
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = self.last_used = time.monotonic()
+
+class PooledConnection:
+    """Proxy for a checked-out connection; close() hands it back to the pool.
+
+    Everything else is delegated, so route code written against a plain
+    mysql.connector connection (cursor/commit/close) works unchanged.
+    """
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        entry = self.__dict__.get('_entry')
+        if entry is None:
+            raise AttributeError(name)
+        return getattr(entry.conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # A route that bailed out without close() must not leak the slot
+        if self.__dict__.get('_entry') is not None:
+            self.close(discard=True)
+
+    def close(self, discard=False):
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool._release(entry, discard=discard)
+
+class ConnectionPool:
+    """Thread-safe, fork-aware pool of DB connections.
+
+    Holds up to `size` idle connections and opens at most `max_overflow`
+    extra ones under load (closed again on return). Connections are
+    health-checked on checkout once idle longer than `ping_interval`
+    seconds and recycled after `recycle` seconds. Nothing is opened until
+    first use, and a pool inherited across fork() drops the parent's
+    connections without touching their sockets.
+    """
+
+    def __init__(self, connect, size=5, max_overflow=5, timeout=5.0, recycle=1800,
+                 ping_interval=0, health_check=default_health_check):
+        self._connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self._health_check = health_check
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._open = 0
+        self._in_use = 0
+        self.checkouts = 0
+        self.created = 0
+        self.recycled = 0
+        self.failed_health_checks = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def connect(self):
+        """Check out a connection, waiting up to `timeout` seconds for one"""
+        if self._pid != os.getpid():
+            self._reset()
+        start = time.monotonic()
+        deadline = start + self.timeout
+        entry = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeoutError(f"No connection available within {self.timeout}s")
+                self._cond.wait(remaining)
+            self._in_use += 1
+            waited = time.monotonic() - start
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+        if entry is not None:
+            entry = self._validate(entry)
+        if entry is None:
+            try:
+                entry = _Entry(self._connect())
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self.created += 1
+        return PooledConnection(self, entry)
+
+    def _validate(self, entry):
+        now = time.monotonic()
+        if self.recycle and now - entry.created_at > self.recycle:
+            with self._cond:
+                self.recycled += 1
+            self._close_quietly(entry.conn)
+            return None
+        if now - entry.last_used >= self.ping_interval:
+            try:
+                self._health_check(entry.conn)
+            except Exception:
+                with self._cond:
+                    self.failed_health_checks += 1
+                self._close_quietly(entry.conn)
+                return None
+        return entry
+
+    def _release(self, entry, discard=False):
+        if self._pid != os.getpid():
+            return
+        conn = entry.conn
+        if not discard and getattr(conn, 'in_transaction', False):
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._cond:
+            self._in_use -= 1
+            keep = not discard and len(self._idle) < self.size
+            if keep:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if not keep:
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def dispose(self):
+        """Close every idle connection (e.g. on worker shutdown)"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+        for entry in idle:
+            self._close_quietly(entry.conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self.checkouts,
+                'created': self.created,
+                'recycled': self.recycled,
+                'failed_health_checks': self.failed_health_checks,
+                'timeouts': self.timeouts,
+                'wait_ms_avg': round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'wait_ms_max': round(self.wait_seconds_max * 1000, 3)
+            }
+
+def create_pool_from_env(connect):
+    """Build the pool configured by the DB_POOL_* environment variables, or None"""
+    if os.getenv('DB_POOL_ENABLED', '1') == '0':
+        return None
+    return ConnectionPool(
+        connect,
+        size=int(os.getenv('DB_POOL_SIZE', 5)),
+        max_overflow=int(os.getenv('DB_POOL_MAX_OVERFLOW', 5)),
+        timeout=float(os.getenv('DB_POOL_TIMEOUT', 5)),
+        recycle=float(os.getenv('DB_POOL_RECYCLE', 1800)),
+        ping_interval=float(os.getenv('DB_POOL_PING_INTERVAL', 0))
+    )
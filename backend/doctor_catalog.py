@@ -0,0 +1,199 @@
+import copy
+import json
+from collections import defaultdict
+
+from doctor_records import DoctorRecords
+from doctor_search import SearchIndex
+from geo_distance import DistanceKernel
+from geo_index import GeoIndex
+
+# Above this share of changed doctors a full rebuild beats patching the indexes
+DIFF_APPLY_MAX_FRACTION = 0.25
+# Position-list indexes filled from _index_keys, in the order it returns keys
+POSITION_INDEXES = ('by_specialty', 'by_city', 'by_pincode')
+
+def doctor_matches(doctor, specialty=None):
+    """Whether one doctor passes the specialty filter"""
+    return not specialty or specialty == 'all' or doctor.get('specialty') == specialty
+
+def validate_catalog(data):
+    """Raise ValueError unless data looks like a database.json the routes can serve"""
+    if not isinstance(data, dict) or not isinstance(data.get('doctors'), list):
+        raise ValueError("expected an object with a 'doctors' list")
+    seen = set()
+    for n, doctor in enumerate(data['doctors']):
+        if not isinstance(doctor, dict):
+            raise ValueError(f"doctors[{n}] is not an object")
+        missing = [k for k in ('id', 'name', 'specialty', 'availability', 'location') if k not in doctor]
+        if missing:
+            raise ValueError(f"doctors[{n}] is missing {', '.join(missing)}")
+        if doctor['id'] in seen:
+            raise ValueError(f"duplicate doctor id {doctor['id']!r}")
+        seen.add(doctor['id'])
+        location = doctor['location']
+        try:
+            lat, lon = float(location['latitude']), float(location['longitude'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"doctors[{n}] has no usable latitude/longitude")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError(f"doctors[{n}] location ({lat}, {lon}) is out of range")
+
+def _index_keys(doctor):
+    """The doctor's key in each of POSITION_INDEXES (None: not indexed there)"""
+    location = doctor.get('location', {})
+    return (doctor['specialty'],
+            location['city'].lower() if location.get('city') else None,
+            str(location['pincode']) if location.get('pincode') else None)
+
+def _location(doctor):
+    return doctor['location']['latitude'], doctor['location']['longitude']
+
+def _intersect(positions, other):
+    """Keep the (ascending) positions that also appear in other"""
+    if len(other) < len(positions):
+        positions, other = other, positions
+    allowed = set(other)
+    return [p for p in positions if p in allowed]
+
+class DoctorCatalog:
+    """Read-only doctor catalogue with the lookups the doctor routes need.
+
+    Built once from database.json: an id -> record dict, secondary indexes
+    (lists of positions, in catalogue order) by specialty, city and
+    pincode, a full-text SearchIndex and the records
+    pre-serialised as JSON. Filters intersect index lists instead of
+    scanning every record;
+    `geo` answers radius and nearest-k queries over the doctor locations and
+    `distances` computes bulk distances for many origins at once. apply()
+    builds the next version from this one by re-indexing only the doctors
+    that changed.
+    """
+
+    def __init__(self, data):
+        self.doctors = list(data.get('doctors', []))
+        self.specialties = data.get('specialties', [])
+        self.availability_options = data.get('availabilityOptions', [])
+        self.by_id = {}
+        self.by_specialty = defaultdict(list)
+        self.by_city = defaultdict(list)
+        self.by_pincode = defaultdict(list)
+        indexes = [getattr(self, name) for name in POSITION_INDEXES]
+        for pos, doctor in enumerate(self.doctors):
+            self.by_id[doctor['id']] = doctor
+            for index, key in zip(indexes, _index_keys(doctor)):
+                if key is not None:
+                    index[key].append(pos)
+        self.search_index = SearchIndex(self.doctors)
+        self.records = DoctorRecords(self.doctors)
+        self._build_geo()
+
+    def _build_geo(self):
+        latitudes = [d['location']['latitude'] for d in self.doctors]
+        longitudes = [d['location']['longitude'] for d in self.doctors]
+        self.geo = GeoIndex(latitudes, longitudes)
+        self.distances = DistanceKernel(latitudes, longitudes)
+
+    def apply(self, data, changed, reordered):
+        """The catalogue for data, built by patching this one's indexes.
+
+        changed and reordered come from diff_doctors(self.doctors, new).
+        Only doctors whose ids are in changed are re-indexed; everything
+        else is shared with this catalogue, which is left untouched. That
+        needs every other doctor to keep its position (edits in place, new
+        doctors appended at the end); if one was removed or moved, or more
+        than DIFF_APPLY_MAX_FRACTION of the catalogue changed, returns None
+        and the caller builds from scratch.
+        """
+        doctors = list(data.get('doctors', []))
+        old = self.doctors
+        if reordered or len(doctors) < len(old) or len(changed) > len(old) * DIFF_APPLY_MAX_FRACTION:
+            return None
+        positions = [pos for pos, doctor in enumerate(doctors) if doctor['id'] in changed]
+        # Every changed id still present (none removed), and new ids only past the old end
+        if len(positions) != len(changed) or any((pos < len(old)) != (doctors[pos]['id'] in self.by_id)
+                                                 for pos in positions):
+            return None
+
+        catalog = copy.copy(self)
+        catalog.doctors = doctors
+        catalog.specialties = data.get('specialties', [])
+        catalog.availability_options = data.get('availabilityOptions', [])
+        catalog.by_id = {doctor['id']: doctor for doctor in doctors}
+
+        # (index name, key) -> (positions leaving, positions joining)
+        moves = defaultdict(lambda: (set(), set()))
+        for pos in positions:
+            for side, doctor in ((0, old[pos] if pos < len(old) else None), (1, doctors[pos])):
+                if doctor is None:
+                    continue
+                for name, key in zip(POSITION_INDEXES, _index_keys(doctor)):
+                    if key is not None:
+                        moves[name, key][side].add(pos)
+        for name in POSITION_INDEXES:
+            setattr(catalog, name, defaultdict(list, getattr(self, name)))
+        for (name, key), (leaving, joining) in moves.items():
+            if leaving == joining:
+                continue
+            current = getattr(self, name).get(key, [])
+            updated = sorted([p for p in current if p not in leaving] + list(joining))
+            if updated:
+                getattr(catalog, name)[key] = updated
+            else:
+                del getattr(catalog, name)[key]
+
+        catalog.search_index = self.search_index.updated(old, doctors, positions)
+        catalog.records = self.records.updated(doctors, positions)
+        if len(doctors) != len(old) or any(_location(old[pos]) != _location(doctors[pos]) for pos in positions):
+            catalog._build_geo()
+        return catalog
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def empty(cls):
+        return cls({'doctors': [], 'specialties': [], 'availabilityOptions': []})
+
+    def __len__(self):
+        return len(self.doctors)
+
+    def get(self, doctor_id):
+        """The doctor with this id, or None"""
+        try:
+            return self.by_id.get(doctor_id)
+        except TypeError:
+            return None
+
+    def filter_positions(self, specialty=None, search=None, city=None, pincode=None, available=None):
+        """Positions of matching doctors, or None for 'no filter'.
+
+        Catalogue order, except that a search ranks its matches best first.
+        available is an ascending position list computed elsewhere (the
+        availability engine's view of this catalogue).
+        """
+        positions = None
+
+        def narrow(index_list):
+            return index_list if positions is None else _intersect(positions, index_list)
+
+        if specialty and specialty != 'all':
+            positions = narrow(self.by_specialty.get(specialty, []))
+        if available is not None:
+            positions = narrow(available)
+        if city:
+            positions = narrow(self.by_city.get(city.lower(), []))
+        if pincode:
+            positions = narrow(self.by_pincode.get(str(pincode), []))
+        if search:
+            positions = self.search_index.search(search, allowed=positions)
+        return positions
+
+    def filter(self, **filters):
+        """Doctors matching the /api/doctors filters"""
+        positions = self.filter_positions(**filters)
+        if positions is None:
+            return self.doctors
+        doctors = self.doctors
+        return [doctors[p] for p in positions]
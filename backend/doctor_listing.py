@@ -0,0 +1,67 @@
+import base64
+import json
+
+# Page size when a cursor is given without a limit
+DEFAULT_PAGE_SIZE = 100
+# Doctors serialised per chunk of an NDJSON stream
+NDJSON_CHUNK = 256
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson')
+
+class CursorError(ValueError):
+    """A cursor that is malformed or was issued for another catalogue version"""
+
+def encode_cursor(version, offset):
+    """Opaque continuation token for the page starting at offset"""
+    raw = json.dumps([version, offset], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token, version):
+    """Offset encoded in token; CursorError if it is invalid or stale.
+
+    Results are ordered by catalogue position (or search rank, ties by
+    position), which is only stable within one catalogue version, so a
+    cursor from before a reload is rejected rather than silently skipping
+    or repeating doctors.
+    """
+    try:
+        cursor_version, offset = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        offset = int(offset)
+    except (ValueError, TypeError):
+        raise CursorError('Invalid cursor')
+    if cursor_version != version:
+        raise CursorError('Cursor expired: the doctors catalogue has changed, start again')
+    return max(offset, 0)
+
+def parse_fields(value):
+    """Tuple of requested top-level fields from 'id,name,...', or None for whole records"""
+    if not value:
+        return None
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(',') if f.strip()))
+    return fields or None
+
+def project(doctor, fields, extra=None):
+    """The requested fields of doctor; extra supplies computed ones such as distance"""
+    if fields is None:
+        if extra:
+            doctor = dict(doctor, **extra)
+        return doctor
+    out = {}
+    for field in fields:
+        if extra and field in extra:
+            out[field] = extra[field]
+        elif field in doctor:
+            out[field] = doctor[field]
+    return out
+
+def ndjson_chunks(rows, dumps):
+    """Yield NDJSON text in chunks of NDJSON_CHUNK rows; rows is any iterable"""
+    lines = []
+    for row in rows:
+        lines.append(dumps(row))
+        if len(lines) >= NDJSON_CHUNK:
+            lines.append('')
+            yield '\n'.join(lines)
+            lines = []
+    if lines:
+        lines.append('')
+        yield '\n'.join(lines)
@@ -0,0 +1,72 @@
+import copy
+import json
+
+# Matches what Flask's default JSON provider emits for jsonify() outside debug mode
+_dumps = json.JSONEncoder(ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode
+
+class DoctorRecords:
+    """Each doctor pre-serialised once as JSON, split around a computed key.
+
+    jsonify() sorts keys, so a computed field such as distance lands
+    between the doctor's keys that sort before it and those after it.
+    Storing those two halves per doctor lets a result row be just
+    (position, value): it is spliced into the output text with no dict
+    copy and no per-key encoding at request time. The text is identical to
+    jsonify() of the copied dicts.
+    """
+
+    def __init__(self, doctors, key='distance'):
+        self.key = key
+        self._quoted_key = _dumps(key)
+        self._key_len = len(self._quoted_key) + 1
+        self.before = []
+        self.after = []
+        for doctor in doctors:
+            before, after = self._split(doctor)
+            self.before.append(before)
+            self.after.append(after)
+
+    def _split(self, doctor):
+        key = self.key
+        head = {k: v for k, v in doctor.items() if k < key}
+        tail = {k: v for k, v in doctor.items() if k > key}
+        # '{"a":1}' -> '{"a":1,' and '{"z":2}' -> ',"z":2}'
+        return (_dumps(head)[:-1] + (',' if head else '') + self._quoted_key + ':',
+                (',' if tail else '') + _dumps(tail)[1:])
+
+    def updated(self, doctors, positions):
+        """A copy with the doctors at positions re-encoded (positions past the end are appended)"""
+        records = copy.copy(self)
+        records.before, records.after = list(self.before), list(self.after)
+        for pos in positions:
+            before, after = self._split(doctors[pos])
+            if pos < len(self.before):
+                records.before[pos], records.after[pos] = before, after
+            else:
+                records.before.append(before)
+                records.after.append(after)
+        return records
+
+    def __len__(self):
+        return len(self.before)
+
+    def plain(self, pos):
+        """JSON text of the doctor at pos as stored"""
+        head = self.before[pos][:-self._key_len]  # '{' or '{"a":1,'
+        tail = self.after[pos]                     # '}' or ',"z":2}'
+        if head == '{':
+            return '{' + tail[1:] if tail != '}' else '{}'
+        return head[:-1] + tail
+
+    def with_value(self, pos, value):
+        """JSON text of the doctor at pos with key set to value (a float)"""
+        return self.before[pos] + repr(float(value)) + self.after[pos]
+
+    def array(self, positions):
+        """jsonify() body for the doctors at positions"""
+        return '[' + ','.join([self.plain(p) for p in positions]) + ']\n'
+
+    def array_with(self, hits):
+        """jsonify() body for [(value, position)] rows, e.g. GeoIndex hits"""
+        before, after = self.before, self.after
+        return '[' + ','.join([before[p] + repr(float(v)) + after[p] for v, p in hits]) + ']\n'
@@ -0,0 +1,162 @@
+import copy
+import re
+from collections import defaultdict
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# How much a hit in each field counts towards a doctor's rank
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'specialty': 2.0,
+    'clinic': 2.0,
+    'services': 1.5,
+    'city': 1.5,
+    'languages': 1.0,
+}
+# Exact token hits outrank prefix hits, which outrank mid-word substrings
+MATCH_WEIGHTS = {'exact': 1.0, 'prefix': 0.75, 'substring': 0.5}
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+def _field_texts(doctor):
+    location = doctor.get('location', {})
+    return {
+        'name': doctor.get('name', ''),
+        'specialty': doctor.get('specialty', ''),
+        'clinic': doctor.get('clinic', ''),
+        'services': ' '.join(doctor.get('services', [])),
+        'city': location.get('city', ''),
+        'languages': ' '.join(doctor.get('languages', [])),
+    }
+
+def _token_weights(doctor):
+    """{token: best field weight} for one doctor"""
+    weights = {}
+    for field, text in _field_texts(doctor).items():
+        weight = FIELD_WEIGHTS[field]
+        for token in tokenize(text):
+            if weights.get(token, 0) < weight:
+                weights[token] = weight
+    return weights
+
+def _grams(token):
+    for n in (1, 2, 3):
+        for i in range(len(token) - n + 1):
+            yield token[i:i + n]
+
+class SearchIndex:
+    """Token inverted index plus 1/2/3-gram index over the doctor catalogue.
+
+    postings maps each token to {position: best field weight}. Query tokens
+    are expanded to every indexed token they equal, prefix or appear inside
+    (found through the n-gram index, not a vocabulary scan); a doctor must
+    match every query token and is ranked by the summed weights.
+    """
+
+    def __init__(self, doctors):
+        postings = defaultdict(dict)
+        for pos, doctor in enumerate(doctors):
+            for token, weight in _token_weights(doctor).items():
+                postings[token][pos] = weight
+        self.postings = dict(postings)
+        self.vocabulary = sorted(self.postings)
+        grams = defaultdict(set)
+        for token in self.vocabulary:
+            for gram in _grams(token):
+                grams[gram].add(token)
+        self.grams = dict(grams)
+
+    def updated(self, old_doctors, doctors, positions):
+        """A copy with the doctors at positions re-indexed from doctors.
+
+        old_doctors is the list this index was built from; positions past
+        its end are new doctors. Posting dicts and n-gram sets are copied
+        only where a changed doctor touches them, so the result shares the
+        rest with this index, which stays valid for the old list.
+        """
+        index = copy.copy(self)
+        index.postings = postings = dict(self.postings)
+        touched = set()
+
+        def entry(token):
+            if token not in touched:
+                touched.add(token)
+                postings[token] = dict(postings.get(token, ()))
+            return postings[token]
+
+        for pos in positions:
+            if pos < len(old_doctors):
+                for token in _token_weights(old_doctors[pos]):
+                    entry(token).pop(pos, None)
+            for token, weight in _token_weights(doctors[pos]).items():
+                entry(token)[pos] = weight
+        added = [t for t in touched if postings[t] and t not in self.postings]
+        dropped = [t for t in touched if not postings[t]]
+        if not added and not dropped:
+            return index
+        for token in dropped:
+            del postings[token]
+        index.vocabulary = sorted(postings)
+        index.grams = grams = dict(self.grams)
+        copied = set()
+        for token, present in [(t, False) for t in dropped] + [(t, True) for t in added]:
+            for gram in _grams(token):
+                if gram not in copied:
+                    copied.add(gram)
+                    grams[gram] = set(grams.get(gram, ()))
+                if present:
+                    grams[gram].add(token)
+                else:
+                    grams[gram].discard(token)
+                    if not grams[gram]:
+                        del grams[gram]
+                        copied.discard(gram)
+        return index
+
+    def expand(self, query_token):
+        """{indexed token: match weight} for one query token"""
+        matches = {}
+        if query_token in self.postings:
+            matches[query_token] = MATCH_WEIGHTS['exact']
+        n = min(len(query_token), 3)
+        sets = sorted((self.grams.get(query_token[i:i + n], set())
+                       for i in range(len(query_token) - n + 1)), key=len)
+        candidates = set.intersection(*sets) if sets and sets[0] else ()
+        for token in candidates:
+            if token == query_token:
+                continue
+            if token.startswith(query_token):
+                matches[token] = MATCH_WEIGHTS['prefix']
+            elif query_token in token:
+                matches[token] = MATCH_WEIGHTS['substring']
+        return matches
+
+    def _token_scores(self, query_token):
+        scores = {}
+        for token, match_weight in self.expand(query_token).items():
+            for pos, field_weight in self.postings[token].items():
+                score = field_weight * match_weight
+                if scores.get(pos, 0) < score:
+                    scores[pos] = score
+        return scores
+
+    def search(self, query, allowed=None):
+        """Matching positions, best first (ties in catalogue order).
+
+        allowed, if given, is an iterable of positions from the other
+        filters; it is intersected with the posting lists.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return list(allowed) if allowed is not None else None
+        per_token = sorted((self._token_scores(t) for t in set(tokens)), key=len)
+        scores = dict(per_token[0])
+        if allowed is not None:
+            allowed = set(allowed)
+            scores = {pos: s for pos, s in scores.items() if pos in allowed}
+        for token_scores in per_token[1:]:
+            scores = {pos: s + token_scores[pos] for pos, s in scores.items() if pos in token_scores}
+            if not scores:
+                break
+        return sorted(scores, key=lambda pos: (-scores[pos], pos))
@@ -0,0 +1,104 @@
+import logging
+import os
+import threading
+import time
+
+from background import PeriodicTask
+from bloom_filter import BloomFilter
+
+log = logging.getLogger('gynai.email_registry')
+
+class EmailRegistry:
+    """In-process record of which emails already have an account.
+
+    A Bloom filter of every users.email, warmed by a background thread and
+    kept current by pulling rows with a higher id than the last one seen
+    (registrations made by other workers) plus add() for this process's
+    own. might_exist() is False only for an email that is certainly new,
+    so register() can skip the duplicate lookup and go straight to bcrypt
+    and the INSERT. True means "probably taken" (or not warmed yet): the
+    caller confirms with one indexed SELECT before spending bcrypt CPU.
+    The UNIQUE key on users.email stays the final arbiter.
+    """
+
+    def __init__(self, connect, capacity=100000, error_rate=0.001, batch_size=10000):
+        self._connect = connect
+        self.error_rate = error_rate
+        self.batch_size = batch_size
+        self.filter = BloomFilter(capacity, error_rate)
+        self.ready = False
+        self.last_id = 0
+        self.checks = 0
+        self.maybe = 0
+        self.syncs = 0
+        self.warm_ms = None
+        self._lock = threading.Lock()
+        self._sync_task = PeriodicTask('email-registry', log, 'email registry sync failed')
+
+    def might_exist(self, email):
+        self.checks += 1
+        if self.ready and email not in self.filter:
+            return False
+        self.maybe += 1
+        return True
+
+    def add(self, email):
+        with self._lock:
+            self.filter.add(email)
+
+    def sync(self):
+        """Add users registered since the last sync (all of them on the first call)"""
+        started = time.perf_counter()
+        conn = self._connect()
+        if conn is None:
+            raise ConnectionError("Database connection failed")
+        cursor = conn.cursor()
+        try:
+            if self.filter.count >= self.filter.capacity:
+                # Full: start again with room to grow
+                self.filter, self.last_id, self.ready = BloomFilter(self.filter.capacity * 2, self.error_rate), 0, False
+            while True:
+                cursor.execute("SELECT id, email FROM users WHERE id > %s ORDER BY id LIMIT %s",
+                               (self.last_id, self.batch_size))
+                rows = cursor.fetchall()
+                with self._lock:
+                    for row_id, email in rows:
+                        self.filter.add(email.lower())
+                if rows:
+                    self.last_id = rows[-1][0]
+                if len(rows) < self.batch_size:
+                    break
+        finally:
+            cursor.close()
+            conn.close()
+        if not self.ready:
+            self.ready = True
+            self.warm_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.syncs += 1
+
+    def watch(self, interval):
+        """Warm now, then sync() every interval seconds, in a background thread (once per process)"""
+        if interval <= 0:
+            return
+        # Retry sooner until the first warm-up has succeeded
+        self._sync_task.start(self.sync, lambda: interval if self.ready else min(interval, 5))
+
+    def stats(self):
+        return {
+            'ready': self.ready,
+            'emails': self.filter.count,
+            'filter_bytes': self.filter.size_bytes,
+            'checks': self.checks,
+            'maybe_existing': self.maybe,
+            'warm_ms': self.warm_ms,
+            'syncs': self.syncs,
+            'sync_failures': self._sync_task.failures,
+            'last_error': self._sync_task.last_error
+        }
+
+def create_registry_from_env(connect):
+    """The registry configured by EMAIL_CACHE_* variables, or None to always check the database"""
+    if os.getenv('EMAIL_CACHE_ENABLED', '1') == '0':
+        return None
+    return EmailRegistry(connect, capacity=int(os.getenv('EMAIL_CACHE_CAPACITY', 100000)),
+                         error_rate=float(os.getenv('EMAIL_CACHE_ERROR_RATE', 0.001)))
@@ -0,0 +1,144 @@
+import operator
+
+import numpy as np
+
+BLOOD_GROUP_MAP = {
+    'A+': 1, 'A-': 2, 'B+': 3, 'B-': 4,
+    'AB+': 5, 'AB-': 6, 'O+': 7, 'O-': 8,
+    '': 0, None: 0
+}
+CYCLE_MAP = {'R': 0, 'I': 1, '': 0, None: 0}
+YN_MAP = {'Y': 1, 'N': 0, '': 0, None: 0}
+
+# The model was trained with the dataset's row ids as features. Patients
+# have no such id, so every request gets the training median (pcos.data
+# numbers its 541 rows 1..541) instead of a value that changes per call.
+PATIENT_FILE_NO = 271.0
+
+# ==================== ENCODERS ====================
+# Each encoder reads one payload key through data.get and returns a float.
+
+def _float(get, key, default):
+    return float(get(key, default))
+
+def _float_if_set(get, key, default):
+    value = get(key)
+    return float(value) if value else default
+
+def _flag(get, key, default):
+    return 1.0 if get(key, default) == 1 else 0.0
+
+def _blood_group(get, key, default):
+    return float(BLOOD_GROUP_MAP.get(get(key, default), 0))
+
+def _cycle(get, key, default):
+    return float(CYCLE_MAP.get(get(key, default), 0))
+
+def _yes_no(get, key, default):
+    return float(YN_MAP.get(get(key, default), 0))
+
+def _constant(get, key, default):
+    return default
+
+# (model column, payload key, default, encoder) in the order the form sends them
+FEATURE_SPEC = [
+    ('Sl. No', None, 1.0, _constant),
+    ('Patient File No.', None, PATIENT_FILE_NO, _constant),
+    (' Age (yrs)', 'age', 25, _float),
+    ('Weight (Kg)', 'weight', 60, _float),
+    ('Height(Cm) ', 'height', 160, _float),
+    ('BMI', 'bmi', 23.4, _float),
+    ('Blood Group', 'bloodGroup', '', _blood_group),
+    ('Pulse rate(bpm) ', 'pulseRate', 72, _float),
+    ('RR (breaths/min)', 'respiratoryRate', 16, _float),
+    ('Hb(g/dl)', 'hb', 12.5, _float),
+    ('Cycle(R/I)', 'cycle', 'R', _cycle),
+    ('Cycle length(days)', 'cycleLength', 28, _float),
+    ('Marraige Status (Yrs)', 'marriageStatus', 0, _float),
+    ('Pregnant(Y/N)', 'pregnant', 'N', _yes_no),
+    ('No. of aborptions', 'abortions', 0, _float),
+    (' I beta-HCG(mIU/mL)', 'betaHCG1', 0.0, _float_if_set),
+    ('II beta-HCG(mIU/mL)', 'betaHCG2', 0.0, _float_if_set),
+    ('FSH(mIU/mL)', 'fsh', 5.0, _float_if_set),
+    ('LH(mIU/mL)', 'lh', 4.0, _float_if_set),
+    ('FSH/LH', None, 0.0, _constant),
+    ('Hip(inch)', 'hip', 36, _float),
+    ('Waist(inch)', 'waist', 28, _float),
+    ('Waist:Hip Ratio', None, 0.0, _constant),
+    ('TSH (mIU/L)', 'tsh', 2.5, _float_if_set),
+    ('AMH(ng/mL)', 'amh', 3.0, _float_if_set),
+    ('PRL(ng/mL)', 'prl', 15.0, _float_if_set),
+    ('Vit D3 (ng/mL)', 'vitD3', 30.0, _float_if_set),
+    ('PRG(ng/mL)', 'prg', 10.0, _float_if_set),
+    ('RBS(mg/dl)', 'rbs', 95.0, _float_if_set),
+    ('Weight gain(Y/N)', 'weightGain', 0, _flag),
+    ('hair growth(Y/N)', 'hairGrowth', 0, _flag),
+    ('Skin darkening (Y/N)', 'skinDarkening', 0, _flag),
+    ('Hair loss(Y/N)', 'hairLoss', 0, _flag),
+    ('Pimples(Y/N)', 'pimples', 0, _flag),
+    ('Fast food (Y/N)', 'fastFood', 0, _flag),
+    ('Reg.Exercise(Y/N)', 'regExercise', 0, _flag),
+    ('BP _Systolic (mmHg)', 'bpSystolic', 120, _float),
+    ('BP _Diastolic (mmHg)', 'bpDiastolic', 80, _float),
+    ('Follicle No. (L)', 'follicleNoL', 10.0, _float_if_set),
+    ('Follicle No. (R)', 'follicleNoR', 10.0, _float_if_set),
+    ('Avg. F size (L) (mm)', 'avgFSizeL', 5.0, _float_if_set),
+    ('Avg. F size (R) (mm)', 'avgFSizeR', 5.0, _float_if_set),
+    ('Endometrium (mm)', 'endometrium', 8.0, _float_if_set),
+]
+
+SPEC_INDEX = {name: pos for pos, (name, _, _, _) in enumerate(FEATURE_SPEC)}
+
+# ==================== DERIVED FEATURES ====================
+
+def _ratio_rule(numerator, denominator, fallback, require_numerator=False):
+    num_pos, den_pos = SPEC_INDEX[numerator], SPEC_INDEX[denominator]
+
+    def rule(values):
+        num, den = values[num_pos], values[den_pos]
+        if den > 0 and (num > 0 or not require_numerator):
+            return num / den
+        return fallback
+    return rule
+
+DERIVED_RULES = [
+    ('Waist:Hip Ratio', _ratio_rule('Waist(inch)', 'Hip(inch)', 0.78, require_numerator=True)),
+    ('FSH/LH', _ratio_rule('FSH(mIU/mL)', 'LH(mIU/mL)', 1.25)),
+]
+
+class FeaturePlan:
+    """Precompiled mapping from a /predict payload to the model's feature row.
+
+    Built once from model.feature_names_in_; fill() writes float64 values
+    straight into a NumPy row without building dicts or DataFrames.
+    """
+
+    def __init__(self, feature_names):
+        self.feature_names = np.asarray(feature_names, dtype=object)
+        missing = [name for name in self.feature_names if name not in SPEC_INDEX]
+        if missing:
+            raise ValueError(f"No encoding rule for model features: {missing}")
+        self.column_index = {name: i for i, name in enumerate(self.feature_names)}
+        self.defaults = {name: default for name, _, default, _ in FEATURE_SPEC}
+        self.n_features = len(self.feature_names)
+        self._steps = [(key, default, encode) for _, key, default, encode in FEATURE_SPEC]
+        self._derived = [(SPEC_INDEX[name], rule) for name, rule in DERIVED_RULES]
+        order = [SPEC_INDEX[name] for name in self.feature_names]
+        self._gather = operator.itemgetter(*order)
+
+    def fill(self, data, out=None):
+        """Encode one payload into out (a float64 row), allocating it if needed"""
+        get = data.get
+        values = [encode(get, key, default) for key, default, encode in self._steps]
+        for pos, rule in self._derived:
+            values[pos] = rule(values)
+        if out is None:
+            out = np.empty(self.n_features, dtype=np.float64)
+        out[:] = self._gather(values)
+        return out
+
+    def transform(self, data):
+        """Encode one payload into a (1, n_features) float64 matrix"""
+        out = np.empty((1, self.n_features), dtype=np.float64)
+        self.fill(data, out[0])
+        return out
@@ -0,0 +1,69 @@
+import numpy as np
+
+from geo_index import EARTH_RADIUS_KM
+
+# Upper bound on origins x doctors evaluated in one NumPy expression (~32 MB of float64)
+MAX_BLOCK_ELEMENTS = 4_000_000
+
+class DistanceKernel:
+    """Vectorised Haversine distances from one or many origins to every doctor.
+
+    Doctor coordinates are converted to radians once and kept as contiguous
+    float64 arrays (plus cos(latitude)), so a query is a handful of array
+    operations with no per-doctor Python work. Distances are rounded to
+    0.01 km like calculate_distance; NumPy's trig may differ from libm in
+    the last bit, which can flip a value sitting exactly on a rounding edge.
+    """
+
+    def __init__(self, latitudes, longitudes):
+        self.lat = np.ascontiguousarray(np.radians(np.asarray(latitudes, dtype=np.float64)))
+        self.lon = np.ascontiguousarray(np.radians(np.asarray(longitudes, dtype=np.float64)))
+        self.cos_lat = np.cos(self.lat)
+        self.size = len(self.lat)
+
+    def distances(self, lat, lon):
+        """(n,) unrounded km from one origin (degrees) to every doctor"""
+        return self.distances_many([lat], [lon])[0]
+
+    def distances_many(self, lats, lons):
+        """(m, n) unrounded km from m origins (degrees) to every doctor"""
+        lat1 = np.radians(np.asarray(lats, dtype=np.float64))[:, None]
+        lon1 = np.radians(np.asarray(lons, dtype=np.float64))[:, None]
+        a = (np.sin((self.lat - lat1) / 2) ** 2
+             + np.cos(lat1) * self.cos_lat * np.sin((self.lon - lon1) / 2) ** 2)
+        np.clip(a, 0.0, 1.0, out=a)
+        return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    @staticmethod
+    def _select(rounded, max_km, k):
+        """Positions (nearest first, ties by position) within max_km, at most k"""
+        candidates = np.flatnonzero(rounded <= max_km) if max_km is not None else np.arange(len(rounded))
+        if k is not None and len(candidates) > k:
+            values = rounded[candidates]
+            kth = values[np.argpartition(values, k - 1)[k - 1]]
+            # Keep everything tied with the k-th so ties break on position below
+            candidates = candidates[values <= kth]
+        order = np.lexsort((candidates, rounded[candidates]))
+        selected = candidates[order]
+        if k is not None:
+            selected = selected[:k]
+        return selected, rounded[selected]
+
+    def within(self, lat, lon, max_km, k=None):
+        """(positions, rounded_km) of doctors within max_km of one origin"""
+        if not self.size:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        return self._select(np.round(self.distances(lat, lon), 2), max_km, k)
+
+    def nearest_many(self, lats, lons, k, max_km=None):
+        """[(positions, rounded_km)] per origin: its k nearest doctors, optionally within max_km"""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        if not self.size:
+            return [(np.empty(0, dtype=np.intp), np.empty(0)) for _ in range(len(lats))]
+        results = []
+        block = max(1, MAX_BLOCK_ELEMENTS // self.size)
+        for start in range(0, len(lats), block):
+            rounded = np.round(self.distances_many(lats[start:start + block], lons[start:start + block]), 2)
+            results.extend(self._select(row, max_km, k) for row in rounded)
+        return results
@@ -0,0 +1,83 @@
+from math import radians, sin, cos, sqrt, atan2
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371
+# calculate_distance rounds to 0.01 km, so a point up to 0.005 km beyond the
+# radius can still round inside it; widen tree queries by this much.
+ROUNDING_SLACK_KM = 0.005 + 1e-6
+
+def calculate_distance(lat1, lon1, lat2, lon2):
+    """Calculate distance between two coordinates in kilometers"""
+    R = EARTH_RADIUS_KM
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * atan2(sqrt(a), sqrt(1-a))
+    return round(R * c, 2)
+
+def to_unit_vectors(latitudes, longitudes):
+    """(n, 3) points on the unit sphere for degree coordinates"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+def km_to_chord(km):
+    """Straight-line distance between unit-sphere points km apart on the surface"""
+    return 2.0 * np.sin(min(km, np.pi * EARTH_RADIUS_KM) / (2.0 * EARTH_RADIUS_KM))
+
+class GeoIndex:
+    """k-d tree over doctor locations projected onto the unit sphere.
+
+    Chord distance on the sphere is monotonic in great-circle distance, so
+    the tree prunes candidates; survivors are then measured with
+    calculate_distance and ordered by (distance, catalogue position), which
+    reproduces the original scan-and-sort results exactly.
+    """
+
+    def __init__(self, latitudes, longitudes):
+        self.latitudes = [float(x) for x in latitudes]
+        self.longitudes = [float(x) for x in longitudes]
+        self.size = len(self.latitudes)
+        self._tree = cKDTree(to_unit_vectors(self.latitudes, self.longitudes).reshape(-1, 3))
+
+    def _measure(self, lat, lon, positions, max_km):
+        lats, lons = self.latitudes, self.longitudes
+        hits = []
+        for pos in positions:
+            distance = calculate_distance(lat, lon, lats[pos], lons[pos])
+            if max_km is None or distance <= max_km:
+                hits.append((distance, pos))
+        hits.sort()
+        return hits
+
+    def _ball(self, origin, km):
+        return self._tree.query_ball_point(origin, km_to_chord(km + ROUNDING_SLACK_KM))
+
+    def within(self, lat, lon, max_km):
+        """[(distance_km, position)] for every doctor within max_km, nearest first"""
+        if not self.size:
+            return []
+        origin = to_unit_vectors([lat], [lon])[0]
+        return self._measure(lat, lon, self._ball(origin, max_km), max_km)
+
+    def nearest(self, lat, lon, k, max_km=None):
+        """The k nearest doctors (optionally within max_km), nearest first"""
+        if not self.size or k <= 0:
+            return []
+        k = min(k, self.size)
+        origin = to_unit_vectors([lat], [lon])[0]
+        upper = km_to_chord(max_km + ROUNDING_SLACK_KM) if max_km is not None else np.inf
+        _, found = self._tree.query(origin, k=k, distance_upper_bound=upper)
+        found = [int(p) for p in np.atleast_1d(found) if p < self.size]
+        if not found:
+            return []
+        hits = self._measure(lat, lon, found, max_km)
+        if len(hits) < k:
+            return hits
+        # Pull in every doctor tied with the k-th after rounding, so ties
+        # break on catalogue position just like the full sort does.
+        return self._measure(lat, lon, self._ball(origin, hits[-1][0]), max_km)[:k]
@@ -0,0 +1,97 @@
+# Gunicorn settings, picked up automatically by `gunicorn main:app` (see Procfile).
+import gc
+import multiprocessing
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+
+from inference_service import private_dir
+from metrics import retire_process
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv('WEB_CONCURRENCY', min(4, multiprocessing.cpu_count() * 2 + 1)))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+
+# Threaded workers: each process serves `threads` requests at once, so a
+# login or booking waiting on MySQL doesn't hold up the rest. bcrypt and
+# inference run on their own bounded pools (BCRYPT_WORKERS,
+# INFERENCE_WORKERS), and DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW should cover
+# `threads`. GUNICORN_WORKER_CLASS=sync restores one request per process
+# (gunicorn would turn it back into gthread if threads were above 1).
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 8 if worker_class == 'gthread' else 1))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Import main.py (and load the model) once in the master so workers share
+# those pages copy-on-write instead of each unpickling their own copy.
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') != '0'
+
+# /metrics across workers: each worker writes its histogram counts to a
+# file here, and a scrape of any worker sums them all. By default a fresh
+# mkdtemp() directory (0700, unguessable) removed on exit; a configured
+# METRICS_DIR must be ours and not writable by others, and its old count
+# files are cleared on every server start so they don't come back.
+metrics_dir = None
+metrics_dir_created = False
+if os.getenv('METRICS_ENABLED', '1') != '0':
+    if os.getenv('METRICS_DIR'):
+        metrics_dir = os.environ['METRICS_DIR']
+        private_dir(metrics_dir)
+        for name in os.listdir(metrics_dir):
+            if name.endswith(('.json', '.json.tmp')):
+                os.unlink(os.path.join(metrics_dir, name))
+    else:
+        metrics_dir = os.environ['METRICS_DIR'] = tempfile.mkdtemp(
+            prefix=f"gynai-metrics-{bind.rsplit(':', 1)[-1]}-")
+        metrics_dir_created = True
+
+# INFERENCE_SERVICE=1: predictions go to a pool of model processes
+# (inference_service.py, INFERENCE_PROCESSES of them) that batch concurrent
+# requests from all workers, instead of running in every worker. Started
+# here, before main.py is imported, so the app finds it on the socket.
+if os.getenv('INFERENCE_SERVICE', '0') == '1' and 'INFERENCE_SERVICE_PID' not in os.environ:
+    # The service creates this directory 0700 and the socket 0600
+    os.environ.setdefault('INFERENCE_SERVICE_SOCKET',
+                          os.path.join(tempfile.gettempdir(), f"gynai-inference-{bind.rsplit(':', 1)[-1]}",
+                                       'inference.sock'))
+    os.environ['INFERENCE_SERVICE_PID'] = str(subprocess.Popen(
+        [sys.executable, 'inference_service.py', os.environ['INFERENCE_SERVICE_SOCKET'], '--exit-with-parent'],
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    ).pid)
+
+def on_exit(server):
+    if metrics_dir_created:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+    if 'INFERENCE_SERVICE_PID' in os.environ:
+        try:
+            os.kill(int(os.environ['INFERENCE_SERVICE_PID']), signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the GC's reach; otherwise the
+    # first collection in each worker touches every object header and
+    # un-shares the pages preload_app saved.
+    if preload_app:
+        gc.freeze()
+
+def child_exit(server, worker):
+    # Runs in the master once a worker has gone, gracefully or not
+    if metrics_dir:
+        retire_process(metrics_dir, worker.pid)
+
+def worker_exit(server, worker):
+    from main import db_pool, log_handler, login_history_writer, metrics
+    if metrics is not None and metrics.multiprocess_dir:
+        try:
+            metrics.flush()  # the last interval's counts, before child_exit retires the file
+        except OSError:
+            pass
+    if login_history_writer is not None:
+        login_history_writer.close()
+    if db_pool is not None:
+        db_pool.dispose()
+    log_handler.close()
@@ -0,0 +1,157 @@
+import copy
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+DEFAULT_CONFIDENCE = 0.75
+
+log = logging.getLogger('gynai.inference')
+
+class InferenceBusyError(Exception):
+    """Raised when the inference queue is full; routes answer 503"""
+
+class InferenceEngine:
+    """Single-pass PCOS inference on top of a fitted classifier.
+
+    The class label and confidence both come from one predict_proba call
+    (argmax and max of the probability row), which for the RandomForest we
+    ship is exactly what model.predict would return. When the caller
+    guarantees rows are already in model.feature_names_in_ order (checked
+    once here) the model is fed a contiguous float64 array instead of a
+    DataFrame, through a shallow copy without feature_names_in_ so sklearn
+    has no names to compare and nothing to warn about. Batch calls go to a
+    shallow copy carrying batch_n_jobs, so the shared estimator is never
+    mutated while other threads predict with it.
+    """
+
+    def __init__(self, model, feature_names=None, batch_n_jobs=None):
+        self.classes = getattr(model, 'classes_', None)
+        self.has_proba = hasattr(model, 'predict_proba') and self.classes is not None
+        self._proba_lock = threading.Lock()
+        fitted_names = getattr(model, 'feature_names_in_', None)
+        self.fast_path = (
+            feature_names is not None and fitted_names is not None
+            and list(fitted_names) == list(feature_names)
+        )
+        if self.fast_path:
+            # Shares the fitted trees; the column order is already verified
+            model = copy.copy(model)
+            del model.feature_names_in_
+        self.model = model
+        self.set_n_jobs(batch_n_jobs)
+
+    def set_n_jobs(self, n_jobs):
+        """Set the estimator n_jobs used for batch calls (None keeps the model's own)"""
+        self.batch_n_jobs = n_jobs
+        self.batch_model = self.model
+        if n_jobs is not None and hasattr(self.model, 'n_jobs'):
+            # Shares the fitted trees; only the copy's n_jobs differs
+            self.batch_model = copy.copy(self.model)
+            self.batch_model.n_jobs = n_jobs
+
+    def _prepare(self, X):
+        if self.fast_path:
+            return np.ascontiguousarray(X, dtype=np.float64)
+        return X
+
+    def _run(self, model, X):
+        if self.has_proba:
+            try:
+                probabilities = model.predict_proba(X)
+                return self.classes[probabilities.argmax(axis=1)], probabilities.max(axis=1)
+            except (AttributeError, NotImplementedError) as e:
+                # A model that exposes predict_proba but can't compute it
+                self._disable_proba(model, e)
+        labels = np.asarray(model.predict(X))
+        return labels, np.full(len(labels), DEFAULT_CONFIDENCE)
+
+    def _disable_proba(self, model, error):
+        with self._proba_lock:
+            if not self.has_proba:
+                return
+            self.has_proba = False
+        log.warning('predict_proba unavailable, using predict with default confidence',
+                    extra={'model': type(model).__name__, 'error': str(error)})
+
+    def predict(self, X):
+        """Return (labels, confidences) for a 2-D feature matrix"""
+        return self._run(self.model, self._prepare(X))
+
+    def predict_batch(self, X):
+        """Like predict, but runs with the batch n_jobs setting"""
+        return self._run(self.batch_model, self._prepare(X))
+
+    def predict_one(self, row):
+        """Return (label, confidence) as plain Python values for a single row"""
+        labels, confidences = self.predict(np.reshape(row, (1, -1)))
+        return int(labels[0]), float(confidences[0])
+
+class InferenceExecutor:
+    """Runs inference calls on a small bounded thread pool.
+
+    Under a threaded server every request thread could otherwise be inside
+    predict_proba at once, and the CPU-bound work crowds out the threads
+    waiting on the database. `workers` threads cap how much of the process
+    inference may occupy; at most `max_queue` calls wait behind them and
+    beyond that InferenceBusyError is raised immediately. With workers=0
+    calls run inline on the request thread.
+    """
+
+    def __init__(self, workers=1, max_queue=32):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_seconds = 0.0
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers else None
+        self._stats_lock = threading.Lock()
+
+    def _pool(self):
+        # Created lazily (and again after fork): executor threads don't survive fork
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='inference')
+            self._pid = os.getpid()
+        return self._executor
+
+    def run(self, fn, *args):
+        """fn(*args) on the pool, waiting for the result"""
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            raise InferenceBusyError("Inference queue is full")
+        submitted = time.perf_counter()
+
+        def task():
+            waited = time.perf_counter() - submitted
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+                with self._stats_lock:
+                    self.completed += 1
+                    self.queue_wait_seconds += waited
+        return self._pool().submit(task).result()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_queue_wait_ms': round(self.queue_wait_seconds / self.completed * 1000, 3)
+                if self.completed else None
+            }
+
+def create_executor_from_env():
+    """Executor configured by INFERENCE_WORKERS / INFERENCE_MAX_QUEUE"""
+    return InferenceExecutor(workers=int(os.getenv('INFERENCE_WORKERS', 1)),
+                             max_queue=int(os.getenv('INFERENCE_MAX_QUEUE', 32)))
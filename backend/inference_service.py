@@ -0,0 +1,353 @@
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# Request:  (rows, columns) then rows * columns float64; rows == 0 asks for describe()
+# Response: (status, payload bytes) then the payload: int64 labels + float64
+#           confidences for OK, JSON for INFO, a utf-8 message for ERROR
+REQUEST = struct.Struct('=II')
+RESPONSE = struct.Struct('=BI')
+OK, INFO, ERROR = 0, 1, 2
+
+class InferenceServiceError(Exception):
+    """Raised when the inference service can't be reached or fails a request; routes answer 503"""
+
+def _error_reply(message):
+    payload = str(message).encode('utf-8')
+    return RESPONSE.pack(ERROR, len(payload)) + payload
+
+def private_dir(path):
+    """Create path as a 0700 directory, or check an existing one can't be written by other users"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o022:
+        raise PermissionError(f"{path} must be a directory owned by this user and not writable by others")
+
+def _recv_exactly(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    while n:
+        got = sock.recv_into(view[-n:], n)
+        if not got:
+            raise ConnectionError("Inference service connection closed")
+        n -= got
+    return buf
+
+class _Request:
+    __slots__ = ('sock', 'rows')
+
+    def __init__(self, sock, rows):
+        self.sock = sock
+        self.rows = rows
+
+class ModelProcess:
+    """One model process: accepts web-worker connections and micro-batches their rows.
+
+    Each connection gets a reader thread and carries one request at a time.
+    A single batching thread takes the oldest waiting request, then keeps
+    collecting until it has max_batch rows, max_wait seconds have passed,
+    or every open connection is already in the batch (nothing else can
+    arrive), and answers them all from one predict_proba call. It only
+    waits when the previous batch held more than one request, so a lone
+    client isn't charged max_wait on every call.
+
+    A request must have describe['expected_features'] columns and at most
+    max_rows rows. A header announcing more data than that is answered
+    with an error and the connection closed before anything is allocated.
+    If a batch fails as a whole, its requests are retried one by one so
+    one bad request (say, a NaN) only fails itself.
+    """
+
+    def __init__(self, listener, engine, describe, max_batch=64, max_wait=0.002, max_rows=5000):
+        self.listener = listener
+        self.engine = engine
+        self.describe = describe
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_rows = max_rows
+        self.columns = describe['expected_features']
+        self.connections = 0
+        self._pending = queue.SimpleQueue()
+        self._lock = threading.Lock()
+
+    def serve_forever(self):
+        threading.Thread(target=self._batch_loop, name='batcher', daemon=True).start()
+        while True:
+            sock, _ = self.listener.accept()
+            with self._lock:
+                self.connections += 1
+            threading.Thread(target=self._read_loop, args=(sock,), daemon=True).start()
+
+    def _read_loop(self, sock):
+        try:
+            while True:
+                rows, columns = REQUEST.unpack(_recv_exactly(sock, REQUEST.size))
+                if rows == 0:
+                    payload = json.dumps(self.describe).encode('utf-8')
+                    sock.sendall(RESPONSE.pack(INFO, len(payload)) + payload)
+                    continue
+                if rows > self.max_rows or rows * columns > self.max_rows * self.columns:
+                    sock.sendall(_error_reply(f"Request of {rows}x{columns} values exceeds "
+                                              f"{self.max_rows} rows of {self.columns} features"))
+                    break
+                data = _recv_exactly(sock, rows * columns * 8)
+                if columns != self.columns:
+                    sock.sendall(_error_reply(f"Expected {self.columns} features per row, got {columns}"))
+                    continue
+                self._pending.put(_Request(sock, np.frombuffer(data, dtype=np.float64).reshape(rows, columns)))
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            with self._lock:
+                self.connections -= 1
+            sock.close()
+
+    def _batch_loop(self):
+        concurrent = False
+        while True:
+            batch = [self._pending.get()]
+            rows = len(batch[0].rows)
+            deadline = time.monotonic() + (self.max_wait if concurrent else 0)
+            while rows < self.max_batch and len(batch) < self.connections:
+                try:
+                    request = self._pending.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                batch.append(request)
+                rows += len(request.rows)
+            concurrent = len(batch) > 1
+            self._answer(batch)
+
+    def _replies(self, batch):
+        """One OK reply per request, from a single predict over all their rows"""
+        X = batch[0].rows if len(batch) == 1 else np.concatenate([r.rows for r in batch])
+        labels, confidences = self.engine.predict(X)
+        labels = np.asarray(labels, dtype=np.int64)
+        confidences = np.asarray(confidences, dtype=np.float64)
+        replies, start = [], 0
+        for request in batch:
+            end = start + len(request.rows)
+            payload = labels[start:end].tobytes() + confidences[start:end].tobytes()
+            replies.append(RESPONSE.pack(OK, len(payload)) + payload)
+            start = end
+        return replies
+
+    def _reply_alone(self, request):
+        try:
+            return self._replies([request])[0]
+        except Exception as e:
+            return _error_reply(e)
+
+    def _answer(self, batch):
+        try:
+            replies = self._replies(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                replies = [_error_reply(e)]
+            else:
+                replies = [self._reply_alone(request) for request in batch]
+        for request, reply in zip(batch, replies):
+            try:
+                request.sock.sendall(reply)
+            except OSError:
+                pass  # the reader thread notices and closes it
+
+def _run_model_process(listener, model_path, max_batch, max_wait, max_rows):
+    from feature_plan import FeaturePlan
+    from inference import InferenceEngine
+    from model_loader import load_model
+    from prediction_cache import file_sha256
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    model, load_stats = load_model(model_path)
+    feature_names = FeaturePlan(model.feature_names_in_).feature_names
+    describe = {
+        'model_type': type(model).__name__,
+        'expected_features': int(model.n_features_in_),
+        'feature_names': model.feature_names_in_.tolist(),
+        'model_hash': file_sha256(model_path),
+        'load_stats': load_stats,
+        'max_batch': max_batch,
+        'max_wait_ms': max_wait * 1000
+    }
+    ModelProcess(listener, InferenceEngine(model, feature_names), describe, max_batch, max_wait,
+                 max_rows).serve_forever()
+
+class InferenceService:
+    """A fixed pool of model processes behind one Unix socket.
+
+    The socket is bound here and inherited by `processes` children, each
+    loading the model once and accepting connections from it, so the
+    kernel spreads web-worker connections across them. Children that die
+    are restarted. With exit_with_parent the service stops when the
+    process that started it (the gunicorn master) goes away. The socket
+    is created 0600 in a directory other users can't write to, so only
+    this user's web workers can connect.
+    """
+
+    def __init__(self, socket_path, model_path, processes=1, max_batch=64, max_wait=0.002, max_rows=5000):
+        self.socket_path = socket_path
+        self.model_path = model_path
+        self.processes = processes
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_rows = max_rows
+        self._children = []
+
+    def _start_child(self, listener):
+        # fork: the children inherit the bound listener
+        child = multiprocessing.get_context('fork').Process(
+            target=_run_model_process, name='inference-model',
+            args=(listener, self.model_path, self.max_batch, self.max_wait, self.max_rows), daemon=True
+        )
+        child.start()
+        return child
+
+    def serve_forever(self, exit_with_parent=False):
+        private_dir(os.path.dirname(os.path.abspath(self.socket_path)))
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            listener.bind(self.socket_path)
+        finally:
+            os.umask(umask)
+        listener.listen(1024)
+        parent = os.getppid()
+        stopping = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+        signal.signal(signal.SIGINT, lambda *_: stopping.set())
+        self._children = [self._start_child(listener) for _ in range(self.processes)]
+        print(f"✓ Inference service on {self.socket_path}: {self.processes} model processes, "
+              f"batches of up to {self.max_batch} rows within {self.max_wait * 1000:g} ms")
+        try:
+            while not stopping.wait(1):
+                if exit_with_parent and os.getppid() != parent:
+                    break
+                for i, child in enumerate(self._children):
+                    if not child.is_alive():
+                        print(f"✗ Inference model process {child.pid} exited ({child.exitcode}), restarting")
+                        self._children[i] = self._start_child(listener)
+        finally:
+            for child in self._children:
+                child.terminate()
+            for child in self._children:
+                child.join(5)
+            listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+class InferenceClient:
+    """Stand-in for InferenceEngine that sends rows to an InferenceService.
+
+    Each thread keeps its own connection (reopened after fork or an error,
+    with one retry per call), so concurrent requests from a threaded
+    worker reach the service together and can share a batch.
+    """
+
+    def __init__(self, socket_path, timeout=30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.calls = 0
+        self.failures = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None or self._local.pid != os.getpid():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock, self._local.pid = sock, os.getpid()
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    def _call(self, header, body=b''):
+        for attempt in (1, 2):
+            try:
+                sock = self._connection()
+                sock.sendall(header + body)
+                status, size = RESPONSE.unpack(_recv_exactly(sock, RESPONSE.size))
+                payload = _recv_exactly(sock, size)
+                break
+            except (OSError, ConnectionError) as e:
+                self._close()
+                if attempt == 2:
+                    with self._stats_lock:
+                        self.failures += 1
+                    raise InferenceServiceError(f"Inference service unavailable: {e}") from e
+        if status == ERROR:
+            with self._stats_lock:
+                self.failures += 1
+            raise InferenceServiceError(payload.decode('utf-8', 'replace'))
+        return status, payload
+
+    def predict(self, X):
+        """(labels, confidences) for a 2-D feature matrix"""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        with self._stats_lock:
+            self.calls += 1
+        _, payload = self._call(REQUEST.pack(*X.shape), X.tobytes())
+        return (np.frombuffer(payload, dtype=np.int64, count=len(X)),
+                np.frombuffer(payload, dtype=np.float64, offset=len(X) * 8))
+
+    predict_batch = predict
+
+    def predict_one(self, row):
+        labels, confidences = self.predict(np.reshape(row, (1, -1)))
+        return int(labels[0]), float(confidences[0])
+
+    def describe(self, wait=0.0):
+        """The serving model's type, feature names, hash and load stats; retries for up to wait seconds"""
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                _, payload = self._call(REQUEST.pack(0, 0))
+                return json.loads(payload)
+            except InferenceServiceError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.2)
+
+    def stats(self):
+        with self._stats_lock:
+            return {'socket': self.socket_path, 'calls': self.calls, 'failures': self.failures}
+
+def default_socket_path(port):
+    return os.path.join(tempfile.gettempdir(), f'gynai-inference-{port}', 'inference.sock')
+
+def create_service_from_env(socket_path):
+    """InferenceService configured by MODEL_PATH and the INFERENCE_* variables"""
+    return InferenceService(socket_path, os.getenv('MODEL_PATH', 'pcos_model (2).pkl'),
+                            processes=int(os.getenv('INFERENCE_PROCESSES', os.cpu_count() or 1)),
+                            max_batch=int(os.getenv('INFERENCE_MAX_BATCH', 64)),
+                            max_wait=float(os.getenv('INFERENCE_MAX_WAIT_MS', 2)) / 1000,
+                            # The most rows a route sends in one call (/predict/batch)
+                            max_rows=int(os.getenv('PREDICT_BATCH_MAX_ROWS', 5000)))
+
+if __name__ == '__main__':
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    path = args[0] if args else os.getenv('INFERENCE_SERVICE_SOCKET') or default_socket_path(os.getenv('PORT', '5001'))
+    create_service_from_env(path).serve_forever(exit_with_parent='--exit-with-parent' in sys.argv)
@@ -0,0 +1,190 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from background import ProcessThread
+
+log = logging.getLogger('gynai.login_history')
+
+INSERT_PREFIX = "INSERT INTO login_history (user_id, login_time, ip_address, user_agent, event_id) VALUES "
+ROW_PLACEHOLDER = "(%s, %s, %s, %s, %s)"
+# event_id is unique, so a batch re-sent after a commit whose outcome was lost is a no-op
+INSERT_SUFFIX = " ON DUPLICATE KEY UPDATE event_id = event_id"
+
+def login_row(user_id, ip_address=None, user_agent=None):
+    """One login_history row, with the event_id that makes writing it idempotent"""
+    return (user_id, datetime.now().replace(microsecond=0),
+            (ip_address or None) and ip_address[:45], user_agent or None, uuid.uuid4().hex)
+
+# Tables created from an older database.txt have only (id, user_id, login_time)
+LEGACY_INSERT_PREFIX = "INSERT INTO login_history (user_id, login_time) VALUES "
+LEGACY_ROW_PLACEHOLDER = "(%s, %s)"
+ER_BAD_FIELD_ERROR = 1054
+_legacy_schema = [False]
+
+def insert_login_rows(conn, rows):
+    """Write login_row() tuples in one multi-row INSERT and one commit.
+
+    On a legacy login_history table (no ip_address/user_agent/event_id)
+    only user_id and login_time are written, without the idempotency key;
+    the fallback is logged once and used from then on.
+    """
+    cursor = conn.cursor()
+    try:
+        if not _legacy_schema[0]:
+            try:
+                cursor.execute(INSERT_PREFIX + ", ".join([ROW_PLACEHOLDER] * len(rows)) + INSERT_SUFFIX,
+                               [value for row in rows for value in row])
+                conn.commit()
+                return
+            except Exception as e:
+                if getattr(e, 'errno', None) != ER_BAD_FIELD_ERROR:
+                    raise
+                _legacy_schema[0] = True
+                log.warning('login_history is missing ip_address/user_agent/event_id; writing '
+                            'user_id and login_time only until the table is migrated',
+                            extra={'error': str(e)})
+        cursor.execute(LEGACY_INSERT_PREFIX + ", ".join([LEGACY_ROW_PLACEHOLDER] * len(rows)),
+                       [value for row in rows for value in row[:2]])
+        conn.commit()
+    finally:
+        cursor.close()
+
+MIGRATION_COLUMNS = [
+    ('ip_address', "ADD COLUMN ip_address VARCHAR(45)"),
+    ('user_agent', "ADD COLUMN user_agent TEXT"),
+    ('event_id', "ADD COLUMN event_id CHAR(32) NULL, ADD UNIQUE KEY uq_event_id (event_id)"),
+]
+
+def migrate_login_history(cursor):
+    """Add the columns batched writes need to an older login_history table; returns those added"""
+    cursor.execute("SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'login_history'")
+    existing = {row[0] for row in cursor.fetchall()}
+    missing = [(name, clause) for name, clause in MIGRATION_COLUMNS if name not in existing]
+    if missing:
+        cursor.execute("ALTER TABLE login_history " + ", ".join(clause for _, clause in missing))
+    return [name for name, _ in missing]
+
+class LoginHistoryWriter:
+    """Buffers login events and writes them to login_history in batches.
+
+    record() only enqueues; a background thread flushes when batch_size
+    events are waiting or flush_interval seconds have passed since the
+    oldest one. The queue holds at most max_pending events: record() then
+    blocks for up to block_timeout seconds (backpressure) and drops the
+    event if the writer still can't keep up. A failed batch is retried
+    whole; rows carry an event_id, so rows that did land are not written
+    twice. close() flushes what is left.
+    """
+
+    def __init__(self, connect, batch_size=200, flush_interval=1.0, max_pending=10000,
+                 block_timeout=0.05, max_retries=3):
+        self._connect = connect
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        # Started on first use, and again in each forked worker
+        self._thread = ProcessThread(self._run, 'login-history', prepare=self._reset_closing)
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def _reset_closing(self):
+        self._closing = threading.Event()
+
+    def record(self, user_id, ip_address=None, user_agent=None):
+        """Queue one login; returns False if it had to be dropped"""
+        self._thread.start()
+        row = login_row(user_id, ip_address, user_agent)
+        try:
+            self._queue.put(row, timeout=self.block_timeout)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.recorded += 1
+        return True
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=0.5))
+            except queue.Empty:
+                if self._closing.is_set():
+                    return
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = 0 if self._closing.is_set() else deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                                 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, rows):
+        for attempt in range(self.max_retries):
+            conn = None
+            try:
+                conn = self._connect()
+                if conn is None:
+                    raise ConnectionError("Database connection failed")
+                insert_login_rows(conn, rows)
+                with self._lock:
+                    self.written += len(rows)
+                    self.batches += 1
+                return
+            except Exception as e:
+                log.warning('login_history flush failed',
+                            extra={'rows': len(rows), 'attempt': attempt + 1, 'error': str(e)})
+                time.sleep(min(0.1 * 2 ** attempt, 2.0))
+            finally:
+                if conn is not None:
+                    conn.close()
+        log.error('login_history batch dropped after retries',
+                  extra={'rows': len(rows), 'attempts': self.max_retries})
+        with self._lock:
+            self.failed += len(rows)
+
+    def close(self, timeout=10.0):
+        """Stop the writer thread after flushing everything queued"""
+        if not self._thread.running():
+            return
+        self._closing.set()
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': self._queue.qsize(),
+                'recorded': self.recorded,
+                'written': self.written,
+                'batches': self.batches,
+                'dropped': self.dropped,
+                'failed': self.failed
+            }
+
+def create_writer_from_env(connect):
+    """The async writer configured by LOGIN_HISTORY_* variables, or None for inline writes"""
+    if os.getenv('LOGIN_HISTORY_ASYNC', '1') == '0':
+        return None
+    return LoginHistoryWriter(
+        connect,
+        batch_size=int(os.getenv('LOGIN_HISTORY_BATCH_SIZE', 200)),
+        flush_interval=float(os.getenv('LOGIN_HISTORY_FLUSH_INTERVAL', 1.0)),
+        max_pending=int(os.getenv('LOGIN_HISTORY_MAX_PENDING', 10000))
+    )
@@ -1,24 +1,58 @@
-from flask import Flask, request, jsonify, session, send_from_directory
+from flask import Flask, request, jsonify, session, send_from_directory, g
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import mysql.connector
-import bcrypt
+import atexit
+import logging
+import math
 import os
 import re
 import json
-from datetime import timedelta
-from math import radians, sin, cos, sqrt, atan2
-import joblib
+from contextlib import nullcontext
+from datetime import datetime, timedelta
 import numpy as np
-import pandas as pd
+
+from appointments import AppointmentStore, SlotTakenError, parse_slot
+from auth_tokens import ACCESS, REFRESH, TokenError, create_authority_from_env
+from availability import AVAILABILITY_WINDOWS, create_engine_from_env
+from catalog_manager import create_manager_from_env
+from db_pool import ER_DUP_ENTRY, PoolTimeoutError, StoreUnavailableError, create_pool_from_env
+from doctor_catalog import doctor_matches
+from doctor_listing import (DEFAULT_PAGE_SIZE, NDJSON_MIMETYPES, CursorError, decode_cursor,
+                            encode_cursor, ndjson_chunks, parse_fields, project)
+from doctor_search import tokenize
+from email_registry import create_registry_from_env
+from feature_plan import FeaturePlan
+from inference import InferenceBusyError, InferenceEngine, InferenceExecutor, create_executor_from_env
+from inference_service import InferenceClient, InferenceServiceError
+from login_history import create_writer_from_env, insert_login_rows, login_row
+from metrics import create_metrics_from_env
+from model_loader import load_model
+from password_hashing import HasherBusyError, create_hasher_from_env
+from prediction_cache import create_prediction_cache, file_sha256
+from response_cache import create_response_cache
+from structured_logging import configure_logging_from_env
+from tracker_store import TrackerStore
 
 # Initialize Flask app
 app = Flask(__name__)
+
+# Structured JSON logs; request threads only enqueue, a background thread writes
+log_handler = configure_logging_from_env(app, 'gynai')
+atexit.register(log_handler.close)
+log = logging.getLogger('gynai')
 app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'None'
 app.config['SESSION_COOKIE_SECURE'] = False  # Set to True for production (HTTPS)
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)
 
+# Number of reverse proxies in front of the app whose X-Forwarded-* headers are trusted;
+# 0 (the default) ignores them, so clients can't choose their own remote_addr
+PROXY_FIX_HOPS = int(os.getenv('PROXY_FIX_HOPS', 0))
+if PROXY_FIX_HOPS > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_FIX_HOPS, x_proto=PROXY_FIX_HOPS)
+
 # CORS configuration
 CORS(app, supports_credentials=True, origins=[
     "http://localhost:3000",
@@ -28,7 +62,13 @@ CORS(app, supports_credentials=True, origins=[
     "http://localhost:8000",
     "http://127.0.0.1:8000",
     os.getenv('FRONTEND_URL', '')
-], allow_headers=["Content-Type"], methods=["GET", "POST", "OPTIONS"])
+], allow_headers=["Content-Type", "Authorization"], expose_headers=["X-Total-Count", "X-Next-Cursor"], methods=["GET", "POST", "OPTIONS"])
+
+# Latency histograms per route and internal stage, scraped from /metrics
+metrics = create_metrics_from_env()
+if metrics is not None:
+    metrics.install(app)
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
 
 # Database configuration
 db_config = {
@@ -38,132 +78,321 @@ db_config = {
     'database': os.getenv('DB_NAME', 'user_system')
 }
 
+# Connection pool (per worker; opened lazily so nothing is inherited across fork)
+db_pool = create_pool_from_env(lambda: mysql.connector.connect(**db_config))
+
+# bcrypt runs on a bounded thread pool so login bursts can't starve other routes
+password_hasher = create_hasher_from_env()
+
+# Bloom filter of registered emails, so obvious duplicates skip bcrypt
+email_registry = create_registry_from_env(lambda: get_db_connection())
+EMAIL_CACHE_SYNC_INTERVAL = float(os.getenv('EMAIL_CACHE_SYNC_INTERVAL', 60))
+
+# login_history rows are buffered and written in batches off the request path
+login_history_writer = create_writer_from_env(lambda: get_db_connection())
+if login_history_writer is not None:
+    atexit.register(login_history_writer.close)
+
+# AUTH_MODE: 'session' (Flask cookie session), 'token' (signed bearer tokens
+# verified in memory) or 'both'
+AUTH_MODE = os.getenv('AUTH_MODE', 'session')
+token_authority = create_authority_from_env(app.secret_key, lambda: get_db_connection())
+AUTH_REVOCATION_SYNC_INTERVAL = float(os.getenv('AUTH_REVOCATION_SYNC_INTERVAL', 5))
+
+# Free-slot bitmaps per doctor and day behind the availability filters;
+# updated on every booking here, re-synced from MySQL for other workers'
+availability_engine = create_engine_from_env()
+AVAILABILITY_SYNC_INTERVAL = float(os.getenv('AVAILABILITY_SYNC_INTERVAL', 30))
+
+# Appointments live in MySQL; the slot's UNIQUE key arbitrates concurrent bookings
+appointment_store = AppointmentStore(lambda: get_db_connection(), slot_minutes=availability_engine.slot_minutes)
+
+# Symptom tracker entries, with weekly/monthly rollups maintained on write
+tracker_store = TrackerStore(lambda: get_db_connection())
+TRACKER_MAX_UPLOAD = int(os.getenv('TRACKER_MAX_UPLOAD', 5000))
+
 # Google Maps API Key
 GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY', 'YOUR_API_KEY_HERE')
 
-# Load ML model
-model = None
+# Load ML model and compile its feature-encoding plan. With
+# INFERENCE_SERVICE_SOCKET set (gunicorn.conf.py does for INFERENCE_SERVICE=1)
+# the model lives in the inference service's processes instead, which batch
+# predictions from every worker; this process only asks it for the feature names.
+MODEL_PATH = os.getenv('MODEL_PATH', 'pcos_model (2).pkl')
+PREDICT_BATCH_N_JOBS = int(os.getenv('PREDICT_BATCH_N_JOBS', 0)) or None
+INFERENCE_SERVICE_SOCKET = os.getenv('INFERENCE_SERVICE_SOCKET')
+model_description = None
+feature_plan = None
+inference = None
+prediction_cache = None
 try:
-    model = joblib.load('pcos_model (2).pkl')
-    print("✓ PCOS Model loaded successfully!")
+    if INFERENCE_SERVICE_SOCKET:
+        inference = InferenceClient(INFERENCE_SERVICE_SOCKET, timeout=float(os.getenv('INFERENCE_TIMEOUT', 30)))
+        model_description = inference.describe(wait=float(os.getenv('INFERENCE_SERVICE_WAIT', 60)))
+        model_hash = model_description.pop('model_hash')
+        print(f"✓ Using the inference service at {INFERENCE_SERVICE_SOCKET} "
+              f"({model_description['model_type']}, {model_description['expected_features']} features)")
+    else:
+        model, model_load_stats = load_model(MODEL_PATH)
+        inference = InferenceEngine(model, FeaturePlan(model.feature_names_in_).feature_names,
+                                    batch_n_jobs=PREDICT_BATCH_N_JOBS)
+        model_hash = file_sha256(MODEL_PATH)
+        model_description = {
+            'model_type': type(model).__name__,
+            'expected_features': int(model.n_features_in_),
+            'feature_names': model.feature_names_in_.tolist(),
+            'load_stats': model_load_stats
+        }
+        print(f"✓ PCOS Model loaded successfully! ({model_load_stats['load_ms']} ms, "
+              f"+{model_load_stats['rss_delta_mb']} MB RSS, pid {model_load_stats['pid']})")
+    feature_plan = FeaturePlan(model_description['feature_names'])
+    prediction_cache = create_prediction_cache(model_hash)
 except Exception as e:
+    inference = None
     print(f"✗ Error loading model: {e}")
 
-# Load doctors data
-doctors_data = {"doctors": [], "specialties": [], "availabilityOptions": []}
-try:
-    with open('database.json', 'r') as f:
-        doctors_data = json.load(f)
-    print("✓ Doctors database loaded successfully!")
-except FileNotFoundError:
-    print("✗ database.json not found")
+# Inference runs on a bounded thread pool so a threaded worker's request
+# threads can't all be CPU-bound in predict_proba at once. Calls to the
+# inference service run inline: it bounds its own CPU, and batches better
+# the more requests reach it together.
+inference_executor = InferenceExecutor(workers=0) if INFERENCE_SERVICE_SOCKET else create_executor_from_env()
+
+# Doctors catalogue: immutable indexed snapshots of database.json, swapped in
+# when the file changes. Each snapshot carries its pre-serialised responses,
+# and the availability engine lays its bitmaps out for it once on publish.
+catalog_manager = create_manager_from_env(lambda *args: build_response_cache(*args),
+                                          on_publish=lambda *args: availability_engine.attach(*args))
 
 # ==================== HELPER FUNCTIONS ====================
 
+def current_user():
+    """{'id', 'username', 'email'} of the caller, from a bearer token or the session; None if anonymous"""
+    if 'current_user' not in g:
+        user = None
+        header = request.headers.get('Authorization', '')
+        if token_authority is not None and header.startswith('Bearer '):
+            try:
+                claims = token_authority.verify(header[7:])
+                user = {'id': claims['u'], 'username': claims['n'], 'email': claims['e']}
+            except TokenError:
+                pass
+        elif AUTH_MODE != 'token' and 'user_id' in session:
+            user = {'id': session['user_id'], 'username': session['username'], 'email': session['email']}
+        g.current_user = user
+    return g.current_user
+
+def timed(stage):
+    """Context manager recording its block as an internal stage in /metrics"""
+    return metrics.stage(stage) if metrics is not None else nullcontext()
+
 def get_db_connection():
     try:
-        return mysql.connector.connect(**db_config)
-    except mysql.connector.Error as err:
-        print(f"Database connection error: {err}")
+        with timed('db_connect'):
+            conn = db_pool.connect() if db_pool is not None else mysql.connector.connect(**db_config)
+        return metrics.connection(conn) if metrics is not None else conn
+    except (mysql.connector.Error, PoolTimeoutError) as err:
+        log.warning('database connection failed', extra={'error': str(err)})
         return None
 
+def duplicate_key(error):
+    """Name of the unique index a MySQL duplicate-entry error hit ('users.username' -> 'username')"""
+    match = re.search(r"for key '(?:[^']*\.)?([^'.]*)'", str(error.msg))
+    return match.group(1) if match else None
+
 def validate_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
 
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two coordinates in kilometers"""
-    R = 6371
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    return round(R * c, 2)
-
-def encode_categorical(value, feature_name):
-    blood_group_map = {
-        'A+': 1, 'A-': 2, 'B+': 3, 'B-': 4,
-        'AB+': 5, 'AB-': 6, 'O+': 7, 'O-': 8,
-        '': 0, None: 0
-    }
-    cycle_map = {'R': 0, 'I': 1, '': 0, None: 0}
-    yn_map = {'Y': 1, 'N': 0, '': 0, None: 0}
-    
-    if feature_name == 'Blood Group':
-        return blood_group_map.get(value, 0)
-    elif feature_name == 'Cycle(R/I)':
-        return cycle_map.get(value, 0)
-    elif feature_name in ['Pregnant(Y/N)', 'Weight gain(Y/N)', 'hair growth(Y/N)', 
-                          'Skin darkening (Y/N)', 'Hair loss(Y/N)', 'Pimples(Y/N)',
-                          'Fast food (Y/N)', 'Reg.Exercise(Y/N)']:
-        return yn_map.get(value, 0)
-    return value
-
 def preprocess_input(data):
-    """Preprocess input data for PCOS prediction"""
-    features = {
-        'Sl. No': 1,
-        'Patient File No.': np.random.randint(1000, 9999),
-        ' Age (yrs)': float(data.get('age', 25)),
-        'Weight (Kg)': float(data.get('weight', 60)),
-        'Height(Cm) ': float(data.get('height', 160)),
-        'BMI': float(data.get('bmi', 23.4)),
-        'Blood Group': data.get('bloodGroup', ''),
-        'Pulse rate(bpm) ': float(data.get('pulseRate', 72)),
-        'RR (breaths/min)': float(data.get('respiratoryRate', 16)),
-        'Hb(g/dl)': float(data.get('hb', 12.5)),
-        'Cycle(R/I)': data.get('cycle', 'R'),
-        'Cycle length(days)': float(data.get('cycleLength', 28)),
-        'Marraige Status (Yrs)': float(data.get('marriageStatus', 0)),
-        'Pregnant(Y/N)': data.get('pregnant', 'N'),
-        'No. of aborptions': float(data.get('abortions', 0)),
-        ' I beta-HCG(mIU/mL)': float(data.get('betaHCG1', 0)) if data.get('betaHCG1') else 0,
-        'II beta-HCG(mIU/mL)': float(data.get('betaHCG2', 0)) if data.get('betaHCG2') else 0,
-        'FSH(mIU/mL)': float(data.get('fsh', 5.0)) if data.get('fsh') else 5.0,
-        'LH(mIU/mL)': float(data.get('lh', 4.0)) if data.get('lh') else 4.0,
-        'FSH/LH': 0,
-        'Hip(inch)': float(data.get('hip', 36)),
-        'Waist(inch)': float(data.get('waist', 28)),
-        'Waist:Hip Ratio': 0,
-        'TSH (mIU/L)': float(data.get('tsh', 2.5)) if data.get('tsh') else 2.5,
-        'AMH(ng/mL)': float(data.get('amh', 3.0)) if data.get('amh') else 3.0,
-        'PRL(ng/mL)': float(data.get('prl', 15.0)) if data.get('prl') else 15.0,
-        'Vit D3 (ng/mL)': float(data.get('vitD3', 30.0)) if data.get('vitD3') else 30.0,
-        'PRG(ng/mL)': float(data.get('prg', 10.0)) if data.get('prg') else 10.0,
-        'RBS(mg/dl)': float(data.get('rbs', 95)) if data.get('rbs') else 95,
-        'Weight gain(Y/N)': 'Y' if data.get('weightGain', 0) == 1 else 'N',
-        'hair growth(Y/N)': 'Y' if data.get('hairGrowth', 0) == 1 else 'N',
-        'Skin darkening (Y/N)': 'Y' if data.get('skinDarkening', 0) == 1 else 'N',
-        'Hair loss(Y/N)': 'Y' if data.get('hairLoss', 0) == 1 else 'N',
-        'Pimples(Y/N)': 'Y' if data.get('pimples', 0) == 1 else 'N',
-        'Fast food (Y/N)': 'Y' if data.get('fastFood', 0) == 1 else 'N',
-        'Reg.Exercise(Y/N)': 'Y' if data.get('regExercise', 0) == 1 else 'N',
-        'BP _Systolic (mmHg)': float(data.get('bpSystolic', 120)),
-        'BP _Diastolic (mmHg)': float(data.get('bpDiastolic', 80)),
-        'Follicle No. (L)': float(data.get('follicleNoL', 10)) if data.get('follicleNoL') else 10,
-        'Follicle No. (R)': float(data.get('follicleNoR', 10)) if data.get('follicleNoR') else 10,
-        'Avg. F size (L) (mm)': float(data.get('avgFSizeL', 5.0)) if data.get('avgFSizeL') else 5.0,
-        'Avg. F size (R) (mm)': float(data.get('avgFSizeR', 5.0)) if data.get('avgFSizeR') else 5.0,
-        'Endometrium (mm)': float(data.get('endometrium', 8.0)) if data.get('endometrium') else 8.0
-    }
-    
-    # Calculate derived features
-    if features['Waist(inch)'] > 0 and features['Hip(inch)'] > 0:
-        features['Waist:Hip Ratio'] = features['Waist(inch)'] / features['Hip(inch)']
+    """Preprocess input data into a (1, n_features) float64 row in model column order"""
+    return feature_plan.transform(data)
+
+def preprocess_batch(records):
+    """Encode a cohort of patient payloads into one 2-D feature matrix.
+
+    Returns (matrix, row_indices, errors) where row_indices maps each matrix
+    row back to its position in records and errors maps failed positions to
+    a validation message.
+    """
+    matrix = np.empty((len(records), feature_plan.n_features), dtype=np.float64)
+    row_indices = []
+    errors = {}
+    for i, data in enumerate(records):
+        if not isinstance(data, dict):
+            errors[i] = 'Patient record must be a JSON object'
+            continue
+        try:
+            feature_plan.fill(data, matrix[len(row_indices)])
+        except (TypeError, ValueError) as e:
+            errors[i] = f'Invalid input: {e}'
+            continue
+        row_indices.append(i)
+    return matrix[:len(row_indices)], row_indices, errors
+
+def parse_batch_payload():
+    """Read a JSON array or NDJSON body of patient payloads"""
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        records = []
+        for line in request.get_data(as_text=True).splitlines():
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+        return records
+    data = request.get_json(silent=True)
+    if data is None:
+        raise ValueError('Request body must be JSON or NDJSON')
+    if isinstance(data, dict):
+        data = data.get('patients')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of patient records')
+    return data
+
+def doctors_query(args, version):
+    """Normalised /api/doctors parameters; equal tuples always give identical responses"""
+    def option(name):
+        value = (args.get(name) or '').strip()
+        return None if value in ('', 'all') else value
+
+    search = ' '.join(sorted(set(tokenize(args.get('search', ''))))) or None
+    city = option('city')
+    limit = args.get('limit', type=int)
+    if args.get('cursor'):
+        offset = decode_cursor(args['cursor'], version)
+        if limit is None:
+            limit = DEFAULT_PAGE_SIZE
     else:
-        features['Waist:Hip Ratio'] = 0.78
-    
-    if features['LH(mIU/mL)'] > 0:
-        features['FSH/LH'] = features['FSH(mIU/mL)'] / features['LH(mIU/mL)']
+        offset = max(args.get('offset', default=0, type=int), 0)
+    if limit is not None:
+        limit = max(limit, 0)
+    availability = option('availability')
+    return (option('specialty'), availability if availability in AVAILABILITY_WINDOWS else None, search,
+            city.lower() if city else None, option('pincode'), offset, limit,
+            parse_fields(args.get('fields')))
+
+def doctors_page(catalog, query, version=None):
+    """(positions on the requested page, total matches) for a doctors_query() tuple"""
+    specialty, availability, search, city, pincode, offset, limit, _ = query
+    with timed('doctor_filter'):
+        available = availability_engine.view(version).positions(availability) if availability else None
+        positions = catalog.filter_positions(specialty=specialty, search=search, city=city, pincode=pincode,
+                                             available=available)
+    if positions is None:
+        positions = range(len(catalog))
+    end = offset + limit if limit is not None else None
+    return positions[offset:end], len(positions)
+
+def page_headers(version, offset, limit, total):
+    """X-Total-Count, plus X-Next-Cursor while a limited listing has more pages"""
+    headers = {'X-Total-Count': str(total)}
+    if limit and offset + limit < total:
+        headers['X-Next-Cursor'] = encode_cursor(version, offset + limit)
+    return headers
+
+def doctors_payload(catalog, query, version=None):
+    """(doctors page, headers) for a doctors_query() tuple"""
+    positions, total = doctors_page(catalog, query, version)
+    doctors, fields = catalog.doctors, query[-1]
+    if fields is None:
+        with timed('json_serialize'):
+            page = catalog.records.array(positions).encode('utf-8')
     else:
-        features['FSH/LH'] = 1.25
-    
-    # Encode categorical features
-    encoded_features = {k: encode_categorical(v, k) for k, v in features.items()}
-    df = pd.DataFrame([encoded_features])
-    df = df[model.feature_names_in_]
-    return df.astype(float)
+        page = [project(doctors[p], fields) for p in positions]
+    return page, page_headers(version, query[5], query[6], total)
+
+def wants_ndjson():
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best_match(('application/json',) + NDJSON_MIMETYPES) in NDJSON_MIMETYPES
+
+def ndjson_response(rows, headers, serialized=False):
+    """Stream rows one JSON object per line without building the whole body"""
+    dumps = (lambda row: row) if serialized else (lambda row: app.json.dumps(row, separators=(',', ':')))
+    response = app.response_class(ndjson_chunks(rows, dumps), mimetype='application/x-ndjson')
+    response.headers.update(headers)
+    return response
+
+def serialize_json(payload):
+    """The body jsonify() sends for payload (outside debug mode)"""
+    with timed('json_serialize'):
+        return (app.json.dumps(payload, separators=(',', ':')) + "\n").encode('utf-8')
+
+def build_response_cache(catalog, previous=None, changed=None, reordered=True):
+    """Response cache for a new catalogue snapshot, with the page-load responses pinned.
+
+    Pinned responses of the previous snapshot are reused when no changed
+    doctor (old or new version) passes their filters and nothing moved.
+    Availability-filtered listings change with every booking, so they are
+    cached per availability_engine.stamp() rather than pinned.
+    """
+    cache = create_response_cache(serialize_json)
+    if cache is None:
+        return None
+    reusable = previous.responses if previous is not None and changed is not None and not reordered else None
+    affected = []
+    if reusable is not None:
+        affected = [d for i in changed for d in (previous.catalog.get(i), catalog.get(i)) if d is not None]
+
+    def pin(key, build, stale):
+        entry = reusable.pinned(key) if reusable is not None and not stale else None
+        if entry is not None:
+            cache.pin(key, entry)
+        else:
+            cache.warm(key, build)
+
+    no_filter = (None, None, None, None, None, 0, None, None)
+    queries = {no_filter: bool(changed)}
+    for specialty in catalog.by_specialty:
+        queries[(specialty,) + no_filter[1:]] = any(doctor_matches(d, specialty=specialty) for d in affected)
+    for query, stale in queries.items():
+        pin(('doctors',) + query, lambda: doctors_payload(catalog, query), stale)
+    pin(('specialties',), lambda: (catalog.specialties, {}),
+        previous is None or previous.catalog.specialties != catalog.specialties)
+    pin(('availability-options',), lambda: (catalog.availability_options, {}),
+        previous is None or previous.catalog.availability_options != catalog.availability_options)
+    return cache
+
+def cached_json(response_cache, key, build):
+    """Serve build() -> (payload, headers) from a response cache, honouring ETags and gzip"""
+    if response_cache is None:
+        payload, headers = build()
+        if isinstance(payload, bytes):
+            response = app.response_class(payload, mimetype='application/json')
+        else:
+            response = jsonify(payload)
+        response.headers.update(headers)
+        return response
+    entry = response_cache.get_or_build(key, build)
+    use_gzip = entry.gzipped is not None and request.accept_encodings['gzip'] > 0
+    etag = entry.gzip_etag if use_gzip else entry.etag
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(entry.gzipped if use_gzip else entry.body, mimetype='application/json')
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.headers.update(entry.headers)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+try:
+    catalog_manager.reload(force=True)
+    print("✓ Doctors database loaded successfully!")
+except FileNotFoundError:
+    print("✗ database.json not found")
+
+@app.before_request
+def watch_catalog():
+    # Starts the background pollers in whichever process ends up serving requests
+    catalog_manager.watch()
+    availability_engine.watch(appointment_store.booked_between, AVAILABILITY_SYNC_INTERVAL)
+    if token_authority is not None:
+        token_authority.watch(AUTH_REVOCATION_SYNC_INTERVAL)
+    if email_registry is not None:
+        email_registry.watch(EMAIL_CACHE_SYNC_INTERVAL)
+    if metrics is not None:
+        metrics.watch(METRICS_FLUSH_INTERVAL)
 
 # ==================== AUTH ROUTES (from auth.py) ====================
 
@@ -186,30 +415,57 @@ def register():
         if len(password) < 6:
             return jsonify({'success': False, 'error': 'Password must be at least 6 characters'}), 400
 
+        # Only an email the registry can't rule out costs a lookup; a known
+        # duplicate is turned away before any bcrypt work
+        if email_registry is not None and email_registry.might_exist(email):
+            conn = get_db_connection()
+            if not conn:
+                return jsonify({'success': False, 'error': 'Database connection failed'}), 500
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM users WHERE email=%s", (email,))
+            existing = cursor.fetchone()
+            cursor.close()
+            conn.close()
+            if existing:
+                return jsonify({'success': False, 'error': 'Email already registered'}), 400
+
+        # Hash without holding a pooled connection
+        try:
+            with timed('bcrypt'):
+                hashed_password = password_hasher.hash(password)
+        except HasherBusyError:
+            return jsonify({'success': False, 'error': 'Server busy, please try again'}), 503
+
         conn = get_db_connection()
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
-
         cursor = conn.cursor()
-        cursor.execute("SELECT id FROM users WHERE email=%s", (email,))
-        if cursor.fetchone():
+        try:
+            # One INSERT; the UNIQUE keys decide concurrent registrations
+            cursor.execute(
+                "INSERT INTO users (username, email, password) VALUES (%s, %s, %s)",
+                (username, email, hashed_password)
+            )
+            conn.commit()
+            user_id = cursor.lastrowid
+        except mysql.connector.IntegrityError as e:
+            conn.rollback()
+            if e.errno != ER_DUP_ENTRY:
+                raise
+            if duplicate_key(e) == 'username':
+                return jsonify({'success': False, 'error': 'Username already taken'}), 400
+            if email_registry is not None:
+                email_registry.add(email)
+            return jsonify({'success': False, 'error': 'Email already registered'}), 400
+        finally:
             cursor.close()
             conn.close()
-            return jsonify({'success': False, 'error': 'Email already registered'}), 400
-
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-        cursor.execute(
-            "INSERT INTO users (username, email, password) VALUES (%s, %s, %s)",
-            (username, email, hashed_password)
-        )
-        conn.commit()
-        user_id = cursor.lastrowid
-        cursor.close()
-        conn.close()
+        if email_registry is not None:
+            email_registry.add(email)
 
         return jsonify({'success': True, 'message': 'User registered successfully', 'user_id': user_id}), 201
-    except Exception as e:
-        app.logger.error(f"Registration error: {str(e)}")
+    except Exception:
+        log.exception('registration failed')
         return jsonify({'success': False, 'error': 'An error occurred'}), 500
 
 @app.route('/login', methods=['POST', 'OPTIONS'])
@@ -237,27 +493,47 @@ def login():
             return jsonify({'success': False, 'error': 'Invalid email or password'}), 401
 
         user_id, username, user_email, stored_password = user
-        if isinstance(stored_password, str):
-            stored_password = stored_password.encode('utf-8')
+        try:
+            with timed('bcrypt'):
+                password_ok = password_hasher.verify(password, stored_password)
+        except HasherBusyError:
+            cursor.close()
+            conn.close()
+            return jsonify({'success': False, 'error': 'Server busy, please try again'}), 503
 
-        if bcrypt.checkpw(password.encode('utf-8'), stored_password):
-            cursor.execute("INSERT INTO login_history (user_id) VALUES (%s)", (user_id,))
-            conn.commit()
+        if password_ok:
+            if password_hasher.needs_rehash(stored_password):
+                try:
+                    with timed('bcrypt'):
+                        rehashed = password_hasher.hash(password)
+                    cursor.execute("UPDATE users SET password=%s WHERE id=%s", (rehashed, user_id))
+                    conn.commit()
+                except HasherBusyError:
+                    pass  # keep the old hash; upgraded on a later login
+            ip_address = request.remote_addr
+            user_agent = request.headers.get('User-Agent')
+            if login_history_writer is not None:
+                login_history_writer.record(user_id, ip_address, user_agent)
+            else:
+                insert_login_rows(conn, [login_row(user_id, ip_address, user_agent)])
             cursor.close()
             conn.close()
 
-            session.permanent = True
-            session['user_id'] = user_id
-            session['username'] = username
-            session['email'] = user_email
+            user = {'id': user_id, 'username': username, 'email': user_email}
+            if AUTH_MODE != 'token':
+                session.permanent = True
+                session['user_id'] = user_id
+                session['username'] = username
+                session['email'] = user_email
+            tokens = token_authority.issue(user) if token_authority is not None else {}
 
-            return jsonify({'success': True, 'message': 'Login successful', 'user': {'id': user_id, 'username': username, 'email': user_email}}), 200
+            return jsonify({'success': True, 'message': 'Login successful', 'user': user, **tokens}), 200
         else:
             cursor.close()
             conn.close()
             return jsonify({'success': False, 'error': 'Invalid email or password'}), 401
-    except Exception as e:
-        app.logger.error(f"Login error: {str(e)}")
+    except Exception:
+        log.exception('login failed')
         return jsonify({'success': False, 'error': 'An error occurred'}), 500
 
 @app.route('/logout', methods=['POST', 'OPTIONS'])
@@ -265,59 +541,147 @@ def logout():
     if request.method == 'OPTIONS':
         return '', 200
     session.clear()
+    if token_authority is not None:
+        # Revoke the presented access token and, if sent, the refresh token
+        header = request.headers.get('Authorization', '')
+        data = request.get_json(silent=True) or {}
+        presented = [(header[7:], ACCESS)] if header.startswith('Bearer ') else []
+        if data.get('refreshToken'):
+            presented.append((str(data['refreshToken']), REFRESH))
+        try:
+            for token, kind in presented:
+                try:
+                    token_authority.revoke(token_authority.verify(token, kind))
+                except TokenError:
+                    pass  # already unusable
+        except StoreUnavailableError:
+            return jsonify({'success': False, 'error': 'Could not revoke tokens, please try again'}), 503
     return jsonify({'success': True, 'message': 'Logout successful'}), 200
 
+@app.route('/auth/refresh', methods=['POST', 'OPTIONS'])
+def refresh_tokens():
+    """Exchange a refresh token for a new token pair (the old refresh token is revoked)"""
+    if request.method == 'OPTIONS':
+        return '', 200
+    if token_authority is None:
+        return jsonify({'success': False, 'error': 'Token authentication is disabled'}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        tokens = token_authority.refresh(str(data.get('refreshToken', '')))
+    except TokenError as e:
+        return jsonify({'success': False, 'error': str(e)}), 401
+    except StoreUnavailableError:
+        return jsonify({'success': False, 'error': 'Database connection failed'}), 503
+    return jsonify({'success': True, **tokens}), 200
+
 @app.route('/profile', methods=['GET', 'OPTIONS'])
 def profile():
     if request.method == 'OPTIONS':
         return '', 200
-    if 'user_id' not in session:
+    user = current_user()
+    if user is None:
         return jsonify({'success': False, 'error': 'Not authenticated'}), 401
-    return jsonify({'success': True, 'user': {'id': session['user_id'], 'username': session['username'], 'email': session['email']}}), 200
+    return jsonify({'success': True, 'user': user}), 200
 
 # ==================== PREDICTION ROUTES (from app.py) ====================
 
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
-        if model is None:
+        if inference is None:
             return jsonify({'error': 'Model not loaded'}), 500
         
         data = request.get_json()
-        input_df = preprocess_input(data)
+        with timed('preprocess_input'):
+            input_row = preprocess_input(data)
         
-        print(f"Input shape: {input_df.shape}")
-        print(f"Input dtypes: {input_df.dtypes.unique()}")
+        log.debug('predict input', extra={'shape': input_row.shape, 'dtype': str(input_row.dtype)})
         
-        prediction = model.predict(input_df)[0]
-        
-        try:
-            probabilities = model.predict_proba(input_df)[0]
-            confidence = float(max(probabilities))
-        except:
-            confidence = 0.75
+        cache_key = prediction_cache.key_for(input_row) if prediction_cache else None
+        cached = prediction_cache.get(cache_key) if cache_key else None
+        if cached:
+            prediction, confidence = cached
+        else:
+            with timed('inference'):
+                prediction, confidence = inference_executor.run(inference.predict_one, input_row)
+            if cache_key:
+                prediction_cache.put(cache_key, (prediction, confidence))
         
         return jsonify({
             'prediction': int(prediction),
             'confidence': confidence,
             'message': 'Prediction successful'
         })
+    except InferenceBusyError:
+        return jsonify({'error': 'Server busy, please try again'}), 503
+    except InferenceServiceError as e:
+        log.warning('inference service call failed', extra={'error': str(e)})
+        return jsonify({'error': 'Prediction service unavailable, please try again'}), 503
+    except Exception as e:
+        log.exception('prediction failed')
+        return jsonify({'error': str(e)}), 500
+
+PREDICT_BATCH_MAX_ROWS = int(os.getenv('PREDICT_BATCH_MAX_ROWS', 5000))
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    if inference is None:
+        return jsonify({'error': 'Model not loaded'}), 500
+    
+    try:
+        records = parse_batch_payload()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if len(records) > PREDICT_BATCH_MAX_ROWS:
+        return jsonify({'error': f'Batch too large (max {PREDICT_BATCH_MAX_ROWS} patients)'}), 413
+    
+    try:
+        with timed('preprocess_input'):
+            matrix, row_indices, errors = preprocess_batch(records)
+        results = [None] * len(records)
+        
+        if row_indices:
+            with timed('inference'):
+                labels, confidences = inference_executor.run(inference.predict_batch, matrix)
+            for row, i in enumerate(row_indices):
+                results[i] = {
+                    'index': i,
+                    'prediction': int(labels[row]),
+                    'confidence': float(confidences[row])
+                }
+        
+        for i, message in errors.items():
+            results[i] = {'index': i, 'error': message}
+        
+        return jsonify({
+            'results': results,
+            'count': len(records),
+            'succeeded': len(row_indices),
+            'failed': len(errors),
+            'message': 'Batch prediction successful'
+        })
+    except InferenceBusyError:
+        return jsonify({'error': 'Server busy, please try again'}), 503
+    except InferenceServiceError as e:
+        log.warning('inference service call failed', extra={'error': str(e)})
+        return jsonify({'error': 'Prediction service unavailable, please try again'}), 503
     except Exception as e:
-        print(f"Error during prediction: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception('batch prediction failed')
         return jsonify({'error': str(e)}), 500
 
+@app.route('/predict/cache-stats', methods=['GET'])
+def prediction_cache_stats():
+    if prediction_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify(prediction_cache.stats())
+
 @app.route('/model-info', methods=['GET'])
 def model_info():
-    if model is None:
+    if inference is None:
         return jsonify({'error': 'Model not loaded'}), 500
     
-    return jsonify({
-        'model_type': type(model).__name__,
-        'expected_features': int(model.n_features_in_),
-        'feature_names': model.feature_names_in_.tolist()
-    })
+    return jsonify({**model_description, 'served_by': 'inference service' if INFERENCE_SERVICE_SOCKET else 'worker'})
 
 # ==================== DOCTOR/MAP ROUTES (from google_api.py) ====================
 
@@ -327,28 +691,23 @@ def get_config():
 
 @app.route('/api/doctors', methods=['GET'])
 def get_doctors():
-    specialty = request.args.get('specialty')
-    availability = request.args.get('availability')
-    search = request.args.get('search', '').lower()
-    
-    doctors = doctors_data['doctors']
-    
-    if search:
-        doctors = [d for d in doctors if 
-                   search in d['name'].lower() or 
-                   search in d['specialty'].lower() or 
-                   search in d['clinic'].lower()]
-    
-    if specialty and specialty != 'all':
-        doctors = [d for d in doctors if d['specialty'] == specialty]
-    
-    if availability and availability != 'all':
-        if availability == 'Available Now':
-            doctors = [d for d in doctors if d['availability'] == 'available']
-        elif availability in ['Available Today', 'Available Tomorrow', 'Available This Week']:
-            doctors = [d for d in doctors if d['availability'] != 'offline']
-    
-    return jsonify(doctors)
+    snapshot = catalog_manager.snapshot
+    try:
+        query = doctors_query(request.args, snapshot.version)
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
+    if wants_ndjson():
+        positions, total = doctors_page(snapshot.catalog, query, snapshot.version)
+        headers = page_headers(snapshot.version, query[5], query[6], total)
+        doctors, records, fields = snapshot.catalog.doctors, snapshot.catalog.records, query[-1]
+        if fields is None:
+            return ndjson_response((records.plain(p) for p in positions), headers, serialized=True)
+        return ndjson_response((project(doctors[p], fields) for p in positions), headers)
+    key = ('doctors',) + query
+    if query[1] is not None:
+        key += availability_engine.stamp()
+    return cached_json(snapshot.responses, key,
+                       lambda: doctors_payload(snapshot.catalog, query, snapshot.version))
 
 @app.route('/api/doctors/nearby', methods=['POST'])
 def get_nearby_doctors():
@@ -356,29 +715,115 @@ def get_nearby_doctors():
     user_lat = data.get('latitude')
     user_lon = data.get('longitude')
     max_distance = data.get('maxDistance', 10)
+    limit = data.get('limit')
+    fields = data.get('fields')
     
     if not user_lat or not user_lon:
         return jsonify({'error': 'Latitude and longitude required'}), 400
     
-    doctors = doctors_data['doctors']
-    nearby_doctors = []
+    try:
+        user_lat, user_lon = float(user_lat), float(user_lon)
+        max_distance = float(max_distance)
+        limit = int(limit) if limit is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'latitude, longitude, maxDistance and limit must be numbers'}), 400
+    if not all(math.isfinite(v) for v in (user_lat, user_lon, max_distance)):
+        return jsonify({'error': 'latitude, longitude and maxDistance must be finite'}), 400
+    if limit is not None and limit < 0:
+        return jsonify({'error': 'limit must not be negative'}), 400
+    if isinstance(fields, list) and all(isinstance(f, str) for f in fields):
+        fields = ','.join(fields)
+    elif fields is not None and not isinstance(fields, str):
+        return jsonify({'error': 'fields must be a comma-separated string or a list of strings'}), 400
     
-    for doctor in doctors:
-        doc_lat = doctor['location']['latitude']
-        doc_lon = doctor['location']['longitude']
-        distance = calculate_distance(user_lat, user_lon, doc_lat, doc_lon)
-        
-        if distance <= max_distance:
-            doctor_copy = doctor.copy()
-            doctor_copy['distance'] = distance
-            nearby_doctors.append(doctor_copy)
+    snapshot = catalog_manager.snapshot
+    offset = 0
+    if data.get('cursor'):
+        try:
+            offset = decode_cursor(str(data['cursor']), snapshot.version)
+        except CursorError as e:
+            return jsonify({'error': str(e)}), 400
+        if limit is None:
+            limit = DEFAULT_PAGE_SIZE
+    fields = parse_fields(fields)
     
-    nearby_doctors.sort(key=lambda x: x['distance'])
-    return jsonify(nearby_doctors)
+    doctor_catalog = snapshot.catalog
+    with timed('doctor_filter'):
+        if limit is not None:
+            hits = doctor_catalog.geo.nearest(user_lat, user_lon, offset + limit, max_km=max_distance)
+        else:
+            hits = doctor_catalog.geo.within(user_lat, user_lon, max_distance)
+    page = hits[offset:]
+    headers = {}
+    if limit and len(hits) == offset + limit:
+        # Possibly more beyond this page; the nearest-k query can't tell without looking
+        headers['X-Next-Cursor'] = encode_cursor(snapshot.version, offset + limit)
+    
+    # Rows stay (distance, position) pairs; whole records are spliced from
+    # pre-serialised JSON rather than copied into new dicts
+    records = doctor_catalog.records
+    if fields is None and wants_ndjson():
+        return ndjson_response((records.with_value(pos, distance) for distance, pos in page),
+                               headers, serialized=True)
+    if fields is None:
+        with timed('json_serialize'):
+            body = records.array_with(page)
+        response = app.response_class(body, mimetype='application/json')
+    else:
+        doctors = doctor_catalog.doctors
+        rows = (project(doctors[pos], fields, {'distance': distance}) for distance, pos in page)
+        if wants_ndjson():
+            return ndjson_response(rows, headers)
+        response = jsonify(list(rows))
+    response.headers.update(headers)
+    return response
+
+NEARBY_BATCH_MAX_LOCATIONS = int(os.getenv('NEARBY_BATCH_MAX_LOCATIONS', 1000))
+
+@app.route('/api/doctors/nearby/batch', methods=['POST'])
+def get_nearby_doctors_batch():
+    """Nearest doctors for many patient locations (outreach planning)"""
+    data = request.get_json(silent=True) or {}
+    locations = data.get('locations')
+    if not isinstance(locations, list) or not locations:
+        return jsonify({'error': 'locations must be a non-empty list'}), 400
+    if len(locations) > NEARBY_BATCH_MAX_LOCATIONS:
+        return jsonify({'error': f'Too many locations (max {NEARBY_BATCH_MAX_LOCATIONS})'}), 413
+    
+    try:
+        limit = int(data.get('limit', 5))
+        max_distance = data.get('maxDistance')
+        max_distance = float(max_distance) if max_distance is not None else None
+        lats = [float(loc['latitude']) for loc in locations]
+        lons = [float(loc['longitude']) for loc in locations]
+    except (TypeError, ValueError, KeyError):
+        return jsonify({'error': 'Each location needs numeric latitude and longitude'}), 400
+    if not all(map(math.isfinite, lats + lons + ([max_distance] if max_distance is not None else []))):
+        return jsonify({'error': 'latitude, longitude and maxDistance must be finite'}), 400
+    if limit <= 0:
+        return jsonify({'error': 'limit must be positive'}), 400
+    
+    doctor_catalog = catalog_manager.snapshot.catalog
+    doctors = doctor_catalog.doctors
+    results = []
+    for i, (positions, distances) in enumerate(
+            doctor_catalog.distances.nearest_many(lats, lons, limit, max_km=max_distance)):
+        results.append({
+            'index': i,
+            'doctors': [{
+                'id': doctors[pos]['id'],
+                'name': doctors[pos]['name'],
+                'specialty': doctors[pos]['specialty'],
+                'clinic': doctors[pos]['clinic'],
+                'phone': doctors[pos]['phone'],
+                'distance': float(distance)
+            } for pos, distance in zip(positions.tolist(), distances.tolist())]
+        })
+    return jsonify({'results': results, 'count': len(results)})
 
 @app.route('/api/doctor/<int:doctor_id>', methods=['GET'])
 def get_doctor(doctor_id):
-    doctor = next((d for d in doctors_data['doctors'] if d['id'] == doctor_id), None)
+    doctor = catalog_manager.snapshot.catalog.get(doctor_id)
     if not doctor:
         return jsonify({'error': 'Doctor not found'}), 404
     return jsonify(doctor)
@@ -388,7 +833,7 @@ def get_directions(doctor_id):
     data = request.json
     origin = data.get('origin')
     
-    doctor = next((d for d in doctors_data['doctors'] if d['id'] == doctor_id), None)
+    doctor = catalog_manager.snapshot.catalog.get(doctor_id)
     
     if not doctor:
         return jsonify({'error': 'Doctor not found'}), 404
@@ -407,11 +852,14 @@ def get_directions(doctor_id):
 
 @app.route('/api/specialties', methods=['GET'])
 def get_specialties():
-    return jsonify(doctors_data['specialties'])
+    snapshot = catalog_manager.snapshot
+    return cached_json(snapshot.responses, ('specialties',), lambda: (snapshot.catalog.specialties, {}))
 
 @app.route('/api/availability-options', methods=['GET'])
 def get_availability_options():
-    return jsonify(doctors_data['availabilityOptions'])
+    snapshot = catalog_manager.snapshot
+    return cached_json(snapshot.responses, ('availability-options',),
+                       lambda: (snapshot.catalog.availability_options, {}))
 
 @app.route('/api/book-appointment', methods=['POST'])
 def book_appointment():
@@ -426,23 +874,28 @@ def book_appointment():
     if not all([doctor_id, patient_name, patient_email, patient_phone, appointment_date, appointment_time]):
         return jsonify({'error': 'All fields are required'}), 400
     
-    doctor = next((d for d in doctors_data['doctors'] if d['id'] == doctor_id), None)
+    doctor = catalog_manager.snapshot.catalog.get(doctor_id)
     if not doctor:
         return jsonify({'error': 'Doctor not found'}), 404
     
-    appointment = {
-        'appointmentId': f"APT{doctor_id}{len(patient_name)}",
-        'doctorId': doctor_id,
-        'doctorName': doctor['name'],
-        'clinic': doctor['clinic'],
-        'patientName': patient_name,
-        'patientEmail': patient_email,
-        'patientPhone': patient_phone,
-        'appointmentDate': appointment_date,
-        'appointmentTime': appointment_time,
-        'consultationFee': doctor['consultationFee'],
-        'status': 'confirmed'
-    }
+    user = current_user()
+    user_id = user['id'] if user is not None else None
+    try:
+        appointment = appointment_store.book(
+            doctor_id, appointment_date, appointment_time, patient_name, patient_email,
+            patient_phone, consultation_fee=doctor['consultationFee'], user_id=user_id
+        )
+    except ValueError as e:
+        return jsonify({'error': f'Invalid appointment date or time: {e}'}), 400
+    except SlotTakenError:
+        # Booked through another worker since our last sync
+        availability_engine.book(doctor_id, *parse_slot(appointment_date, appointment_time))
+        return jsonify({'error': 'This slot has just been booked, please choose another time'}), 409
+    except StoreUnavailableError:
+        return jsonify({'error': 'Database connection failed'}), 503
+    availability_engine.book(doctor_id, appointment['appointmentDate'], appointment['appointmentTime'])
+    appointment['doctorName'] = doctor['name']
+    appointment['clinic'] = doctor['clinic']
     
     return jsonify({
         'success': True,
@@ -450,6 +903,83 @@ def book_appointment():
         'appointment': appointment
     })
 
+@app.route('/api/doctor/<int:doctor_id>/booked-slots', methods=['GET'])
+def get_booked_slots(doctor_id):
+    if not catalog_manager.snapshot.catalog.get(doctor_id):
+        return jsonify({'error': 'Doctor not found'}), 404
+    appointment_date = request.args.get('date', '')
+    try:
+        slots = appointment_store.booked_slots(doctor_id, appointment_date)
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+    except StoreUnavailableError:
+        return jsonify({'error': 'Database connection failed'}), 503
+    return jsonify({'doctorId': doctor_id, 'date': appointment_date, 'booked': slots})
+
+@app.route('/api/doctor/<int:doctor_id>/availability', methods=['GET'])
+def get_doctor_availability(doctor_id):
+    """Free slots on one day (default today) and the next free slot, from the availability engine"""
+    engine = availability_engine.view(catalog_manager.snapshot.version)
+    now = datetime.now()
+    appointment_date = request.args.get('date') or now.date().isoformat()
+    try:
+        slots = engine.free_slots(doctor_id, appointment_date, now)
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+    if slots is None:
+        return jsonify({'error': 'Doctor not found'}), 404
+    return jsonify({'doctorId': doctor_id, 'date': appointment_date, 'free': slots,
+                    'nextAvailable': engine.next_free_slot(doctor_id, now)})
+
+# ==================== SYMPTOM TRACKER ROUTES ====================
+
+@app.route('/api/tracker/entries', methods=['POST'])
+def save_tracker_entries():
+    """Store one entry, or a whole local history ({"entries": [...]} or a list)"""
+    user = current_user()
+    if user is None:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+    data = request.get_json(silent=True)
+    entries = data.get('entries', [data]) if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'success': False, 'error': 'Expected an entry or a list of entries'}), 400
+    if len(entries) > TRACKER_MAX_UPLOAD:
+        return jsonify({'success': False, 'error': f'Too many entries (max {TRACKER_MAX_UPLOAD})'}), 413
+    try:
+        stored = tracker_store.save(user['id'], entries)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except StoreUnavailableError:
+        return jsonify({'success': False, 'error': 'Database connection failed'}), 503
+    return jsonify({'success': True, 'stored': stored})
+
+@app.route('/api/tracker/entries', methods=['GET'])
+def get_tracker_entries():
+    user = current_user()
+    if user is None:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+    limit = request.args.get('limit', type=int)
+    try:
+        entries = tracker_store.entries(user['id'], request.args.get('from'), request.args.get('to'),
+                                        max(limit, 0) if limit is not None else None)
+    except StoreUnavailableError:
+        return jsonify({'success': False, 'error': 'Database connection failed'}), 503
+    return jsonify({'success': True, 'entries': entries})
+
+@app.route('/api/tracker/summary', methods=['GET'])
+def get_tracker_summary():
+    """Weekly/monthly averages and cycle stats for the dashboard, from the rollup tables"""
+    user = current_user()
+    if user is None:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+    weeks = min(max(request.args.get('weeks', default=12, type=int), 1), 104)
+    months = min(max(request.args.get('months', default=12, type=int), 1), 36)
+    try:
+        summary = tracker_store.summary(user['id'], weeks=weeks, months=months)
+    except StoreUnavailableError:
+        return jsonify({'success': False, 'error': 'Database connection failed'}), 503
+    return jsonify({'success': True, **summary})
+
 # ==================== GENERAL ROUTES ====================
 
 @app.route('/health', methods=['GET'])
@@ -457,20 +987,43 @@ def health():
     return jsonify({
         'status': 'healthy',
         'message': 'Gynai API is running',
-        'model_loaded': model is not None,
-        'doctors_loaded': len(doctors_data['doctors']) > 0
+        'model_loaded': inference is not None,
+        'doctors_loaded': len(catalog_manager.snapshot.catalog) > 0,
+        'catalog': catalog_manager.stats(),
+        'db_pool': db_pool.stats() if db_pool is not None else None,
+        'password_hasher': password_hasher.stats(),
+        'inference_executor': inference_executor.stats(),
+        'inference_service': inference.stats() if isinstance(inference, InferenceClient) else None,
+        'login_history': login_history_writer.stats() if login_history_writer is not None else None,
+        'availability': availability_engine.stats(),
+        'auth_tokens': token_authority.stats() if token_authority is not None else None,
+        'email_registry': email_registry.stats() if email_registry is not None else None,
+        'metrics': metrics.stats() if metrics is not None else None,
+        'logging': log_handler.stats(),
+        'response_cache': (catalog_manager.snapshot.responses.stats()
+                           if catalog_manager.snapshot.responses is not None else None)
     }), 200
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape target; summed over all workers in multiprocess mode"""
+    if metrics is None:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    body, content_type = metrics.render()
+    return app.response_class(body, content_type=content_type)
+
 @app.route('/')
 def home():
     return jsonify({
         'message': 'Gynai API Server - All Services Running',
         'version': '1.0.0',
         'endpoints': {
-            'auth': ['/register', '/login', '/logout', '/profile'],
-            'prediction': ['/predict', '/model-info'],
-            'doctors': ['/api/doctors', '/api/doctors/nearby', '/api/specialties', '/api/book-appointment'],
-            'health': ['/health']
+            'auth': ['/register', '/login', '/logout', '/profile', '/auth/refresh'],
+            'prediction': ['/predict', '/predict/batch', '/predict/cache-stats', '/model-info'],
+            'doctors': ['/api/doctors', '/api/doctors/nearby', '/api/doctors/nearby/batch', '/api/specialties', '/api/book-appointment'],
+            'tracker': ['/api/tracker/entries', '/api/tracker/summary'],
+            'appointments': ['/api/doctor/<id>/booked-slots', '/api/doctor/<id>/availability'],
+            'health': ['/health', '/metrics']
         }
     })
 
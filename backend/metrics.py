@@ -0,0 +1,311 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from flask import g, request
+from flask.json.provider import DefaultJSONProvider
+
+from background import PeriodicTask
+
+log = logging.getLogger('gynai.metrics')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+REQUEST_METRIC = ('gynai_http_request_duration_seconds', 'HTTP request latency by route, method and status',
+                  ('route', 'method', 'status'))
+STAGE_METRIC = ('gynai_stage_duration_seconds', 'Latency of internal stages', ('stage',))
+# Counts of worker processes that have exited, summed by retire_process()
+RETIRED_FILE = 'retired.json'
+
+def log_linear_buckets(lowest=0.0001, highest=60.0, per_octave=4):
+    """Histogram bounds from lowest to highest seconds, per_octave per doubling.
+
+    HDR-style: every bucket is the same fraction wider than the last, so
+    any quantile read off the histogram is within 2 ** (1 / per_octave) - 1
+    of the true value (19% at 4 per octave) whether it is 200 us or 20 s.
+    """
+    bounds = []
+    i = 0
+    while True:
+        bound = float(f'{lowest * 2 ** (i / per_octave):.3g}')
+        bounds.append(bound)
+        if bound >= highest:
+            return bounds
+        i += 1
+
+def _label_text(names, values, le=None):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return '{' + ','.join(pairs) + '}'
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+class _StageTimer:
+    __slots__ = ('_metrics', '_name', '_start')
+
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._metrics.observe_stage(self._name, time.perf_counter() - self._start)
+
+class TimedCursor:
+    """Cursor proxy timing execute/fetch calls as the db_query stage"""
+
+    def __init__(self, cursor, metrics):
+        self._cursor = cursor
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._metrics.observe_stage('db_query', time.perf_counter() - start)
+
+    def execute(self, *args):
+        return self._timed(self._cursor.execute, *args)
+
+    def executemany(self, *args):
+        return self._timed(self._cursor.executemany, *args)
+
+    def fetchone(self):
+        return self._timed(self._cursor.fetchone)
+
+    def fetchall(self):
+        return self._timed(self._cursor.fetchall)
+
+    def fetchmany(self, *args):
+        return self._timed(self._cursor.fetchmany, *args)
+
+class TimedConnection:
+    """Connection proxy whose cursors are TimedCursors"""
+
+    def __init__(self, conn, metrics):
+        self._conn = conn
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._conn.cursor(*args, **kwargs), self._metrics)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.close()
+
+class Metrics:
+    """Request and stage latency histograms, exported in Prometheus text format.
+
+    install(app) times every request from the first before_request hook to
+    the response object (a streamed body is not included) and records it
+    by route rule, method and status. stage(name) is a context manager
+    for internal stages. An observation is a bisect into the bucket bounds
+    and two list updates under a lock; nothing leaves the process on the
+    request path.
+
+    With multiprocess_dir set (gunicorn.conf.py sets METRICS_DIR), watch()
+    writes this worker's counts to <dir>/<pid>-<token>.json every interval
+    seconds and render() sums every file there, so a scrape answered by any
+    worker reports the whole server, at most one interval behind. When a
+    worker exits, retire_process() folds its file into retired.json, so its
+    counts stay in the totals (counters never go backwards) without one
+    file per worker ever started; the random per-process token keeps a new
+    worker that reuses an old pid from overwriting a file not yet retired.
+    """
+
+    def __init__(self, buckets=None, multiprocess_dir=None):
+        self.buckets = buckets or log_linear_buckets()
+        self.multiprocess_dir = multiprocess_dir
+        self.flushes = 0
+        self._requests = {}
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_task = PeriodicTask('metrics-flush', log, 'metrics flush failed', sleep_first=True)
+        self._pid = os.getpid()
+        self._file = None
+
+    def _observe(self, series, key, seconds):
+        i = bisect_left(self.buckets, seconds)  # first bound >= seconds; len(buckets) is +Inf
+        with self._lock:
+            counts = series.get(key)
+            if counts is None:
+                counts = series[key] = [0] * (len(self.buckets) + 1) + [0.0]  # last slot: sum
+            counts[i] += 1
+            counts[-1] += seconds
+
+    def observe_request(self, route, method, status, seconds):
+        self._observe(self._requests, (route, method, str(status)), seconds)
+
+    def observe_stage(self, name, seconds):
+        self._observe(self._stages, (name,), seconds)
+
+    def stage(self, name):
+        """Context manager observing the time spent in its block as stage name"""
+        return _StageTimer(self, name)
+
+    def connection(self, conn):
+        """conn with its queries timed as the db_query stage"""
+        return TimedConnection(conn, self)
+
+    def install(self, app):
+        """Time app's requests, and its jsonify() calls as the json_serialize stage"""
+        metrics = self
+
+        class TimedJSONProvider(DefaultJSONProvider):
+            # jsonify() only; dumps() also serves the session cookie
+            def response(self, *args, **kwargs):
+                with metrics.stage('json_serialize'):
+                    return super().response(*args, **kwargs)
+
+        app.json = TimedJSONProvider(app)
+
+        def start_timer():
+            g.request_started = time.perf_counter()
+
+        def record_latency(response):
+            started = g.pop('request_started', None)
+            if started is not None:
+                rule = request.url_rule
+                self.observe_request(rule.rule if rule is not None else 'unmatched', request.method,
+                                     response.status_code, time.perf_counter() - started)
+            return response
+
+        # First in line, so the other before_request hooks are counted too
+        app.before_request_funcs.setdefault(None, []).insert(0, start_timer)
+        app.after_request(record_latency)
+
+    def snapshot(self):
+        """This process's counts: {'buckets', 'requests', 'stages'}, series keyed by tab-joined labels"""
+        with self._lock:
+            return {
+                'buckets': self.buckets,
+                'requests': {'\t'.join(key): list(counts) for key, counts in self._requests.items()},
+                'stages': {'\t'.join(key): list(counts) for key, counts in self._stages.items()}
+            }
+
+    def flush(self):
+        """Write snapshot() to this process's file in multiprocess_dir (atomically replaced)"""
+        with self._flush_lock:
+            if self._file is None or self._file[0] != os.getpid():
+                self._file = (os.getpid(), f'{os.getpid()}-{uuid.uuid4().hex[:12]}.json')
+            path = os.path.join(self.multiprocess_dir, self._file[1])
+            with open(path + '.tmp', 'w') as f:
+                json.dump(self.snapshot(), f, separators=(',', ':'))
+            os.replace(path + '.tmp', path)
+            self.flushes += 1
+
+    def watch(self, interval):
+        """Forget a parent's counts after fork; flush() every interval seconds in multiprocess mode"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._requests, self._stages = {}, {}
+                    self._pid = os.getpid()
+        if not self.multiprocess_dir or interval <= 0:
+            return
+        self._flush_task.start(self.flush, interval)
+
+    def _merged(self):
+        if not self.multiprocess_dir:
+            return self.snapshot()
+        self.flush()
+        merged = {'buckets': self.buckets, 'requests': {}, 'stages': {}}
+        for name in os.listdir(self.multiprocess_dir):
+            if name.endswith('.json'):
+                _add_counts(merged, _read_counts(os.path.join(self.multiprocess_dir, name)))
+        return merged
+
+    def render(self):
+        """(body, content type) for a /metrics scrape"""
+        merged = self._merged()
+        bounds = [repr(b) for b in self.buckets] + ['+Inf']
+        lines = []
+        for (name, help_text, label_names), series in ((REQUEST_METRIC, merged['requests']),
+                                                       (STAGE_METRIC, merged['stages'])):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for key in sorted(series):
+                counts = series[key]
+                values = [_escape(v) for v in key.split('\t')]
+                cumulative = 0
+                for le, count in zip(bounds, counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_label_text(label_names, values, le)} {cumulative}')
+                labels = _label_text(label_names, values)
+                lines.append(f'{name}_count{labels} {cumulative}')
+                lines.append(f'{name}_sum{labels} {counts[-1]!r}')
+        return '\n'.join(lines) + '\n', CONTENT_TYPE
+
+    def stats(self):
+        with self._lock:
+            return {
+                'request_series': len(self._requests),
+                'stage_series': len(self._stages),
+                'buckets': len(self.buckets),
+                'multiprocess_dir': self.multiprocess_dir,
+                'flushes': self.flushes,
+                'last_error': self._flush_task.last_error
+            }
+
+def _read_counts(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _add_counts(total, counts):
+    """Sum a snapshot() into total in place; one written under other buckets is skipped"""
+    if counts is None or counts.get('buckets') != total['buckets']:
+        return
+    for kind in ('requests', 'stages'):
+        for key, series in counts[kind].items():
+            current = total[kind].get(key)
+            total[kind][key] = series if current is None else [a + b for a, b in zip(current, series)]
+
+def retire_process(multiprocess_dir, pid):
+    """Fold the files of exited process pid into retired.json and remove them (run by the gunicorn master)"""
+    names = [name for name in os.listdir(multiprocess_dir) if name.startswith(f'{pid}-')]
+    counts = [_read_counts(os.path.join(multiprocess_dir, name))
+              for name in names if name.endswith('.json')]
+    counts = [c for c in counts if c is not None]
+    if counts:
+        path = os.path.join(multiprocess_dir, RETIRED_FILE)
+        retired = _read_counts(path) or {'buckets': counts[0]['buckets'], 'requests': {}, 'stages': {}}
+        for c in counts:
+            _add_counts(retired, c)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(retired, f, separators=(',', ':'))
+        os.replace(path + '.tmp', path)
+    for name in names:
+        try:
+            os.unlink(os.path.join(multiprocess_dir, name))
+        except FileNotFoundError:
+            pass
+
+def create_metrics_from_env():
+    """Metrics configured by METRICS_* variables, or None when METRICS_ENABLED=0"""
+    if os.getenv('METRICS_ENABLED', '1') == '0':
+        return None
+    buckets = log_linear_buckets(float(os.getenv('METRICS_LOWEST_SECONDS', 0.0001)),
+                                 float(os.getenv('METRICS_HIGHEST_SECONDS', 60)),
+                                 int(os.getenv('METRICS_BUCKETS_PER_OCTAVE', 4)))
+    return Metrics(buckets, multiprocess_dir=os.getenv('METRICS_DIR'))
@@ -0,0 +1,64 @@
+import os
+import resource
+import sys
+import time
+
+import joblib
+
+def current_rss_bytes():
+    """Resident set size of this process (Linux /proc, falling back to peak RSS)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def mmap_path_for(pickle_path):
+    """Where convert_model writes the mmap-able copy of a pickle"""
+    return os.path.splitext(pickle_path)[0] + '.mmap.joblib'
+
+def convert_model(pickle_path, output_path=None):
+    """Re-dump a pickled model uncompressed so joblib can mmap its arrays"""
+    output_path = output_path or mmap_path_for(pickle_path)
+    model = joblib.load(pickle_path)
+    joblib.dump(model, output_path, compress=0)
+    return output_path
+
+def load_model(pickle_path, mmap=None):
+    """Load the model and return (model, load_stats).
+
+    If an up-to-date .mmap.joblib copy exists (see convert_model) and mmap is
+    not disabled, its NumPy arrays are opened with mmap_mode='r' so the page
+    cache backs them instead of private worker memory. Estimators that copy
+    arrays into their own buffers on unpickle (e.g. sklearn trees) still get
+    the cross-worker saving from loading in the gunicorn master before fork.
+    """
+    if mmap is None:
+        mmap = os.getenv('MODEL_MMAP', '1') != '0'
+    path, mmap_mode = pickle_path, None
+    candidate = mmap_path_for(pickle_path)
+    if mmap and os.path.exists(candidate) and os.path.getmtime(candidate) >= os.path.getmtime(pickle_path):
+        path, mmap_mode = candidate, 'r'
+
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    model = joblib.load(path, mmap_mode=mmap_mode)
+    load_seconds = time.perf_counter() - start
+    stats = {
+        'path': path,
+        'mmap_mode': mmap_mode,
+        'pid': os.getpid(),
+        'load_ms': round(load_seconds * 1000, 2),
+        'rss_delta_mb': round((current_rss_bytes() - rss_before) / (1 << 20), 2),
+        'rss_mb': round(current_rss_bytes() / (1 << 20), 2),
+        'file_mb': round(os.path.getsize(path) / (1 << 20), 2)
+    }
+    return model, stats
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else 'pcos_model (2).pkl'
+    print(f"✓ Wrote {convert_model(source)}")
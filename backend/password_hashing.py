@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+class HasherBusyError(Exception):
+    """Raised when the hashing queue is full; routes answer 503"""
+
+def hash_cost(hashed):
+    """The bcrypt cost factor encoded in a $2b$NN$... hash, or None"""
+    if isinstance(hashed, str):
+        hashed = hashed.encode('utf-8')
+    try:
+        return int(hashed.split(b'$')[2])
+    except (IndexError, ValueError):
+        return None
+
+class _Samples:
+    """Bounded window of recent durations (seconds) with percentile summary"""
+
+    def __init__(self, size=2048):
+        self._values = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, seconds):
+        self._values.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        ordered = sorted(self._values)
+        if not ordered:
+            return {'count': self.count}
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))] * 1000, 3)
+        return {'count': self.count, 'p50_ms': pct(50), 'p90_ms': pct(90), 'p99_ms': pct(99),
+                'max_ms': round(ordered[-1] * 1000, 3)}
+
+class PasswordHasher:
+    """bcrypt hashing on a bounded thread pool.
+
+    pyca/bcrypt releases the GIL while hashing, so `workers` threads cap how
+    many cores password work may occupy per process; everything else in the
+    worker keeps running. At most `max_queue` calls may wait behind them,
+    beyond that HasherBusyError is raised immediately instead of piling up.
+    With workers=0 hashing runs inline on the calling thread.
+    """
+
+    def __init__(self, rounds=12, workers=2, max_queue=16):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rejected = 0
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers else None
+        self._stats_lock = threading.Lock()
+        self._latency = {'hash': _Samples(), 'verify': _Samples()}
+        self._queue_wait = _Samples()
+
+    def _pool(self):
+        # Created lazily (and again after fork): executor threads don't survive fork
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+            self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, kind, fn, *args):
+        if not self.workers:
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self._record(kind, time.perf_counter() - start, 0.0)
+
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            raise HasherBusyError("Password hashing queue is full")
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self._record(kind, time.perf_counter() - started, started - submitted)
+                self._slots.release()
+        return self._pool().submit(task).result()
+
+    def _record(self, kind, seconds, waited):
+        with self._stats_lock:
+            self._latency[kind].add(seconds)
+            self._queue_wait.add(waited)
+
+    def hash(self, password):
+        """Hash a str password at the configured cost; returns bytes"""
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run('hash', bcrypt.hashpw, password.encode('utf-8'), salt)
+
+    def verify(self, password, hashed):
+        if isinstance(hashed, str):
+            hashed = hashed.encode('utf-8')
+        return self._run('verify', bcrypt.checkpw, password.encode('utf-8'), hashed)
+
+    def needs_rehash(self, hashed):
+        cost = hash_cost(hashed)
+        return cost is not None and cost < self.rounds
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'rounds': self.rounds,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'rejected': self.rejected,
+                'hash': self._latency['hash'].summary(),
+                'verify': self._latency['verify'].summary(),
+                'queue_wait': self._queue_wait.summary()
+            }
+
+def create_hasher_from_env():
+    """Build the hasher configured by the BCRYPT_* environment variables"""
+    return PasswordHasher(
+        rounds=int(os.getenv('BCRYPT_ROUNDS', 12)),
+        workers=int(os.getenv('BCRYPT_WORKERS', 2)),
+        max_queue=int(os.getenv('BCRYPT_MAX_QUEUE', 16))
+    )
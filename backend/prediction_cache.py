@@ -0,0 +1,206 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hex SHA-256 of a file, used to tie cached results to one model build"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class PredictionCache:
+    """In-process LRU cache of (prediction, confidence) keyed by feature row.
+
+    Keys are a hash of the encoded float64 row salted with the model file
+    hash, so a new model never serves results computed by an old one.
+    """
+
+    backend = 'memory'
+
+    def __init__(self, model_hash, max_size=1024, ttl=None):
+        self.model_hash = model_hash
+        self.max_size = max_size
+        self.ttl = ttl or None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def key_for(self, row):
+        row = np.ascontiguousarray(row, dtype=np.float64).ravel()
+        digest = hashlib.blake2b(row.tobytes(), digest_size=16,
+                                 person=b'gynai-predict')
+        digest.update(self.model_hash.encode('ascii'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_model_hash(self, model_hash):
+        """Invalidate everything if the loaded model changed"""
+        if model_hash != self.model_hash:
+            self.model_hash = model_hash
+            self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+    def stats(self):
+        size = self.size()  # takes the lock itself in the SQLite backend
+        with self._lock:
+            hits, misses, evictions, expired = self.hits, self.misses, self.evictions, self.expired
+        lookups = hits + misses
+        return {
+            'enabled': True,
+            'backend': self.backend,
+            'size': size,
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl,
+            'hits': hits,
+            'misses': misses,
+            'evictions': evictions,
+            'expired': expired,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'model_hash': self.model_hash
+        }
+
+class SQLitePredictionCache(PredictionCache):
+    """Same interface as PredictionCache, stored in a local SQLite file.
+
+    All gunicorn workers on a host can point at the same file to share
+    entries. Each process opens its own connection after fork; hit/miss
+    counters are per worker, size and evictions reflect the shared table.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, model_hash, path, max_size=1024, ttl=None):
+        super().__init__(model_hash, max_size=max_size, ttl=ttl)
+        self.path = path
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS prediction_cache (
+                    key TEXT PRIMARY KEY,
+                    model_hash TEXT NOT NULL,
+                    prediction INTEGER NOT NULL,
+                    confidence REAL NOT NULL,
+                    expires_at REAL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_prediction_cache_access "
+                         "ON prediction_cache (last_access)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT prediction, confidence, expires_at FROM prediction_cache "
+                "WHERE key=? AND model_hash=?", (key, self.model_hash)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            prediction, confidence, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                conn.execute("DELETE FROM prediction_cache WHERE key=?", (key,))
+                self.expired += 1
+                self.misses += 1
+                return None
+            conn.execute("UPDATE prediction_cache SET last_access=? WHERE key=?", (now, key))
+            self.hits += 1
+            return prediction, confidence
+
+    def put(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        prediction, confidence = value
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO prediction_cache "
+                "(key, model_hash, prediction, confidence, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, self.model_hash, prediction, confidence, expires_at, now)
+            )
+            overflow = conn.execute("SELECT COUNT(*) FROM prediction_cache").fetchone()[0] - self.max_size
+            if overflow > 0:
+                cursor = conn.execute(
+                    "DELETE FROM prediction_cache WHERE key IN ("
+                    "SELECT key FROM prediction_cache ORDER BY last_access LIMIT ?)", (overflow,)
+                )
+                self.evictions += cursor.rowcount
+
+    def set_model_hash(self, model_hash):
+        self.model_hash = model_hash
+        with self._lock:
+            self._connection().execute(
+                "DELETE FROM prediction_cache WHERE model_hash != ?", (model_hash,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM prediction_cache")
+
+    def size(self):
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM prediction_cache").fetchone()[0]
+
+def create_prediction_cache(model_hash):
+    """Build the cache configured by the PREDICT_CACHE_* environment variables"""
+    max_size = int(os.getenv('PREDICT_CACHE_SIZE', 1024))
+    if max_size <= 0:
+        return None
+    ttl = float(os.getenv('PREDICT_CACHE_TTL', 0)) or None
+    if os.getenv('PREDICT_CACHE_BACKEND', 'memory') == 'sqlite':
+        path = os.getenv('PREDICT_CACHE_PATH', 'prediction_cache.sqlite3')
+        cache = SQLitePredictionCache(model_hash, path, max_size=max_size, ttl=ttl)
+        cache.set_model_hash(model_hash)
+        return cache
+    return PredictionCache(model_hash, max_size=max_size, ttl=ttl)
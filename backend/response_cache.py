@@ -0,0 +1,111 @@
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# Bodies smaller than this are not worth a Content-Encoding round trip
+GZIP_MIN_BYTES = 1024
+
+class CachedResponse:
+    """A response body serialised once, with its gzip variant and ETags"""
+
+    __slots__ = ('body', 'gzipped', 'etag', 'gzip_etag', 'headers')
+
+    def __init__(self, body, headers=None, compress=True):
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16, person=b'gynai-resp').hexdigest()
+        # mtime=0 keeps the gzip bytes (and so their ETag) stable across workers
+        if compress and len(body) >= GZIP_MIN_BYTES:
+            self.gzipped = gzip.compress(body, compresslevel=6, mtime=0)
+            self.gzip_etag = self.etag + '-gz'
+        else:
+            self.gzipped = None
+            self.gzip_etag = None
+        self.headers = dict(headers or {})
+
+class ResponseCache:
+    """Pre-serialised JSON responses for the read-only catalogue routes.
+
+    Entries are keyed by a normalised query tuple. warm() pins responses
+    that are built up front (the unfiltered list, one per specialty and
+    availability option...); everything else goes through a bounded LRU on
+    first request. The cache is tied to one catalogue: build a new one
+    when the data changes instead of invalidating entries.
+    """
+
+    def __init__(self, serialize, max_size=256, compress=True):
+        self.serialize = serialize
+        self.max_size = max_size
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._pinned = {}
+        self._entries = OrderedDict()
+
+    def _build(self, build):
+        payload, headers = build()
+        # bytes are an already serialised body (e.g. joined DoctorRecords)
+        body = payload if isinstance(payload, bytes) else self.serialize(payload)
+        return CachedResponse(body, headers, compress=self.compress)
+
+    def warm(self, key, build):
+        """Build and pin the response for key"""
+        entry = self._build(build)
+        self.pin(key, entry)
+        return entry
+
+    def pinned(self, key):
+        """The pinned entry for key, or None"""
+        with self._lock:
+            return self._pinned.get(key)
+
+    def pin(self, key, entry):
+        """Pin an already built entry (e.g. one carried over from a previous cache)"""
+        with self._lock:
+            self._pinned[key] = entry
+
+    def get_or_build(self, key, build):
+        """The cached response for key; build() -> (payload or body bytes, headers) on a miss"""
+        with self._lock:
+            entry = self._pinned.get(key)
+            if entry is None:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+        # Built outside the lock; two racing misses just serialise twice
+        entry = self._build(build)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._pinned.values()) + list(self._entries.values())
+            return {
+                'pinned': len(self._pinned),
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'bytes': sum(len(e.body) + len(e.gzipped or b'') for e in entries)
+            }
+
+def create_response_cache(serialize):
+    """The cache configured by RESPONSE_CACHE_* variables, or None to serialise per request"""
+    max_size = int(os.getenv('RESPONSE_CACHE_SIZE', 256))
+    if max_size <= 0:
+        return None
+    return ResponseCache(serialize, max_size=max_size,
+                         compress=os.getenv('RESPONSE_CACHE_GZIP', '1') != '0')
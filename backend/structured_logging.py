@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from flask import request
+
+from background import ProcessThread
+
+# LogRecord attributes that are not user-supplied extra= fields
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# (route rule, method) of the request being served by this thread, set once
+# per request so logging calls don't go through Flask's request proxies
+_current_route = ContextVar('log_route', default=(None, None))
+
+def parse_route_levels(text):
+    """{'/predict': logging.DEBUG, ...} from '/predict=DEBUG,/health=WARNING'"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        route, _, level = item.rpartition('=')
+        if not route or not isinstance(logging.getLevelName(level.strip().upper()), int):
+            raise ValueError(f"Bad route log level {item!r}; expected /route=LEVEL")
+        levels[route.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, the request's
+    route and method when there was one, extra= fields, and the traceback"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = ''.join(traceback.format_exception(*record.exc_info)).rstrip()
+        return json.dumps(entry, default=str, separators=(',', ':'))
+
+class RequestLogger(logging.Logger):
+    """Logger that applies per-route levels and DEBUG sampling before a record exists.
+
+    The logger's own level is the most verbose of default_level and
+    route_levels, so calls below that never get here. A call that does is
+    checked against its route's level (default_level outside requests or
+    for other routes); DEBUG calls are then kept with probability
+    debug_sample_rate. Dropped calls cost a dict lookup and a random(),
+    not a LogRecord. Kept records carry the route and method.
+    """
+
+    route_levels = {}
+    default_level = logging.INFO
+    debug_sample_rate = 1.0
+
+    def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        route, method = _current_route.get()
+        if level < self.route_levels.get(route, self.default_level):
+            return
+        if level <= logging.DEBUG and self.debug_sample_rate < 1.0 and random.random() >= self.debug_sample_rate:
+            return
+        if route is not None:
+            extra = {**extra, 'route': route, 'method': method} if extra else {'route': route, 'method': method}
+        super()._log(level, msg, args, exc_info, extra, stack_info, stacklevel + 1)
+
+class AsyncLogHandler(logging.Handler):
+    """Logging handler whose emit() only appends to an in-memory buffer.
+
+    A background thread (started on first use, and again in each forked
+    worker) formats buffered records and writes them to the stream in
+    batches every flush_interval seconds, so request threads never wait on
+    stdout or a log pipe. When max_pending records are waiting, new ones
+    are dropped and counted rather than blocking.
+    """
+
+    def __init__(self, stream=None, max_pending=10000, flush_interval=0.05):
+        super().__init__()
+        self.stream = stream or sys.stdout
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.setFormatter(JsonFormatter())
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self._thread = ProcessThread(self._run, 'log-writer', prepare=self._reset)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _reset(self):
+        if self._thread.pid is not None:
+            # Forked: whatever was buffered is the parent's to write
+            self._pending = deque()
+        self._closing = threading.Event()
+
+    def handle(self, record):
+        # No handler lock needed: deque appends are atomic
+        if self.filter(record):
+            self.emit(record)
+            return True
+        return False
+
+    def emit(self, record):
+        self._thread.start()
+        if len(self._pending) >= self.max_pending:
+            with self._lock:
+                self.dropped += 1
+            return
+        if record.args:
+            # Render now: args may be mutated once the caller moves on
+            record.msg, record.args = record.getMessage(), None
+        self._pending.append(record)
+
+    def _run(self):
+        while True:
+            closing = self._closing.is_set()
+            batch = []
+            pending = self._pending
+            while pending:
+                batch.append(pending.popleft())
+            if batch:
+                self._write(batch)
+            elif closing:
+                return
+            else:
+                time.sleep(self.flush_interval)
+
+    def _write(self, records):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.failed += 1
+        try:
+            self.stream.write('\n'.join(lines) + '\n')
+            self.stream.flush()
+        except Exception:
+            self.failed += len(lines)
+            return
+        self.written += len(lines)
+
+    def install(self, app):
+        """Note each request's route once, for RequestLogger's per-route levels"""
+        def note_route():
+            rule = request.url_rule
+            _current_route.set((rule.rule if rule is not None else None, request.method))
+
+        def forget_route(exc):
+            _current_route.set((None, None))
+
+        app.before_request_funcs.setdefault(None, []).insert(0, note_route)
+        app.teardown_request(forget_route)
+
+    def close(self, timeout=5.0):
+        """Write out everything buffered, then stop the writer thread"""
+        if self._thread.running():
+            self._closing.set()
+            self._thread.join(timeout)
+        super().close()
+
+    def stats(self):
+        return {
+            'pending': len(self._pending),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed
+        }
+
+def configure_logging_from_env(app, *logger_names):
+    """Send app.logger and the named loggers through one AsyncLogHandler as JSON lines.
+
+    LOG_LEVEL is the default level, LOG_ROUTE_LEVELS overrides it per route
+    ('/predict=DEBUG,/health=WARNING') and LOG_DEBUG_SAMPLE_RATE keeps that
+    fraction of DEBUG calls. Call before anything touches app.logger.
+    Returns the handler.
+    """
+    level = logging.getLevelName(os.getenv('LOG_LEVEL', 'INFO').upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown LOG_LEVEL {os.getenv('LOG_LEVEL')!r}")
+    route_levels = parse_route_levels(os.getenv('LOG_ROUTE_LEVELS', ''))
+    handler = AsyncLogHandler(max_pending=int(os.getenv('LOG_MAX_PENDING', 10000)),
+                              flush_interval=float(os.getenv('LOG_FLUSH_INTERVAL', 0.05)))
+    handler.install(app)
+    logger_class = logging.getLoggerClass()
+    logging.setLoggerClass(RequestLogger)
+    try:
+        for name in (app.name, *logger_names):
+            logger = logging.getLogger(name)
+            if isinstance(logger, RequestLogger):
+                logger.route_levels = route_levels
+                logger.default_level = level
+                logger.debug_sample_rate = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 0.01))
+            logger.handlers = [handler]
+            logger.setLevel(min([level, *route_levels.values()]))
+            logger.propagate = False
+    finally:
+        logging.setLoggerClass(logger_class)
+    return handler
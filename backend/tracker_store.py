@@ -0,0 +1,351 @@
+import json
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from db_pool import StoreUnavailableError
+
+# (JSON key from tracker.js, column) for the 0-10 sliders
+SCALES = (
+    ('painLevel', 'pain_level'), ('pelvicPain', 'pelvic_pain'), ('backPain', 'back_pain'),
+    ('headacheLevel', 'headache_level'), ('cramps', 'cramps'), ('anxietyLevel', 'anxiety_level'),
+    ('stressLevel', 'stress_level'), ('sleepQuality', 'sleep_quality'), ('energyLevel', 'energy_level'),
+    ('fatigueLevel', 'fatigue_level'),
+)
+# Stored as their index: bleeding 0-5, mood 1-5 (so both average meaningfully)
+BLEEDING = ('none', 'spotting', 'light', 'medium', 'heavy', 'very-heavy')
+MOODS = ('terrible', 'bad', 'okay', 'good', 'great')
+CERVICAL_MUCUS = ('none', 'dry', 'sticky', 'creamy', 'watery', 'egg-white')
+# Light bleeding or more counts as a period day
+PERIOD_BLEEDING = BLEEDING.index('light')
+# A period day starts a new cycle when the previous period day is at least this far back
+MIN_CYCLE_GAP_DAYS = 10
+# Longest free text accepted per entry, in characters
+NOTES_MAX_LENGTH = 2000
+MEDICATIONS_MAX_LENGTH = 500
+
+# Averaged in the rollups: each gets <column>_sum and <column>_n (entries that had a value)
+METRICS = tuple(column for _, column in SCALES) + ('bleeding', 'mood', 'sleep_hours')
+ENTRY_COLUMNS = ('user_id', 'entry_date') + METRICS + ('cervical_mucus', 'cycle_day', 'symptoms',
+                                                        'notes', 'medications')
+ROLLUP_COLUMNS = ('user_id', 'period', 'period_start', 'entries', 'period_days') + tuple(
+    f'{m}_{part}' for m in METRICS for part in ('sum', 'n'))
+
+# One row per user per day. The (user_id, entry_date) primary key is
+# InnoDB's clustered index, so a user's history is stored contiguously in
+# date order: daily entries append at the end of the user's range, and
+# any date range for one user is a single index range read.
+TRACKER_ENTRIES_DDL = """
+    CREATE TABLE IF NOT EXISTS tracker_entries (
+        user_id INT NOT NULL,
+        entry_date DATE NOT NULL,
+{scales}
+        bleeding TINYINT NOT NULL DEFAULT 0,
+        mood TINYINT NULL,
+        sleep_hours DECIMAL(3,1) NULL,
+        cervical_mucus VARCHAR(16) NULL,
+        cycle_day TINYINT NULL,
+        symptoms VARCHAR(1000) NULL,
+        notes TEXT NULL,
+        medications TEXT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, entry_date)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+""".format(scales='\n'.join(f'        {column} TINYINT NULL,' for _, column in SCALES))
+
+# Weekly (Monday-start, period 'W') and monthly ('M') sums per user,
+# rewritten for every period an upload touches. Sums rather than averages,
+# so a summary can also merge periods.
+TRACKER_ROLLUPS_DDL = """
+    CREATE TABLE IF NOT EXISTS tracker_rollups (
+        user_id INT NOT NULL,
+        period CHAR(1) NOT NULL,
+        period_start DATE NOT NULL,
+        entries SMALLINT NOT NULL,
+        period_days SMALLINT NOT NULL,
+{metrics}
+        PRIMARY KEY (user_id, period, period_start)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+""".format(metrics='\n'.join(
+    f"        {m}_sum {'DECIMAL(7,1)' if m == 'sleep_hours' else 'INT'} NOT NULL,\n        {m}_n SMALLINT NOT NULL,"
+    for m in METRICS))
+
+# First day of each cycle, with its length once the next one has started
+TRACKER_CYCLES_DDL = """
+    CREATE TABLE IF NOT EXISTS tracker_cycles (
+        user_id INT NOT NULL,
+        start_date DATE NOT NULL,
+        length_days SMALLINT NULL,
+        PRIMARY KEY (user_id, start_date)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+TRACKER_DDL = (TRACKER_ENTRIES_DDL, TRACKER_ROLLUPS_DDL, TRACKER_CYCLES_DDL)
+
+def _number(value, name, low, high, kind=int):
+    if value is None or value == '':
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if not low <= number <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return int(number) if kind is int else round(number, 1)
+
+def _choice(value, name, options):
+    if value is None or value == '':
+        return None
+    if value not in options:
+        raise ValueError(f"{name} must be one of {', '.join(options)}")
+    return options.index(value)
+
+def _text(value, name, limit):
+    if value is None:
+        return None
+    value = str(value).strip()
+    if len(value) > limit:
+        raise ValueError(f"{name} must be at most {limit} characters")
+    return value or None
+
+def parse_entry(raw):
+    """Column values for one tracker.js entry; ValueError if invalid"""
+    if not isinstance(raw, dict):
+        raise ValueError("each entry must be an object")
+    try:
+        day = datetime.strptime(str(raw.get('date', '')).strip()[:10], '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError("date must be YYYY-MM-DD")
+    row = {'entry_date': day.isoformat()}
+    for key, column in SCALES:
+        row[column] = _number(raw.get(key), key, 0, 10)
+    row['bleeding'] = _choice(raw.get('bleeding'), 'bleeding', BLEEDING) or 0
+    mood = _choice(raw.get('mood'), 'mood', MOODS)
+    row['mood'] = mood + 1 if mood is not None else None
+    row['sleep_hours'] = _number(raw.get('sleepHours'), 'sleepHours', 0, 24, float)
+    mucus = _choice(raw.get('cervicalMucus'), 'cervicalMucus', CERVICAL_MUCUS)
+    row['cervical_mucus'] = CERVICAL_MUCUS[mucus] if mucus is not None else None
+    row['cycle_day'] = _number(raw.get('cycleDay'), 'cycleDay', 1, 50)
+    symptoms = raw.get('symptoms') or []
+    if not isinstance(symptoms, list):
+        raise ValueError("symptoms must be a list")
+    row['symptoms'] = json.dumps([str(s) for s in symptoms])[:1000] if symptoms else None
+    row['notes'] = _text(raw.get('notes'), 'notes', NOTES_MAX_LENGTH)
+    row['medications'] = _text(raw.get('medications'), 'medications', MEDICATIONS_MAX_LENGTH)
+    return row
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+def _month_end(day):
+    return day.replace(day=monthrange(day.year, day.month)[1])
+
+def _entry_json(row):
+    entry = {'date': _as_date(row['entry_date']).isoformat()}
+    for key, column in SCALES:
+        entry[key] = row[column]
+    entry['bleeding'] = BLEEDING[row['bleeding']]
+    entry['mood'] = MOODS[row['mood'] - 1] if row['mood'] else None
+    entry['sleepHours'] = float(row['sleep_hours']) if row['sleep_hours'] is not None else None
+    entry['cervicalMucus'] = row['cervical_mucus']
+    entry['cycleDay'] = row['cycle_day']
+    entry['symptoms'] = json.loads(row['symptoms']) if row['symptoms'] else []
+    entry['notes'] = row['notes']
+    entry['medications'] = row['medications']
+    return entry
+
+def _rollup_json(row):
+    averages = {}
+    for key, column in SCALES + (('bleeding', 'bleeding'), ('mood', 'mood'), ('sleepHours', 'sleep_hours')):
+        n = row[f'{column}_n']
+        averages[key] = round(float(row[f'{column}_sum']) / n, 2) if n else None
+    return {'periodStart': _as_date(row['period_start']).isoformat(), 'entries': row['entries'],
+            'periodDays': row['period_days'], 'averages': averages}
+
+def cycle_starts(period_days):
+    """Cycle start dates from a user's sorted period (bleeding) days"""
+    starts, previous = [], None
+    for day in period_days:
+        if previous is None or (day - previous).days >= MIN_CYCLE_GAP_DAYS:
+            starts.append(day)
+        previous = day
+    return starts
+
+class TrackerStore:
+    """Symptom tracker entries with rollups maintained on write.
+
+    save() takes one entry or a whole local history. In one transaction it
+    locks and reads the user's existing rows for the weeks and months the
+    upload touches (one primary-key range), upserts the entries in one
+    batched INSERT, and rewrites the rollup rows of exactly those periods
+    from the merged rows. Cycle starts are recomputed only when a period
+    day was added or removed. The dashboard's summary() then reads a few
+    dozen rollup rows and cycles instead of the whole history.
+    """
+
+    def __init__(self, connect):
+        self._connect = connect
+
+    def _connection(self):
+        conn = self._connect()
+        if conn is None:
+            raise StoreUnavailableError("Database connection failed")
+        return conn
+
+    def save(self, user_id, entries):
+        """Upsert entries (a later entry for a date wins); the number of days stored"""
+        rows = {}
+        for raw in entries:
+            row = parse_entry(raw)
+            rows[row['entry_date']] = row
+        if not rows:
+            return 0
+        days = sorted(rows)
+        first, last = date.fromisoformat(days[0]), date.fromisoformat(days[-1])
+        span = (min(_week_start(first), first.replace(day=1)).isoformat(),
+                max(_week_start(last) + timedelta(days=6), _month_end(last)).isoformat())
+
+        conn = self._connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"SELECT entry_date, {', '.join(METRICS)} FROM tracker_entries "
+                "WHERE user_id = %s AND entry_date BETWEEN %s AND %s FOR UPDATE",
+                (user_id,) + span
+            )
+            # MySQL returns sleep_hours as Decimal; parse_entry's new values are floats
+            merged = {_as_date(r[0]).isoformat(): dict(zip(METRICS, (float(v) if isinstance(v, Decimal) else v
+                                                                    for v in r[1:])))
+                      for r in cursor.fetchall()}
+            period_changed = any(
+                (rows[d]['bleeding'] >= PERIOD_BLEEDING) != (merged.get(d, {'bleeding': 0})['bleeding'] >= PERIOD_BLEEDING)
+                for d in days
+            )
+            updates = ', '.join(f"{c} = VALUES({c})" for c in ENTRY_COLUMNS[2:])
+            cursor.executemany(
+                f"INSERT INTO tracker_entries ({', '.join(ENTRY_COLUMNS)}) "
+                f"VALUES ({', '.join(['%s'] * len(ENTRY_COLUMNS))}) ON DUPLICATE KEY UPDATE {updates}",
+                [(user_id,) + tuple(rows[d][c] for c in ENTRY_COLUMNS[1:]) for d in days]
+            )
+            for d in days:
+                merged[d] = rows[d]
+            updates = ', '.join(f"{c} = VALUES({c})" for c in ROLLUP_COLUMNS[3:])
+            cursor.executemany(
+                f"INSERT INTO tracker_rollups ({', '.join(ROLLUP_COLUMNS)}) "
+                f"VALUES ({', '.join(['%s'] * len(ROLLUP_COLUMNS))}) ON DUPLICATE KEY UPDATE {updates}",
+                self._rollups(user_id, merged, days)
+            )
+            if period_changed:
+                self._refresh_cycles(cursor, user_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        return len(days)
+
+    @staticmethod
+    def _rollups(user_id, merged, days):
+        """ROLLUP_COLUMNS rows for every week and month containing one of days"""
+        periods = {}
+        for d in days:
+            day = date.fromisoformat(d)
+            periods[('W', _week_start(day))] = None
+            periods[('M', day.replace(day=1))] = None
+        totals = {key: [0, 0] + [0, 0] * len(METRICS) for key in periods}
+        for d, row in merged.items():
+            day = date.fromisoformat(d)
+            for key in (('W', _week_start(day)), ('M', day.replace(day=1))):
+                total = totals.get(key)
+                if total is None:
+                    continue
+                total[0] += 1
+                total[1] += row['bleeding'] >= PERIOD_BLEEDING
+                for i, metric in enumerate(METRICS):
+                    value = row[metric]
+                    if value is not None:
+                        total[2 + 2 * i] += value
+                        total[3 + 2 * i] += 1
+        return [(user_id, period, start.isoformat()) + tuple(total) for (period, start), total in totals.items()]
+
+    @staticmethod
+    def _refresh_cycles(cursor, user_id):
+        cursor.execute(
+            "SELECT entry_date FROM tracker_entries WHERE user_id = %s AND bleeding >= %s ORDER BY entry_date",
+            (user_id, PERIOD_BLEEDING)
+        )
+        starts = cycle_starts([_as_date(r[0]) for r in cursor.fetchall()])
+        cursor.execute("DELETE FROM tracker_cycles WHERE user_id = %s", (user_id,))
+        if starts:
+            lengths = [(b - a).days for a, b in zip(starts, starts[1:])] + [None]
+            cursor.executemany(
+                "INSERT INTO tracker_cycles (user_id, start_date, length_days) VALUES (%s, %s, %s)",
+                [(user_id, start.isoformat(), length) for start, length in zip(starts, lengths)]
+            )
+
+    def entries(self, user_id, first_day=None, last_day=None, limit=None):
+        """The user's entries between two dates (inclusive), newest first"""
+        first_day = first_day or '0001-01-01'
+        last_day = last_day or '9999-12-31'
+        sql = (f"SELECT {', '.join(ENTRY_COLUMNS[1:])} FROM tracker_entries "
+               "WHERE user_id = %s AND entry_date BETWEEN %s AND %s ORDER BY entry_date DESC")
+        params = (user_id, first_day, last_day)
+        if limit is not None:
+            sql += " LIMIT %s"
+            params += (limit,)
+        conn = self._connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            return [_entry_json(dict(zip(ENTRY_COLUMNS[1:], r))) for r in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    def summary(self, user_id, weeks=12, months=12, today=None):
+        """Dashboard summary: recent weekly/monthly averages and cycle-length stats"""
+        today = today or date.today()
+        since_week = (_week_start(today) - timedelta(weeks=weeks - 1)).isoformat()
+        month = today.replace(day=1)
+        for _ in range(months - 1):
+            month = (month - timedelta(days=1)).replace(day=1)
+        conn = self._connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"SELECT {', '.join(ROLLUP_COLUMNS[1:])} FROM tracker_rollups "
+                "WHERE user_id = %s AND ((period = 'W' AND period_start >= %s) "
+                "OR (period = 'M' AND period_start >= %s)) ORDER BY period, period_start",
+                (user_id, since_week, month.isoformat())
+            )
+            rollups = [dict(zip(ROLLUP_COLUMNS[1:], r)) for r in cursor.fetchall()]
+            cursor.execute(
+                "SELECT start_date, length_days FROM tracker_cycles WHERE user_id = %s "
+                "ORDER BY start_date DESC LIMIT 13",
+                (user_id,)
+            )
+            cycles = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+        lengths = [length for _, length in cycles if length is not None][:12]
+        average = round(sum(lengths) / len(lengths), 1) if lengths else None
+        last_start = _as_date(cycles[0][0]) if cycles else None
+        return {
+            'weekly': [_rollup_json(r) for r in rollups if r['period'] == 'W'],
+            'monthly': [_rollup_json(r) for r in rollups if r['period'] == 'M'],
+            'cycles': {
+                'count': len(lengths),
+                'averageLength': average,
+                'minLength': min(lengths) if lengths else None,
+                'maxLength': max(lengths) if lengths else None,
+                'lastStart': last_start.isoformat() if last_start else None,
+                'predictedNextStart': ((last_start + timedelta(days=round(average))).isoformat()
+                                       if last_start and average else None)
+            }
+        }